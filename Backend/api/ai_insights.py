@@ -6,10 +6,11 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models.ai_insight import AIInsight
-from models.portfolio import Portfolio, Holding
 from models.behavioral_metrics import BehavioralMetrics
 from services.ai_service import AIService
 from services.market_service import MarketService
+from services.portfolio_snapshot import PortfolioSnapshot
+from api.market import prediction_cache
 
 ai_bp = Blueprint('ai_insights', __name__)
 
@@ -73,14 +74,13 @@ def get_recommendations():
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Get portfolio data
-        portfolio = Portfolio.query.filter_by(user_id=user_id).first()
+        snapshot = PortfolioSnapshot.load(user_id=user_id)
         portfolio_data = {}
-        if portfolio:
-            holdings = Holding.query.filter_by(portfolio_id=portfolio.id).all()
+        if snapshot:
             portfolio_data = {
-                'total_value': float(portfolio.total_value),
-                'holdings_count': len(holdings),
-                'holdings': [h.to_dict() for h in holdings]
+                'total_value': float(snapshot.total_value),
+                'holdings_count': snapshot.holdings_count,
+                'holdings': snapshot.holdings_to_dict()
             }
         
         # Get behavioral data
@@ -112,7 +112,7 @@ def get_recommendations():
 def get_ai_predictions(symbol):
     """Get AI predictions for specific symbol"""
     try:
-        predictions = MarketService.get_market_predictions(symbol)
+        predictions = prediction_cache.get(symbol)
         
         return jsonify(predictions), 200
     except Exception as e:
@@ -7,6 +7,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models.goal import Goal
 from models.user import User
+from models.risk_profile import RiskProfile
+from services.goal_simulator import GoalSimulator
 from decimal import Decimal
 from datetime import datetime, date
 
@@ -55,6 +57,7 @@ def create_goal():
             target_amount=Decimal(str(data['target_amount'])),
             target_date=target_date,
             current_amount=Decimal(str(data.get('current_amount', 0))),
+            monthly_contribution=Decimal(str(data.get('monthly_contribution', 0))),
             goal_type=data['goal_type'],
             priority=data.get('priority', 'medium')
         )
@@ -94,6 +97,8 @@ def update_goal(goal_id):
             goal.target_date = datetime.strptime(data['target_date'], '%Y-%m-%d').date()
         if 'current_amount' in data:
             goal.current_amount = Decimal(str(data['current_amount']))
+        if 'monthly_contribution' in data:
+            goal.monthly_contribution = Decimal(str(data['monthly_contribution']))
         if 'goal_type' in data:
             goal.goal_type = data['goal_type']
         if 'priority' in data:
@@ -143,50 +148,36 @@ def get_goal_progress(user_id):
         
         goals = Goal.query.filter_by(user_id=user_id).all()
         
-        # Calculate achievement probability using Monte Carlo simulation (simplified)
-        # In production, this would run actual Monte Carlo simulations
+        # Expected return and volatility of the allocation recommended for the user's risk profile
+        risk_profile = RiskProfile.query.filter_by(user_id=user_id).first()
+        assumptions = GoalSimulator.assumptions(
+            risk_profile.risk_category if risk_profile else None,
+            risk_profile.risk_score if risk_profile else None
+        )
+        
         goals_data = []
         overall_probability = 0.0
         
         for goal in goals:
-            years_to_goal = (goal.target_date - date.today()).days / 365.25
-            if years_to_goal <= 0:
-                achievement_prob = 1.0 if goal.current_amount >= goal.target_amount else 0.0
-            else:
-                # Simplified calculation - in production, use actual Monte Carlo
-                required_annual_return = (
-                    (goal.target_amount - goal.current_amount) / goal.current_amount / years_to_goal
-                ) if goal.current_amount > 0 else 0.15
-                
-                # Assume 85%+ target achievement probability
-                if required_annual_return <= 0.10:
-                    achievement_prob = 0.90
-                elif required_annual_return <= 0.15:
-                    achievement_prob = 0.85
-                else:
-                    achievement_prob = max(0.50, 0.90 - (required_annual_return - 0.15) * 2)
-            
+            simulation = GoalSimulator.simulate(goal, assumptions)
             goal_dict = goal.to_dict()
-            goal_dict['achievement_probability'] = round(achievement_prob, 4)
+            goal_dict['achievement_probability'] = simulation.pop('achievement_probability')
+            goal_dict['simulation'] = simulation
             goals_data.append(goal_dict)
             
-            overall_probability += achievement_prob
+            overall_probability += goal_dict['achievement_probability']
         
         if goals_data:
             overall_probability = overall_probability / len(goals_data)
         
-        # Recommended allocations (simplified)
-        recommended_allocations = {
-            'equity': 0.50,
-            'debt': 0.30,
-            'gold': 0.10,
-            'international': 0.10
-        }
-        
         return jsonify({
             'goals': goals_data,
             'achievement_probability': round(overall_probability, 4),
-            'recommended_allocations': recommended_allocations
+            'recommended_allocations': assumptions['allocation'],
+            'assumptions': {
+                'expected_return': assumptions['expected_return'],
+                'volatility': assumptions['volatility']
+            }
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
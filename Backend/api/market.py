@@ -2,19 +2,41 @@
 Market Data endpoints
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required
 from extensions import db
 from models.market_features import MarketFeatures
 from models.sentiment_analysis import SentimentAnalysis
 from services.market_service import MarketService
 from services.sentiment_service import SentimentService
-from utils.cache import cache_get, cache_set
+from services.market_stream import MarketStreamBroadcaster
+from services.screener_service import ScreenerService
+from utils.cache import cache_get, cache_set, cache_get_many, cache_set_many
+from utils.swr_cache import StaleWhileRevalidateCache
 from config import Config
 from datetime import datetime, date, timedelta
 
 market_bp = Blueprint('market', __name__)
 
+# Shared by /api/market/predictions and /api/ai/predictions
+prediction_cache = StaleWhileRevalidateCache(
+    'market:predictions',
+    MarketService.get_market_predictions,
+    fresh_ttl=Config.CACHE_TTL_MARKET,
+    stale_ttl=Config.CACHE_TTL_PREDICTIONS_STALE,
+    top_n=Config.PREDICTION_REFRESH_TOP_N,
+    refresh_interval=Config.PREDICTION_REFRESH_INTERVAL,
+    refresh_ahead=Config.PREDICTION_REFRESH_AHEAD
+)
+
+# One poller per process feeds every /indices/stream client
+indices_broadcaster = MarketStreamBroadcaster(
+    MarketService.get_market_indices,
+    interval=Config.MARKET_STREAM_INTERVAL,
+    max_pending=Config.MARKET_STREAM_MAX_PENDING,
+    volatile_fields=('timestamp',)
+)
+
 @market_bp.route('/indices', methods=['GET'])
 @jwt_required()
 def get_indices():
@@ -35,6 +57,33 @@ def get_indices():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@market_bp.route('/indices/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])  # EventSource cannot send headers
+def stream_indices():
+    """Stream market index updates as Server-Sent Events"""
+    subscriber = indices_broadcaster.subscribe()
+    
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                message = subscriber.next(timeout=Config.MARKET_STREAM_HEARTBEAT)
+                if subscriber.closed:
+                    break
+                if message is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield message.payload
+                indices_broadcaster.record_delivery(message)
+        finally:
+            indices_broadcaster.unsubscribe(subscriber)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @market_bp.route('/sentiment', methods=['GET'])
 @jwt_required()
 def get_market_sentiment():
@@ -75,21 +124,25 @@ def get_market_sentiment():
 def get_predictions(symbol):
     """Get market predictions for a symbol"""
     try:
-        # Check cache
-        cache_key = f'market:predictions:{symbol}'
-        cached_result = cache_get(cache_key)
-        if cached_result:
-            return jsonify(cached_result), 200
-        
-        predictions = MarketService.get_market_predictions(symbol)
-        
-        # Cache result
-        cache_set(cache_key, predictions, Config.CACHE_TTL_MARKET)
+        # Stale entries are served immediately and refreshed in the background
+        predictions = prediction_cache.get(symbol)
         
         return jsonify(predictions), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@market_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+def get_market_metrics():
+    """Get cache and refresh metrics for the market subsystem (this worker only)"""
+    try:
+        return jsonify({
+            'prediction_cache': prediction_cache.metrics(),
+            'indices_stream': indices_broadcaster.metrics()
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @market_bp.route('/news', methods=['GET'])
 @jwt_required()
 def get_news():
@@ -162,3 +215,90 @@ def get_technical_indicators(symbol):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+@market_bp.route('/technical-indicators/batch', methods=['POST'])
+@jwt_required()
+def get_technical_indicators_batch():
+    """Get technical indicators for a list of symbols in one request"""
+    try:
+        data = request.get_json() or {}
+        symbols = data.get('symbols')
+        if not isinstance(symbols, list) or not symbols:
+            return jsonify({'error': 'symbols must be a non-empty list'}), 400
+        if not all(isinstance(symbol, str) and symbol for symbol in symbols):
+            return jsonify({'error': 'symbols must be non-empty strings'}), 400
+        
+        # Preserve request order while dropping duplicates
+        symbols = list(dict.fromkeys(symbols))
+        if len(symbols) > Config.MARKET_BATCH_MAX_SYMBOLS:
+            return jsonify({
+                'error': f'At most {Config.MARKET_BATCH_MAX_SYMBOLS} symbols per request'
+            }), 400
+        
+        # Check cache for every symbol with one MGET
+        cache_keys = {symbol: f'market:technical:{symbol}' for symbol in symbols}
+        cached = cache_get_many(list(cache_keys.values()))
+        results = {symbol: cached[key] for symbol, key in cache_keys.items() if key in cached}
+        misses = [symbol for symbol in symbols if symbol not in results]
+        
+        if misses:
+            computed = MarketService.get_technical_indicators_batch(misses)
+            
+            # Store in database with a single upsert
+            MarketFeatures.bulk_upsert(computed, date.today())
+            db.session.commit()
+            
+            # Cache results with one pipelined round trip
+            fresh = {}
+            for indicators in computed:
+                results[indicators['symbol']] = indicators
+                fresh[cache_keys[indicators['symbol']]] = indicators
+            cache_set_many(fresh, Config.CACHE_TTL_MARKET)
+        
+        return jsonify({
+            'indicators': [results[symbol] for symbol in symbols],
+            'count': len(symbols),
+            'cached_count': len(symbols) - len(misses)
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@market_bp.route('/screen', methods=['POST'])
+@jwt_required()
+def screen_stocks():
+    """Screen the latest feature cross-section with a condition expression"""
+    try:
+        data = request.get_json() or {}
+        expression = data.get('expression')
+        if not isinstance(expression, str) or not expression.strip():
+            return jsonify({'error': 'expression is required, e.g. "rsi < 30 AND volume_ratio > 1.5"'}), 400
+        
+        fields = data.get('fields')
+        if fields is not None and (not isinstance(fields, list)
+                                   or not all(isinstance(field, str) for field in fields)):
+            return jsonify({'error': 'fields must be a list of feature names'}), 400
+        sort_by = data.get('sort_by')
+        if sort_by is not None and not isinstance(sort_by, str):
+            return jsonify({'error': 'sort_by must be a feature name'}), 400
+        order = data.get('order', 'desc')
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': 'order must be asc or desc'}), 400
+        try:
+            limit = int(data.get('limit', 100))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'limit must be an integer'}), 400
+        limit = max(0, min(limit, Config.SCREENER_MAX_RESULTS))
+        
+        try:
+            result = ScreenerService.screen(
+                expression, fields=fields, sort_by=sort_by,
+                descending=order == 'desc', limit=limit
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -7,10 +7,22 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models.portfolio import Portfolio, Holding
 from models.user import User
+from models.risk_profile import RiskProfile
+from models.behavioral_metrics import BehavioralMetrics
 from services.portfolio_service import PortfolioService
-from utils.cache import cache_get, cache_set, cache_delete
+from services.portfolio_snapshot import PortfolioSnapshot
+from services.returns_service import ReturnsService
+from services.rebalance_engine import RebalanceEngine
+from services.backtest_engine import BacktestEngine
+from services.risk_engine import RiskEngine, risk_cache_key, METHODS as RISK_METHODS
+from services.household_service import HouseholdService, household_cache_key
+from services.exposure_service import ExposureService, exposure_cache_key
+from services.holdings_import import HoldingsImporter, FORMATS as IMPORT_FORMAT_NAMES
+from utils.cache import cache_get, cache_set, cache_delete_many
 from config import Config
 from decimal import Decimal
+from datetime import date
+import csv
 
 portfolio_bp = Blueprint('portfolio', __name__)
 
@@ -29,30 +41,22 @@ def get_portfolio(user_id):
         if cached_result:
             return jsonify(cached_result), 200
         
-        portfolio = Portfolio.query.filter_by(user_id=user_id).first()
+        # Portfolio, holdings and counts in one query
+        snapshot = PortfolioSnapshot.load(user_id=user_id)
         
-        if not portfolio:
+        if not snapshot:
             # Create empty portfolio
             portfolio = Portfolio(user_id=user_id)
             db.session.add(portfolio)
             db.session.commit()
+            cache_delete_many([household_cache_key(user_id)])
+            snapshot = PortfolioSnapshot.load(portfolio_id=portfolio.id)
         
-        # Get holdings
-        holdings = Holding.query.filter_by(portfolio_id=portfolio.id).all()
-        
-        # Calculate performance
-        performance = PortfolioService.calculate_portfolio_performance(holdings)
-        
-        # Update portfolio
-        portfolio.total_value = Decimal(str(performance['total_value']))
-        portfolio.total_gain_loss = Decimal(str(performance['total_gain_loss']))
-        portfolio.total_gain_loss_percent = Decimal(str(performance['total_gain_loss_percent']))
-        db.session.commit()
-        
+        # Aggregates are maintained on every holding and price change, so reads never write
         result = {
-            'portfolio': portfolio.to_dict(),
-            'holdings': [h.to_dict() for h in holdings],
-            'performance': performance
+            'portfolio': snapshot.to_dict(),
+            'holdings': snapshot.holdings_to_dict(),
+            'performance': snapshot.performance()
         }
         
         # Cache result
@@ -81,13 +85,29 @@ def optimize_portfolio():
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
         goals = data.get('goals', [])
+        max_turnover = data.get('max_turnover', Config.OPTIMIZER_MAX_TURNOVER)
+        if max_turnover is not None and (not isinstance(max_turnover, (int, float))
+                                         or not 0 < max_turnover <= 1):
+            return jsonify({'error': 'max_turnover must be between 0 and 1'}), 400
+        
+        # Constraints from the stored risk profile, behavior and current holdings
+        risk_profile = RiskProfile.query.filter_by(user_id=user_id).first()
+        behavioral_metrics = BehavioralMetrics.query.filter_by(user_id=user_id).order_by(
+            BehavioralMetrics.created_at.desc()
+        ).first()
+        snapshot = PortfolioSnapshot.load(user_id=user_id)
+        current_allocation = snapshot.asset_values if snapshot else {}
         
         # Optimize portfolio
         result = PortfolioService.optimize_portfolio(
             user_id,
             data['risk_category'],
             Decimal(str(data['investment_amount'])),
-            goals
+            goals,
+            risk_score=risk_profile.risk_score if risk_profile else None,
+            behavioral_data=behavioral_metrics.to_dict() if behavioral_metrics else None,
+            current_allocation=current_allocation or None,
+            max_turnover=max_turnover
         )
         
         return jsonify(result), 200
@@ -106,27 +126,75 @@ def rebalance_portfolio():
         if 'user_id' in data and data['user_id'] != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        portfolio = Portfolio.query.filter_by(user_id=user_id).first()
-        if not portfolio:
+        snapshot = PortfolioSnapshot.load(user_id=user_id)
+        if not snapshot:
             return jsonify({'error': 'Portfolio not found'}), 404
         
-        holdings = Holding.query.filter_by(portfolio_id=portfolio.id).all()
         target_allocation = data.get('target_allocation', {})
         
+        if data.get('mode', 'threshold') == 'optimized':
+            if not target_allocation or abs(sum(float(v) for v in target_allocation.values()) - 1.0) > 0.01:
+                return jsonify({'error': 'target_allocation weights must sum to 1'}), 400
+            tolerance = data.get('tolerance', Config.REBALANCE_TOLERANCE)
+            if not isinstance(tolerance, (int, float)) or not 0 <= tolerance < 1:
+                return jsonify({'error': 'tolerance must be between 0 and 1'}), 400
+            lot_sizes = data.get('lot_sizes') or {}
+            if any(not isinstance(lot, (int, float)) or lot <= 0 for lot in lot_sizes.values()):
+                return jsonify({'error': 'lot_sizes must be positive numbers'}), 400
+            try:
+                trades, summary = RebalanceEngine.plan(snapshot.holdings, target_allocation, tolerance, lot_sizes)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'mode': 'optimized',
+                'recommendations': trades,
+                'summary': summary,
+                'current_value': float(snapshot.total_value)
+            }), 200
+        
         recommendations = PortfolioService.rebalance_portfolio(
-            holdings,
+            snapshot.holdings,
             target_allocation,
-            float(portfolio.total_value)
+            float(snapshot.total_value)
         )
         
         return jsonify({
             'recommendations': recommendations,
-            'current_value': float(portfolio.total_value)
+            'current_value': float(snapshot.total_value)
         }), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@portfolio_bp.route('/backtest', methods=['POST'])
+@jwt_required()
+def backtest_allocations():
+    """Backtest optimizer and custom allocations over asset class price history"""
+    try:
+        data = request.get_json() or {}
+        
+        strategies = data.get('strategies') or []
+        if not isinstance(strategies, list) or not all(isinstance(strategy, dict) for strategy in strategies):
+            return jsonify({'error': 'strategies must be a list of objects'}), 400
+        rebalance = data.get('rebalance') or ['quarterly']
+        if isinstance(rebalance, str):
+            rebalance = [rebalance]
+        
+        try:
+            start = date.fromisoformat(data['start']) if data.get('start') else None
+            end = date.fromisoformat(data['end']) if data.get('end') else None
+            result = BacktestEngine.run(
+                strategies, rebalance=list(rebalance), start=start, end=end,
+                include_costs=bool(data.get('include_costs', True))
+            )
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(result), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @portfolio_bp.route('/performance/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_portfolio_performance(user_id):
@@ -136,14 +204,111 @@ def get_portfolio_performance(user_id):
         if current_user_id != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        portfolio = Portfolio.query.filter_by(user_id=user_id).first()
+        snapshot = PortfolioSnapshot.load(user_id=user_id)
+        if not snapshot:
+            return jsonify({'error': 'Portfolio not found'}), 404
+        
+        return jsonify(snapshot.performance()), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portfolio_bp.route('/household/<int:user_id>', methods=['GET'])
+@jwt_required()
+def get_household(user_id):
+    """Get totals and allocation across all of the user's portfolios"""
+    try:
+        current_user_id = get_jwt_identity()
+        if current_user_id != user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        household = HouseholdService.household(user_id)
+        if not household:
+            return jsonify({'error': 'Portfolio not found'}), 404
+        
+        return jsonify(household), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portfolio_bp.route('/returns/<int:user_id>', methods=['GET'])
+@jwt_required()
+def get_portfolio_returns(user_id):
+    """Get time-weighted return and XIRR from NAV history"""
+    try:
+        current_user_id = get_jwt_identity()
+        if current_user_id != user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        try:
+            start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+        except ValueError:
+            return jsonify({'error': 'start and end must be YYYY-MM-DD dates'}), 400
+        if start and end and start > end:
+            return jsonify({'error': 'start must not be after end'}), 400
+        
+        portfolio = Portfolio.query.filter_by(user_id=user_id).order_by(Portfolio.id).first()
         if not portfolio:
             return jsonify({'error': 'Portfolio not found'}), 404
         
-        holdings = Holding.query.filter_by(portfolio_id=portfolio.id).all()
-        performance = PortfolioService.calculate_portfolio_performance(holdings)
+        return jsonify(ReturnsService.portfolio_returns(user_id, portfolio.id, start, end)), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portfolio_bp.route('/risk/<int:user_id>', methods=['GET'])
+@jwt_required()
+def get_portfolio_risk(user_id):
+    """Get 1-day and 10-day VaR and CVaR"""
+    try:
+        current_user_id = get_jwt_identity()
+        if current_user_id != user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        method = request.args.get('method')
+        if method and method not in RISK_METHODS:
+            return jsonify({'error': f"method must be one of {', '.join(RISK_METHODS)}"}), 400
         
-        return jsonify(performance), 200
+        portfolio = Portfolio.query.filter_by(user_id=user_id).order_by(Portfolio.id).first()
+        if not portfolio:
+            return jsonify({'error': 'Portfolio not found'}), 404
+        
+        try:
+            report = RiskEngine.portfolio_risk(portfolio.id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 503
+        if method:
+            report['methods'] = {method: report['methods'][method]}
+        
+        return jsonify(report), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portfolio_bp.route('/exposure/<int:user_id>', methods=['GET'])
+@jwt_required()
+def get_portfolio_exposure(user_id):
+    """Get beta, alpha and tracking error against NIFTY 50, SENSEX and NIFTY BANK"""
+    try:
+        current_user_id = get_jwt_identity()
+        if current_user_id != user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        query = db.session.query(Portfolio.id).filter_by(user_id=user_id)
+        portfolio_id = request.args.get('portfolio_id', type=int)
+        if portfolio_id is not None:
+            query = query.filter_by(id=portfolio_id)
+        portfolio_ids = [row[0] for row in query.order_by(Portfolio.id).all()]
+        if not portfolio_ids:
+            return jsonify({'error': 'Portfolio not found'}), 404
+        
+        try:
+            result = ExposureService.portfolio_exposures(user_id, portfolio_ids)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 503
+        
+        return jsonify(result), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -174,11 +339,14 @@ def add_holding():
         
         if holding:
             # Update existing holding
+            previous_value, previous_cost = holding.totals()
             holding.quantity = Decimal(str(data['quantity']))
             holding.current_price = Decimal(str(data['current_price']))
             holding.purchase_price = Decimal(str(data['purchase_price']))
             holding.allocation = Decimal(str(data.get('allocation', 0)))
             holding.ai_recommendation = data.get('ai_recommendation')
+            value, cost = holding.totals()
+            Portfolio.apply_delta(portfolio.id, value - previous_value, cost - previous_cost)
         else:
             # Create new holding
             holding = Holding(
@@ -192,12 +360,15 @@ def add_holding():
                 ai_recommendation=data.get('ai_recommendation')
             )
             db.session.add(holding)
+            Portfolio.apply_delta(portfolio.id, *holding.totals())
         
         db.session.commit()
         
         # Clear cache
         cache_key = f'portfolio:{user_id}'
-        cache_delete(cache_key)
+        cache_delete_many([
+            cache_key, household_cache_key(user_id), risk_cache_key(portfolio.id), exposure_cache_key(portfolio.id)
+        ])
         
         return jsonify({
             'message': 'Holding added/updated successfully',
@@ -208,6 +379,60 @@ def add_holding():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# Statement formats accepted by content type or file extension
+IMPORT_FORMATS = {
+    'text/csv': 'csv', 'application/csv': 'csv',
+    'application/x-ndjson': 'ndjson', 'application/ndjson': 'ndjson', 'application/jsonl': 'ndjson',
+    '.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'
+}
+
+@portfolio_bp.route('/holdings/import', methods=['POST'])
+@jwt_required()
+def import_holdings():
+    """Bulk add or update holdings from a CSV or NDJSON statement"""
+    try:
+        user_id = get_jwt_identity()
+        portfolio_id = request.args.get('portfolio_id', type=int)
+        
+        query = Portfolio.query.filter_by(user_id=user_id)
+        if portfolio_id is not None:
+            query = query.filter_by(id=portfolio_id)
+        portfolio = query.order_by(Portfolio.id).first()
+        if not portfolio:
+            return jsonify({'error': 'Portfolio not found'}), 404
+        
+        # Raw statement body, or a multipart upload in the `file` field
+        upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+        if upload:
+            stream = upload.stream
+            extension = '.' + upload.filename.rsplit('.', 1)[-1].lower() if '.' in (upload.filename or '') else ''
+            statement_format = request.args.get('format') or IMPORT_FORMATS.get(extension)
+        else:
+            stream = request.stream
+            statement_format = request.args.get('format') or IMPORT_FORMATS.get(request.mimetype)
+        if statement_format not in IMPORT_FORMAT_NAMES:
+            return jsonify({'error': 'Statement must be CSV or NDJSON (set format=csv or format=ndjson)'}), 400
+        
+        try:
+            summary = HoldingsImporter.import_records(portfolio.id, HoldingsImporter.records(stream, statement_format))
+        except (UnicodeDecodeError, csv.Error) as e:
+            db.session.rollback()
+            return jsonify({'error': f'Unreadable statement: {e}'}), 400
+        
+        db.session.commit()
+        
+        # Clear cache
+        cache_key = f'portfolio:{user_id}'
+        cache_delete_many([
+            cache_key, household_cache_key(user_id), risk_cache_key(portfolio.id), exposure_cache_key(portfolio.id)
+        ])
+        
+        return jsonify({'portfolio_id': portfolio.id, **summary}), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @portfolio_bp.route('/holdings/<int:holding_id>', methods=['DELETE'])
 @jwt_required()
 def delete_holding(holding_id):
@@ -223,12 +448,17 @@ def delete_holding(holding_id):
         if portfolio.user_id != user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
+        value, cost = holding.totals()
         db.session.delete(holding)
+        Portfolio.apply_delta(portfolio.id, -value, -cost)
         db.session.commit()
         
         # Clear cache
         cache_key = f'portfolio:{portfolio.user_id}'
-        cache_delete(cache_key)
+        cache_delete_many([
+            cache_key, household_cache_key(portfolio.user_id), risk_cache_key(portfolio.id),
+            exposure_cache_key(portfolio.id)
+        ])
         
         return jsonify({'message': 'Holding deleted successfully'}), 200
     
@@ -63,6 +63,10 @@ def create_app(config_class=Config):
     app.register_blueprint(education_bp, url_prefix='/api/education')
     app.register_blueprint(news_bp, url_prefix='/api/news')
     
+    # Batch job commands
+    from commands import register_commands
+    register_commands(app)
+    
     # Setup logging
     if not app.debug:
         if not os.path.exists('logs'):
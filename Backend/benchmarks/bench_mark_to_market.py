@@ -0,0 +1,95 @@
+"""
+Benchmark for the set-based mark-to-market sweep
+Run this with: python benchmarks/bench_mark_to_market.py --holdings 1000000
+
+Seeds users, portfolios and holdings into a scratch database (a temporary
+SQLite file unless --database-url is given), then reprices every asset in
+one MarkToMarketService.apply_prices call.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark set-based mark-to-market')
+    parser.add_argument('--holdings', type=int, default=200_000)
+    parser.add_argument('--per-portfolio', type=int, default=10, help='Holdings per portfolio')
+    parser.add_argument('--assets', type=int, default=2_000, help='Distinct asset names')
+    parser.add_argument('--database-url', help='Scratch database (its tables are created and filled)')
+    return parser.parse_args()
+
+
+def seed(db, holdings, per_portfolio, assets, rng):
+    """Bulk insert rows through Core so seeding is not what gets measured"""
+    from models.user import User
+    from models.portfolio import Portfolio, Holding
+
+    portfolios = -(-holdings // per_portfolio)
+    now = datetime.utcnow()
+    connection = db.session.connection()
+    connection.execute(User.__table__.insert(), [
+        {'id': i, 'email': f'bench{i}@example.com', 'password_hash': '-', 'first_name': 'Bench',
+         'last_name': str(i), 'is_verified': False, 'created_at': now, 'updated_at': now}
+        for i in range(1, portfolios + 1)
+    ])
+    connection.execute(Portfolio.__table__.insert(), [
+        {'id': i, 'user_id': i, 'total_value': 0, 'total_gain_loss': 0, 'total_gain_loss_percent': 0,
+         'last_updated': now}
+        for i in range(1, portfolios + 1)
+    ])
+    # Consecutive asset ids from a random offset: distinct within each portfolio
+    position = np.arange(holdings)
+    names = (rng.integers(0, assets, portfolios)[position // per_portfolio] + position % per_portfolio) % assets
+    quantity = rng.integers(1, 1_000_000, holdings) / 10_000
+    purchase = rng.integers(1_000, 500_000, holdings) / 100
+    rows = [
+        {'portfolio_id': i // per_portfolio + 1, 'asset_type': 'equity', 'asset_name': f'ASSET{names[i]}',
+         'quantity': float(quantity[i]), 'current_price': float(purchase[i]),
+         'purchase_price': float(purchase[i]), 'allocation': 0, 'last_updated': now}
+        for i in range(holdings)
+    ]
+    for start in range(0, len(rows), 50_000):
+        connection.execute(Holding.__table__.insert(), rows[start:start + 50_000])
+    db.session.commit()
+    return portfolios
+
+
+def main():
+    args = parse_args()
+    scratch = tempfile.mkdtemp(prefix='mtm-bench-')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app import create_app
+    from config import Config
+    from extensions import db
+    from services.mark_to_market import MarkToMarketService
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_url or f'sqlite:///{os.path.join(scratch, "bench.db")}'
+        SQLALCHEMY_ECHO = False
+
+    app = create_app(BenchConfig)
+    rng = np.random.default_rng(11)
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        portfolios = seed(db, args.holdings, args.per_portfolio, args.assets, rng)
+        print(f'Seeded {args.holdings} holdings in {portfolios} portfolios '
+              f'in {time.perf_counter() - start:.1f} s')
+
+        prices = {f'ASSET{i}': round(float(rng.uniform(10, 5000)), 2) for i in range(args.assets)}
+        summary = MarkToMarketService.apply_prices(prices)
+        print(f"Repriced {summary['holdings']} holdings and {summary['portfolios']} portfolios "
+              f"from {summary['prices']} prices in {summary['elapsed_ms'] / 1000:.2f} s "
+              f"({summary['holdings'] / max(summary['elapsed_ms'], 1e-9) * 1000:,.0f} holdings/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark for turnover-limited optimization of existing portfolios
+Run this with: python benchmarks/bench_portfolio_optimizer.py
+
+Optimizes random current allocations against warm frontiers and checks that
+every result stays within its category bounds and behavioral equity cap,
+and within max_turnover unless the bounds alone require more.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+# Scratch frontier cache and an empty price store, so the default risk model is used
+Config.FRONTIER_CACHE_DIR = tempfile.mkdtemp()
+Config.OHLCV_STORE_DIR = tempfile.mkdtemp()
+
+from services.portfolio_optimizer import ASSET_CLASSES, PortfolioOptimizer
+
+CASES = 2000
+SEED = 11
+CATEGORIES = ('conservative', 'moderate', 'aggressive')
+# Behavioral data cutting the equity ceiling by 0, 0.05 and 0.15
+BEHAVIORS = (None, {'portfolio_check_frequency': 10},
+             {'portfolio_check_frequency': 10, 'major_life_event_occurred': True})
+EPSILON = 5e-5  # allocations and turnover are rounded to 4 places
+
+
+def violations(result, category, behavior, current, max_turnover):
+    """Constraint breaches of one optimize() result, as messages"""
+    cap = PortfolioOptimizer.equity_cap_reduction(behavior)
+    lower, upper = PortfolioOptimizer.bounds(category, ASSET_CLASSES, cap)
+    weights = np.array([result['allocation'][asset] for asset in ASSET_CLASSES])
+    optimization = result['optimization']
+    problems = []
+    if np.any(weights < lower - EPSILON) or np.any(weights > upper + EPSILON):
+        problems.append(f'outside bounds: {result["allocation"]}')
+    if abs(weights.sum() - 1.0) > len(ASSET_CLASSES) * EPSILON:
+        problems.append(f'not fully invested: {weights.sum():.6f}')
+    if optimization['turnover'] > max_turnover + EPSILON and not optimization['turnover_exceeded']:
+        problems.append(f'turnover {optimization["turnover"]} above {max_turnover} without turnover_exceeded')
+    current = np.array([current.get(asset, 0.0) for asset in ASSET_CLASSES])
+    if optimization['turnover_exceeded'] and np.all(current >= lower) and np.all(current <= upper):
+        problems.append('turnover_exceeded for an allocation already within bounds')
+    return problems
+
+
+def run_benchmark():
+    print("=" * 60)
+    print("Portfolio Optimizer Turnover Benchmark")
+    print("=" * 60)
+    failures = []
+
+    # Regression: a conservative, behaviorally capped profile fully in equity
+    behavior = BEHAVIORS[1]
+    current = {'equity': 1.0}
+    result = PortfolioOptimizer.optimize('conservative', behavioral_data=behavior,
+                                         current_allocation=current, max_turnover=0.30)
+    failures += violations(result, 'conservative', behavior, current, 0.30)
+    if not result['optimization']['turnover_exceeded']:
+        failures.append('100% equity under a conservative cap did not report turnover_exceeded')
+
+    rng = np.random.default_rng(SEED)
+    for category in CATEGORIES:
+        for behavior in BEHAVIORS:
+            PortfolioOptimizer.optimize(category, behavioral_data=behavior)  # build the frontier
+    cases = [
+        (CATEGORIES[rng.integers(len(CATEGORIES))], BEHAVIORS[rng.integers(len(BEHAVIORS))],
+         dict(zip(ASSET_CLASSES, rng.dirichlet(np.full(len(ASSET_CLASSES), 0.5)))),
+         float(rng.choice((0.05, 0.1, 0.3, 1.0))))
+        for _ in range(CASES)
+    ]
+    limited = exceeded = 0
+    start = time.perf_counter()
+    results = [
+        PortfolioOptimizer.optimize(category, behavioral_data=behavior, current_allocation=current,
+                                    max_turnover=max_turnover)
+        for category, behavior, current, max_turnover in cases
+    ]
+    seconds = time.perf_counter() - start
+    for case, result in zip(cases, results):
+        failures += violations(result, *case)
+        limited += result['optimization']['turnover_limited']
+        exceeded += result['optimization']['turnover_exceeded']
+
+    print(f"{CASES:,} random current allocations")
+    print(f"  Warm optimize:         {seconds / CASES * 1000:9.3f} ms per call")
+    print(f"  Turnover limited:      {limited:9,}")
+    print(f"  Bounds above the cap:  {exceeded:9,}")
+    for problem in failures[:10]:
+        print(f"  ❌ {problem}")
+    print(f"  {'✅ Every result within bounds and turnover' if not failures else f'❌ {len(failures)} violations'}")
+    return not failures
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,87 @@
+"""
+Benchmark for the fixed-point valuation engine against the Decimal loop
+Run this with: python benchmarks/bench_valuation_engine.py
+
+Checks that both paths return identical figures at 10k and 1M holdings.
+"""
+
+import os
+import sys
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.valuation_engine import ValuationEngine, performance_figures
+
+SIZES = (10_000, 1_000_000)
+
+
+def synthetic_holdings(count, seed=7):
+    """Holdings with Decimal columns, as SQLAlchemy returns them"""
+    rng = np.random.default_rng(seed)
+    quantity = rng.integers(1, 50_000_000, count)  # 1e-4 units
+    current = rng.integers(100, 5_000_000, count)  # paise
+    purchase = rng.integers(100, 5_000_000, count)
+    return [
+        SimpleNamespace(
+            quantity=Decimal(int(q)).scaleb(-4),
+            current_price=Decimal(int(c)).scaleb(-2),
+            purchase_price=Decimal(int(p)).scaleb(-2)
+        )
+        for q, c, p in zip(quantity, current, purchase)
+    ], (quantity, current, purchase)
+
+
+def decimal_performance(holdings):
+    """The original per-holding Decimal loop"""
+    total_value = Decimal('0.00')
+    total_cost = Decimal('0.00')
+    for holding in holdings:
+        current_value = Decimal(str(holding.quantity)) * Decimal(str(holding.current_price))
+        cost_basis = Decimal(str(holding.quantity)) * Decimal(str(holding.purchase_price))
+        total_value += current_value
+        total_cost += cost_basis
+    total_gain_loss = total_value - total_cost
+    total_gain_loss_percent = (total_gain_loss / total_cost * 100) if total_cost > 0 else Decimal('0.00')
+    return {
+        'total_value': float(total_value),
+        'total_cost': float(total_cost),
+        'total_gain_loss': float(total_gain_loss),
+        'total_gain_loss_percent': float(total_gain_loss_percent)
+    }
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark():
+    print("=" * 60)
+    print("Valuation Engine Benchmark")
+    print("=" * 60)
+    all_match = True
+    for size in SIZES:
+        holdings, columns = synthetic_holdings(size)
+        expected, decimal_seconds = timed(decimal_performance, holdings)
+        from_objects, object_seconds = timed(ValuationEngine.performance, holdings)
+        from_columns, column_seconds = timed(
+            lambda: performance_figures(*ValuationEngine.totals(*columns))
+        )
+        match = expected == from_objects == from_columns
+        all_match = all_match and match
+        print(f"{size:>9,} holdings")
+        print(f"  Decimal loop:          {decimal_seconds * 1000:9.1f} ms")
+        print(f"  Engine from objects:   {object_seconds * 1000:9.1f} ms ({decimal_seconds / object_seconds:.1f}x)")
+        print(f"  Engine from int cols:  {column_seconds * 1000:9.1f} ms ({decimal_seconds / column_seconds:.0f}x)")
+        print(f"  {'✅ Identical figures' if match else '❌ Figures differ'}")
+    return all_match
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_benchmark() else 1)
@@ -4,7 +4,7 @@ Quick script to check database connection and table creation
 
 from app import create_app
 from extensions import db
-from models import User, RiskProfile, Portfolio, Holding, Transaction, KYCDocument, Goal, BehavioralMetrics, AIInsight, EducationProgress, MarketFeatures, SentimentAnalysis
+from models import User, RiskProfile, Portfolio, Holding, Transaction, KYCDocument, Goal, BehavioralMetrics, AIInsight, EducationProgress, MarketFeatures, SentimentAnalysis, PortfolioNAV
 
 def check_database():
     """Check database connection and tables"""
@@ -36,7 +36,7 @@ def check_database():
             'users', 'risk_profiles', 'portfolios', 'holdings',
             'transactions', 'kyc_documents', 'goals', 'behavioral_metrics',
             'ai_insights', 'education_progress', 'market_features',
-            'sentiment_analysis'
+            'sentiment_analysis', 'portfolio_navs', 'portfolio_drifts'
         ]
         
         missing_tables = []
@@ -0,0 +1,84 @@
+"""
+Flask CLI commands for batch jobs
+Run these with: flask --app run.py <command>
+"""
+
+import csv
+import json
+from datetime import date
+
+import click
+
+
+def read_prices(path):
+    """(asset_name, price) pairs from a CSV with those columns or a JSON object"""
+    with open(path, newline='') as stream:
+        if path.endswith('.json'):
+            return list(json.load(stream).items())
+        return [(row['asset_name'], row['price']) for row in csv.DictReader(stream)]
+
+
+def register_commands(app):
+    """Attach the batch job commands to the app's CLI"""
+
+    @app.cli.command('mark-to-market')
+    @click.argument('prices_file', type=click.Path(exists=True, dir_okay=False))
+    def mark_to_market(prices_file):
+        """Reprice all holdings from a CSV (asset_name,price) or JSON prices file."""
+        from services.mark_to_market import MarkToMarketService
+
+        summary = MarkToMarketService.apply_prices(read_prices(prices_file))
+        click.echo(
+            f"Repriced {summary['holdings']} holdings in {summary['portfolios']} portfolios "
+            f"from {summary['prices']} prices in {summary.get('elapsed_ms', 0)} ms"
+        )
+
+    @app.cli.command('reconcile-portfolios')
+    @click.option('--fix', is_flag=True, help='Rewrite drifted aggregates from the holdings')
+    @click.option('--tolerance', type=float, default=None, help='Rupees of drift to ignore')
+    def reconcile_portfolios(fix, tolerance):
+        """Check stored portfolio aggregates against their holdings."""
+        from services.portfolio_reconciler import PortfolioReconciler
+
+        report = PortfolioReconciler.check(fix=fix, tolerance=tolerance)
+        for row in report['portfolios']:
+            click.echo(
+                f"portfolio {row['portfolio_id']}: value {row['stored_value']} != {row['expected_value']}, "
+                f"gain/loss {row['stored_gain_loss']} != {row['expected_gain_loss']}"
+            )
+        click.echo(f"Checked {report['checked']} portfolios, {report['drifted']} drifted, {report['fixed']} fixed")
+
+    @app.cli.command('snapshot-nav')
+    @click.option('--date', 'day', default=None, help='Snapshot date (YYYY-MM-DD, default today UTC)')
+    def snapshot_nav(day):
+        """Record one NAV row per portfolio for the day."""
+        from services.returns_service import ReturnsService
+
+        count = ReturnsService.snapshot_navs(date.fromisoformat(day) if day else None)
+        click.echo(f'Recorded {count} portfolio NAV rows')
+
+    @app.cli.command('score-risk')
+    def score_risk():
+        """Recompute and cache VaR/CVaR for every portfolio."""
+        from services.risk_engine import RiskEngine
+
+        summary = RiskEngine.score_all()
+        click.echo(
+            f"Scored {summary['portfolios']} portfolios against scenarios as of {summary['as_of']} "
+            f"in {summary['elapsed_ms']} ms"
+        )
+
+    @app.cli.command('scan-drift')
+    @click.option('--threshold', type=float, default=None,
+                  help='Alert above this absolute weight drift (defaults to REBALANCE_TOLERANCE).')
+    def scan_drift(threshold):
+        """Measure every portfolio's allocation drift and record rebalancing insights."""
+        from services.drift_scanner import DriftScanner
+
+        summary = DriftScanner.scan(threshold)
+        click.echo(
+            f"Scanned {summary['portfolios']} portfolios "
+            f"({summary['changed']} changed, {summary['removed']} cleared): "
+            f"{summary['insights']} new insights above {summary['threshold']:.1%} drift "
+            f"in {summary['elapsed_ms']} ms"
+        )
@@ -41,6 +41,19 @@ class Config:
     CACHE_TTL_PORTFOLIO = 300  # 5 minutes
     CACHE_TTL_MARKET = 60  # 1 minute
     CACHE_TTL_RISK_PROFILE = 3600  # 1 hour
+    CACHE_TTL_PREDICTIONS_STALE = 3600  # serve stale predictions for up to 1 hour
+    CACHE_TTL_PORTFOLIO_RISK = 86400  # 1 day, refreshed by the nightly score-risk run
+    CACHE_TTL_PORTFOLIO_EXPOSURE = 86400  # 1 day; keys are also dated, so a new day recomputes
+    
+    # Prediction cache refresh
+    PREDICTION_REFRESH_TOP_N = 50  # most requested symbols kept warm
+    PREDICTION_REFRESH_INTERVAL = 15  # seconds between proactive refresh sweeps
+    PREDICTION_REFRESH_AHEAD = 10  # refresh this many seconds before expiry
+    
+    # Market indices stream (Server-Sent Events)
+    MARKET_STREAM_INTERVAL = 5  # seconds between shared polls
+    MARKET_STREAM_MAX_PENDING = 32  # frames a slow client may lag before it is dropped
+    MARKET_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
     
     # AI Model Paths (update these with actual model paths)
     MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
@@ -49,6 +62,47 @@ class Config:
     CATBOOST_MODEL_PATH = os.path.join(MODELS_DIR, 'catboost_model')
     ROBERTA_MODEL_PATH = os.path.join(MODELS_DIR, 'roberta_model')
     
+    # Market data storage
+    OHLCV_STORE_DIR = os.environ.get('OHLCV_STORE_DIR') or \
+        os.path.join(os.path.dirname(__file__), 'data', 'ohlcv')
+    
+    # Risk models
+    COVARIANCE_WINDOW = 252  # daily returns per rolling covariance estimate
+    RISK_FREE_RATE = 0.065  # annual, for Sharpe ratios
+    PORTFOLIO_DRIFT_TOLERANCE = 0.05  # rupees of aggregate drift tolerated before a repair
+    REBALANCE_TOLERANCE = 0.05  # absolute weight band around each target asset class weight
+    REBALANCE_BROKERAGE_RATE = 0.0003  # brokerage as a fraction of order value...
+    REBALANCE_BROKERAGE_CAP = 20.0  # ...capped per order, in rupees
+    REBALANCE_STT_RATES = {'equity': 0.001, 'international': 0.001}  # securities transaction tax by asset type
+    DRIFT_SCAN_BATCH_SIZE = 10000  # portfolios upserted and alerted per commit in the nightly drift scan
+    VAR_CONFIDENCE_LEVELS = (0.95, 0.99)
+    VAR_HORIZONS = (1, 10)  # trading days
+    VAR_HISTORY_DAYS = 1000  # daily proxy returns in the historical scenario set
+    VAR_SIMULATIONS = 10000  # Monte Carlo scenarios shared by every portfolio
+    VAR_SEED = 29
+    VAR_BATCH_SIZE = 500  # portfolios per scenario matrix product
+    EXPOSURE_WINDOW = 252  # daily returns per benchmark regression
+    GOAL_SIMULATION_PATHS = 10000  # Monte Carlo return paths per goal
+    GOAL_SIMULATION_BLOCK_MONTHS = 600  # longer horizons are simulated in consecutive blocks of this many months
+    GOAL_SIMULATION_SEED = 41
+    BACKTEST_MAX_VARIANTS = 5000  # (strategy, rebalance frequency) pairs per backtest
+    OPTIMIZER_MAX_TURNOVER = 0.30  # one-way turnover allowed per optimization of an existing portfolio
+    FRONTIER_CACHE_DIR = os.environ.get('FRONTIER_CACHE_DIR') or \
+        os.path.join(os.path.dirname(__file__), 'data', 'frontiers')
+    # Exchange-traded proxy whose price history stands in for each asset class
+    ASSET_CLASS_PROXIES = {
+        'equity': 'NIFTYBEES',
+        'debt': 'GILT5YBEES',
+        'gold': 'GOLDBEES',
+        'international': 'MON100'
+    }
+    # Price history symbols of the indices reported by MarketService.get_market_indices
+    BENCHMARK_SYMBOLS = {
+        'nifty_50': 'NIFTY50',
+        'sensex': 'SENSEX',
+        'nifty_bank': 'NIFTYBANK'
+    }
+    
     # External APIs
     MARKET_DATA_API_KEY = os.environ.get('MARKET_DATA_API_KEY', '')
     NEWS_SCRAPER_ENABLED = True
@@ -59,6 +113,15 @@ class Config:
     # Pagination
     ITEMS_PER_PAGE = 20
     
+    # Batch endpoints
+    MARKET_BATCH_MAX_SYMBOLS = 200
+    HOLDINGS_IMPORT_CHUNK_SIZE = 500  # statement rows per upsert
+    HOLDINGS_IMPORT_MAX_ERRORS = 1000  # row errors listed in an import response; the rest are only counted
+    
+    # Stock screener
+    SCREENER_RELOAD_CHECK_INTERVAL = 30  # seconds between checks for a new day's features
+    SCREENER_MAX_RESULTS = 500
+    
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
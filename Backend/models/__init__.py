@@ -6,6 +6,8 @@ from .user import User
 from .kyc import KYCDocument
 from .risk_profile import RiskProfile
 from .portfolio import Portfolio, Holding
+from .portfolio_nav import PortfolioNAV
+from .portfolio_drift import PortfolioDrift
 from .transaction import Transaction
 from .ai_insight import AIInsight
 from .education import EducationProgress
@@ -20,6 +22,8 @@ __all__ = [
     'RiskProfile',
     'Portfolio',
     'Holding',
+    'PortfolioNAV',
+    'PortfolioDrift',
     'Transaction',
     'AIInsight',
     'EducationProgress',
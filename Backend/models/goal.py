@@ -15,6 +15,7 @@ class Goal(db.Model):
     target_amount = db.Column(db.Numeric(15, 2), nullable=False)
     target_date = db.Column(db.Date, nullable=False)
     current_amount = db.Column(db.Numeric(15, 2), default=Decimal('0.00'), nullable=False)
+    monthly_contribution = db.Column(db.Numeric(15, 2), default=Decimal('0.00'), nullable=False)
     goal_type = db.Column(db.String(50), nullable=False)  # retirement, education, house, etc.
     priority = db.Column(db.String(20), nullable=True)  # high, medium, low
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -29,6 +30,7 @@ class Goal(db.Model):
             'target_amount': float(self.target_amount) if self.target_amount else 0.0,
             'target_date': self.target_date.isoformat() if self.target_date else None,
             'current_amount': float(self.current_amount) if self.current_amount else 0.0,
+            'monthly_contribution': float(self.monthly_contribution) if self.monthly_contribution else 0.0,
             'goal_type': self.goal_type,
             'priority': self.priority,
             'progress_percent': float((self.current_amount / self.target_amount * 100)) if self.target_amount and self.target_amount > 0 else 0.0,
@@ -4,6 +4,10 @@ Market Features model (Project 29)
 
 from extensions import db
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# Payload columns refreshed when a (date, symbol) row already exists
+UPSERT_COLUMNS = ('technical_indicators', 'market_sentiment', 'volatility_metrics', 'volume_analysis')
 
 class MarketFeatures(db.Model):
     __tablename__ = 'market_features'
@@ -21,6 +25,29 @@ class MarketFeatures(db.Model):
         db.UniqueConstraint('date', 'symbol', name='unique_date_symbol'),
     )
     
+    @classmethod
+    def bulk_upsert(cls, payloads, day):
+        """
+        Insert or refresh one row per indicator payload for `day` in a single
+        statement. The caller owns the transaction.
+        """
+        if not payloads:
+            return 0
+        now = datetime.utcnow()
+        rows = [{
+            'date': day,
+            'symbol': payload['symbol'],
+            **{column: payload.get(column) for column in UPSERT_COLUMNS},
+            'created_at': now
+        } for payload in payloads]
+        stmt = pg_insert(cls.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['date', 'symbol'],
+            set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS}
+        )
+        db.session.execute(stmt)
+        return len(rows)
+    
     def to_dict(self):
         """Convert market features to dictionary"""
         return {
@@ -4,7 +4,12 @@ Portfolio and Holdings models
 
 from extensions import db
 from datetime import datetime
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# Statement columns refreshed when a (portfolio_id, asset_name) holding already exists
+UPSERT_COLUMNS = ('asset_type', 'quantity', 'current_price', 'purchase_price', 'allocation', 'ai_recommendation', 'last_updated')
 
 class Portfolio(db.Model):
     __tablename__ = 'portfolios'
@@ -19,6 +24,39 @@ class Portfolio(db.Model):
     # Relationships
     holdings = db.relationship('Holding', backref='portfolio', lazy='dynamic', cascade='all, delete-orphan')
     
+    @classmethod
+    def apply_delta(cls, portfolio_id, value_delta, cost_delta):
+        """
+        Shift the stored aggregates by a change in holdings value and cost
+        basis in one atomic UPDATE. The caller owns the transaction.
+        """
+        value_delta = Decimal(value_delta)
+        cost_delta = Decimal(cost_delta)
+        if not value_delta and not cost_delta:
+            return
+        value = cls.total_value + value_delta
+        gain_loss = cls.total_gain_loss + (value_delta - cost_delta)
+        cost = value - gain_loss
+        db.session.execute(
+            update(cls).where(cls.id == portfolio_id).values(
+                total_value=value,
+                total_gain_loss=gain_loss,
+                total_gain_loss_percent=case((cost > 0, gain_loss * 100 / cost), else_=0),
+                last_updated=datetime.utcnow()
+            ).execution_options(synchronize_session=False)
+        )
+    
+    def performance(self):
+        """Performance metrics from the stored aggregates"""
+        total_value = float(self.total_value or 0)
+        total_gain_loss = float(self.total_gain_loss or 0)
+        return {
+            'total_value': total_value,
+            'total_cost': round(total_value - total_gain_loss, 2),
+            'total_gain_loss': total_gain_loss,
+            'total_gain_loss_percent': float(self.total_gain_loss_percent or 0)
+        }
+    
     def to_dict(self):
         """Convert portfolio to dictionary"""
         return {
@@ -49,8 +87,67 @@ class Holding(db.Model):
     ai_recommendation = db.Column(db.String(20), nullable=True)  # buy, hold, sell
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
-    def to_dict(self):
-        """Convert holding to dictionary"""
+    __table_args__ = (
+        db.UniqueConstraint('portfolio_id', 'asset_name', name='unique_portfolio_asset'),
+    )
+    
+    @classmethod
+    def bulk_upsert(cls, portfolio_id, rows):
+        """
+        Insert or update one holding per row (unique asset names, values at
+        column precision) in a single statement and shift the portfolio
+        aggregates by the change. Returns (inserted, updated). The caller
+        owns the transaction.
+        """
+        if not rows:
+            return 0, 0
+        table = cls.__table__
+        previous = db.session.execute(
+            select(table.c.asset_name, table.c.quantity, table.c.current_price, table.c.purchase_price).where(
+                table.c.portfolio_id == portfolio_id,
+                table.c.asset_name.in_([row['asset_name'] for row in rows])
+            )
+        ).all()
+        value_delta = cost_delta = Decimal('0')
+        for row in previous:
+            value, cost = cls.totals(row)
+            value_delta -= value
+            cost_delta -= cost
+        for row in rows:
+            value_delta += row['quantity'] * row['current_price']
+            cost_delta += row['quantity'] * row['purchase_price']
+        
+        # Executemany form: compiled once and cached, sent as multi-row batches
+        now = datetime.utcnow()
+        stmt = pg_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['portfolio_id', 'asset_name'],
+            set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS}
+        )
+        db.session.execute(stmt, [{'portfolio_id': portfolio_id, **row, 'last_updated': now} for row in rows])
+        Portfolio.apply_delta(portfolio_id, value_delta, cost_delta)
+        return len(rows) - len(previous), len(previous)
+    
+    def totals(self):
+        """(current value, cost basis) as Decimals, at the precision the columns store"""
+        quantity = Decimal(self.quantity or 0).quantize(Decimal('0.0001'), ROUND_HALF_UP)
+        current_price = Decimal(self.current_price or 0).quantize(Decimal('0.01'), ROUND_HALF_UP)
+        purchase_price = Decimal(self.purchase_price or 0).quantize(Decimal('0.01'), ROUND_HALF_UP)
+        return quantity * current_price, quantity * purchase_price
+    
+    def to_dict(self, valuation=None):
+        """
+        Convert holding to dictionary
+        `valuation` is a precomputed (current_value, gain_loss, gain_loss_percent)
+        from ValuationEngine.holding_values for bulk serialization.
+        """
+        if valuation is not None:
+            current_value, gain_loss, gain_loss_percent = valuation
+        else:
+            current_value = float(self.quantity * self.current_price) if self.quantity and self.current_price else 0.0
+            gain_loss = float((self.current_price - self.purchase_price) * self.quantity) if self.quantity and self.current_price and self.purchase_price else 0.0
+            gain_loss_percent = float(((self.current_price - self.purchase_price) / self.purchase_price * 100)) if self.purchase_price and self.purchase_price > 0 else 0.0
+        
         return {
             'id': self.id,
             'portfolio_id': self.portfolio_id,
@@ -61,9 +158,9 @@ class Holding(db.Model):
             'purchase_price': float(self.purchase_price) if self.purchase_price else 0.0,
             'allocation': float(self.allocation) if self.allocation else 0.0,
             'ai_recommendation': self.ai_recommendation,
-            'current_value': float(self.quantity * self.current_price) if self.quantity and self.current_price else 0.0,
-            'gain_loss': float((self.current_price - self.purchase_price) * self.quantity) if self.quantity and self.current_price and self.purchase_price else 0.0,
-            'gain_loss_percent': float(((self.current_price - self.purchase_price) / self.purchase_price * 100)) if self.purchase_price and self.purchase_price > 0 else 0.0,
+            'current_value': current_value,
+            'gain_loss': gain_loss,
+            'gain_loss_percent': gain_loss_percent,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
         }
     
@@ -0,0 +1,50 @@
+"""
+Portfolio allocation drift model
+"""
+
+from extensions import db
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# Columns refreshed when a portfolio already has a drift row
+UPSERT_COLUMNS = ('user_id', 'drift', 'risk_category', 'risk_score', 'scanned_at')
+
+class PortfolioDrift(db.Model):
+    __tablename__ = 'portfolio_drifts'
+    
+    portfolio_id = db.Column(db.Integer, db.ForeignKey('portfolios.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    drift = db.Column(db.Numeric(5, 1), nullable=False)  # Largest asset class deviation from target, in percent
+    risk_category = db.Column(db.String(50), nullable=False)  # Target the drift was measured against
+    risk_score = db.Column(db.Integer, nullable=False)
+    scanned_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    @classmethod
+    def bulk_upsert(cls, rows):
+        """
+        Insert or refresh one row per portfolio in a single executemany
+        statement. The caller owns the transaction.
+        """
+        if not rows:
+            return 0
+        stmt = pg_insert(cls.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['portfolio_id'],
+            set_={column: stmt.excluded[column] for column in UPSERT_COLUMNS}
+        )
+        db.session.execute(stmt, rows)
+        return len(rows)
+    
+    def to_dict(self):
+        """Convert drift row to dictionary"""
+        return {
+            'portfolio_id': self.portfolio_id,
+            'user_id': self.user_id,
+            'drift': float(self.drift) if self.drift is not None else 0.0,
+            'risk_category': self.risk_category,
+            'risk_score': self.risk_score,
+            'scanned_at': self.scanned_at.isoformat() if self.scanned_at else None
+        }
+    
+    def __repr__(self):
+        return f'<PortfolioDrift {self.portfolio_id}: {self.drift}%>'
@@ -0,0 +1,60 @@
+"""
+Portfolio NAV history model
+"""
+
+from extensions import db
+from datetime import datetime
+from sqlalchemy import literal, select, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models.portfolio import Portfolio
+
+class PortfolioNAV(db.Model):
+    __tablename__ = 'portfolio_navs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    portfolio_id = db.Column(db.Integer, db.ForeignKey('portfolios.id', ondelete='CASCADE'), nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    nav = db.Column(db.Numeric(15, 2), nullable=False)  # Holdings market value at close
+    total_cost = db.Column(db.Numeric(15, 2), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('portfolio_id', 'date', name='unique_portfolio_nav_date'),
+    )
+    
+    @classmethod
+    def snapshot_all(cls, day):
+        """
+        Write one row per portfolio for `day` from the maintained aggregates
+        in a single INSERT ... SELECT, replacing any earlier run for the day.
+        The caller owns the transaction.
+        """
+        portfolios = Portfolio.__table__
+        source = select(
+            portfolios.c.id,
+            literal(day, db.Date),
+            portfolios.c.total_value,
+            portfolios.c.total_value - portfolios.c.total_gain_loss,
+            literal(datetime.utcnow(), db.DateTime)
+        ).where(true())  # SQLite needs a WHERE before ON CONFLICT in INSERT ... SELECT
+        stmt = pg_insert(cls.__table__).from_select(
+            ['portfolio_id', 'date', 'nav', 'total_cost', 'created_at'], source
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['portfolio_id', 'date'],
+            set_={'nav': stmt.excluded.nav, 'total_cost': stmt.excluded.total_cost,
+                  'created_at': stmt.excluded.created_at}
+        )
+        return db.session.execute(stmt).rowcount
+    
+    def to_dict(self):
+        """Convert NAV row to dictionary"""
+        return {
+            'portfolio_id': self.portfolio_id,
+            'date': self.date.isoformat() if self.date else None,
+            'nav': float(self.nav) if self.nav else 0.0,
+            'total_cost': float(self.total_cost) if self.total_cost else 0.0
+        }
+    
+    def __repr__(self):
+        return f'<PortfolioNAV {self.portfolio_id} - {self.date}: {self.nav}>'
@@ -8,6 +8,27 @@ from .market_service import MarketService
 from .behavioral_service import BehavioralService
 from .ai_service import AIService
 from .sentiment_service import SentimentService
+from .indicator_engine import IndicatorEngine
+from .ohlcv_store import OHLCVStore
+from .indicator_state import IndicatorState
+from .forecast_engine import ForecastEngine
+from .covariance_service import CovarianceService
+from .screener_service import ScreenerService
+from .portfolio_optimizer import PortfolioOptimizer
+from .efficient_frontier import FrontierService
+from .valuation_engine import ValuationEngine
+from .mark_to_market import MarkToMarketService
+from .portfolio_reconciler import PortfolioReconciler
+from .portfolio_snapshot import PortfolioSnapshot
+from .returns_service import ReturnsService
+from .rebalance_engine import RebalanceEngine
+from .holdings_import import HoldingsImporter
+from .backtest_engine import BacktestEngine
+from .risk_engine import RiskEngine
+from .drift_scanner import DriftScanner
+from .household_service import HouseholdService
+from .exposure_service import ExposureService
+from .goal_simulator import GoalSimulator
 
 __all__ = [
     'RiskProfilingService',
@@ -15,6 +36,27 @@ __all__ = [
     'MarketService',
     'BehavioralService',
     'AIService',
-    'SentimentService'
+    'SentimentService',
+    'IndicatorEngine',
+    'OHLCVStore',
+    'IndicatorState',
+    'ForecastEngine',
+    'CovarianceService',
+    'ScreenerService',
+    'PortfolioOptimizer',
+    'FrontierService',
+    'ValuationEngine',
+    'MarkToMarketService',
+    'PortfolioReconciler',
+    'PortfolioSnapshot',
+    'ReturnsService',
+    'RebalanceEngine',
+    'HoldingsImporter',
+    'BacktestEngine',
+    'RiskEngine',
+    'DriftScanner',
+    'HouseholdService',
+    'ExposureService',
+    'GoalSimulator'
 ]
 
@@ -6,6 +6,9 @@ AI-powered insights and recommendations
 from datetime import datetime
 import json
 
+from config import Config
+from services.drift_scanner import DriftScanner
+
 class AIService:
     """Service for AI-generated insights and recommendations"""
     
@@ -83,16 +86,13 @@ class AIService:
                 }
             })
         elif insights_type == 'portfolio_recommendation':
-            insights.append({
-                'type': 'portfolio_recommendation',
-                'title': 'Portfolio Rebalancing Suggestion',
-                'content': 'Your portfolio allocation has drifted from target. Consider rebalancing.',
-                'data': {
-                    'current_allocation': {},
-                    'target_allocation': {},
-                    'drift': 5.2
-                }
-            })
+            measurement = DriftScanner.measure(user_ids=[user_id])
+            limit = round(Config.REBALANCE_TOLERANCE * 1000)
+            for row in range(len(measurement.portfolio_ids)):
+                if measurement.drift_tenths[row] > limit:
+                    insight = DriftScanner.insight(measurement, row)
+                    insight.pop('user_id')
+                    insights.append(insight)
         elif insights_type == 'risk_alert':
             insights.append({
                 'type': 'risk_alert',
@@ -0,0 +1,181 @@
+"""
+Backtest Engine
+Allocation strategies replayed over asset class price history as (strategies x dates) arrays
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from config import Config
+from services.ohlcv_store import get_ohlcv_store
+from services.portfolio_optimizer import ASSET_CLASSES, PortfolioOptimizer
+
+SECONDS_PER_YEAR = 365.25 * 86400
+# Rebalance intervals in bars; 0 buys once and holds
+REBALANCE_FREQUENCIES = {
+    'daily': 1, 'weekly': 5, 'monthly': 21, 'quarterly': 63, 'semiannual': 126, 'annual': 252, 'never': 0
+}
+MIN_OBSERVATIONS = 20
+
+
+def simulate(closes, weights, intervals, cost_rates=None):
+    """
+    NAV paths (strategies x dates, starting at 1) of `weights` (strategies
+    x assets, rows summing to 1) rebalanced every `intervals[s]` bars over
+    (dates x assets) closes. `cost_rates` per asset are charged on the
+    value traded back to target at each rebalance.
+
+    Within a rebalance period NAV is the weights dotted with prices relative
+    to the period start, so every strategy sharing an interval is priced by
+    one matrix product; periods are chained with a cumulative product.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    intervals = np.asarray(intervals, dtype=np.intp)
+    dates, assets = closes.shape
+    navs = np.empty((len(weights), dates))
+
+    for interval in np.unique(intervals):
+        rows = np.flatnonzero(intervals == interval)
+        step = interval if interval > 0 else dates
+        period_of = np.arange(dates) // step
+        starts = np.arange(0, dates, step)
+        growth = weights[rows] @ (closes / closes[starts][period_of]).T
+
+        # Growth of each completed period up to the bar that starts the next
+        end_relative = closes[starts[1:]] / closes[starts[:-1]]
+        period_growth = weights[rows] @ end_relative.T
+        if cost_rates is not None and len(starts) > 1:
+            traded_cost = np.zeros_like(period_growth)
+            for asset in range(assets):
+                drift = np.abs(1.0 - end_relative[:, asset] / period_growth)
+                traded_cost += (cost_rates[asset] * weights[rows, asset])[:, None] * drift
+            period_growth *= 1.0 - traded_cost
+
+        levels = np.concatenate([np.ones((len(rows), 1)), np.cumprod(period_growth, axis=1)], axis=1)
+        navs[rows] = levels[:, period_of] * growth
+    return navs
+
+
+def performance_metrics(navs, timestamps, risk_free_rate):
+    """CAGR, annualized volatility, Sharpe ratio and max drawdown per NAV path (row)"""
+    years = float(timestamps[-1] - timestamps[0]) / SECONDS_PER_YEAR
+    periods_per_year = (navs.shape[1] - 1) / years
+    final = navs[:, -1]
+    cagr = np.maximum(final, 0.0) ** (1.0 / years) - 1.0
+
+    returns = navs[:, 1:] / navs[:, :-1] - 1.0
+    volatility = returns.std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+    excess = returns.mean(axis=1) * periods_per_year - risk_free_rate
+    sharpe = np.divide(excess, volatility, out=np.zeros_like(excess), where=volatility > 0)
+    max_drawdown = (1.0 - navs / np.maximum.accumulate(navs, axis=1)).max(axis=1)
+    return {
+        'cagr': cagr,
+        'volatility': volatility,
+        'sharpe_ratio': sharpe,
+        'max_drawdown': max_drawdown,
+        'final_value': final
+    }
+
+
+def _timestamp(day):
+    return int(datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc).timestamp())
+
+
+def _iso_day(timestamp):
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).date().isoformat()
+
+
+class BacktestEngine:
+    """Backtests optimizer and custom allocations across rebalance frequencies"""
+
+    @staticmethod
+    def allocations(strategies):
+        """
+        (name, {asset class: weight}) per strategy. A strategy gives an
+        `allocation`, or a `risk_category` (and optional `risk_score`) whose
+        optimizer allocation is used.
+        """
+        resolved = []
+        for index, strategy in enumerate(strategies):
+            if strategy.get('allocation'):
+                allocation = {asset: float(weight) for asset, weight in strategy['allocation'].items()}
+                name = strategy.get('name') or f'custom-{index + 1}'
+            elif strategy.get('risk_category'):
+                allocation = PortfolioOptimizer.optimize(
+                    strategy['risk_category'], risk_score=strategy.get('risk_score')
+                )['allocation']
+                name = strategy.get('name') or strategy['risk_category']
+            else:
+                raise ValueError(f'Strategy {index + 1} needs an allocation or a risk_category')
+            if any(weight < 0 for weight in allocation.values()) or sum(allocation.values()) <= 0:
+                raise ValueError(f'Strategy {name} must have non-negative weights with a positive sum')
+            resolved.append((name, allocation))
+        return resolved
+
+    @staticmethod
+    def run(strategies=None, rebalance=('quarterly',), start=None, end=None, include_costs=True):
+        """
+        Replay every (strategy, rebalance frequency) pair over the asset class
+        proxies' common history between `start` and `end` (dates, inclusive).
+        Strategies default to the optimizer allocation of each risk category.
+        """
+        started = time.perf_counter()
+        strategies = strategies or [{'risk_category': category} for category in ('conservative', 'moderate', 'aggressive')]
+        allocations = BacktestEngine.allocations(strategies)
+        unknown = [name for name in rebalance if name not in REBALANCE_FREQUENCIES]
+        if unknown:
+            raise ValueError(f"Unknown rebalance frequencies {unknown}; use {', '.join(REBALANCE_FREQUENCIES)}")
+        variants = len(allocations) * len(rebalance)
+        if not variants or variants > Config.BACKTEST_MAX_VARIANTS:
+            raise ValueError(f'Between 1 and {Config.BACKTEST_MAX_VARIANTS} strategy variants per backtest')
+
+        proxies = Config.ASSET_CLASS_PROXIES
+        used = {asset for _, allocation in allocations for asset, weight in allocation.items() if weight > 0}
+        missing = sorted(used - set(proxies))
+        if missing:
+            raise ValueError(f'No proxy configured for asset classes: {missing}')
+        assets = [asset for asset in ASSET_CLASSES if asset in used] + sorted(used - set(ASSET_CLASSES))
+
+        timestamps, closes = get_ohlcv_store().read_aligned(
+            [proxies[asset] for asset in assets],
+            start=_timestamp(start) if start else None,
+            end=_timestamp(end + timedelta(days=1)) if end else None
+        )
+        valid = (closes > 0).all(axis=1)
+        timestamps, closes = timestamps[valid], closes[valid]
+        if len(timestamps) < MIN_OBSERVATIONS or timestamps[-1] <= timestamps[0]:
+            raise ValueError('Not enough common price history for the asset class proxies')
+
+        base = np.array([[allocation.get(asset, 0.0) for asset in assets] for _, allocation in allocations])
+        base /= base.sum(axis=1, keepdims=True)
+        weights = np.repeat(base, len(rebalance), axis=0)
+        intervals = np.tile([REBALANCE_FREQUENCIES[name] for name in rebalance], len(allocations))
+        cost_rates = np.array([
+            Config.REBALANCE_BROKERAGE_RATE + Config.REBALANCE_STT_RATES.get(asset, 0.0) for asset in assets
+        ]) if include_costs else None
+
+        navs = simulate(closes, weights, intervals, cost_rates)
+        metrics = performance_metrics(navs, timestamps, Config.RISK_FREE_RATE)
+
+        results = []
+        for row in range(variants):
+            name, _ = allocations[row // len(rebalance)]
+            results.append({
+                'name': name,
+                'allocation': {asset: round(float(weight), 4) for asset, weight in zip(assets, weights[row])},
+                'rebalance': rebalance[row % len(rebalance)],
+                **{metric: round(float(values[row]), 6) for metric, values in metrics.items()}
+            })
+        return {
+            'start': _iso_day(timestamps[0]),
+            'end': _iso_day(timestamps[-1]),
+            'observations': len(timestamps),
+            'proxies': {asset: proxies[asset] for asset in assets},
+            'include_costs': include_costs,
+            'variants': variants,
+            'results': results,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
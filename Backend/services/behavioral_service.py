@@ -49,7 +49,7 @@ class BehavioralService:
             risk_adjustments['life_event_impact'] = -0.10  # Reduce risk tolerance
         
         # Sentiment variance analysis
-        sentiment_variance = float(behavioral_data.get('sentiment_variance', 0))
+        sentiment_variance = float(behavioral_data.get('sentiment_variance') or 0)
         if sentiment_variance > 0.3:
             insights.append({
                 'type': 'warning',
@@ -58,7 +58,8 @@ class BehavioralService:
             })
         
         # Email tone analysis
-        email_tone_ratio = float(behavioral_data.get('email_tone_positive_ratio', 0.5))
+        email_tone_ratio = behavioral_data.get('email_tone_positive_ratio')
+        email_tone_ratio = float(email_tone_ratio) if email_tone_ratio is not None else 0.5
         if email_tone_ratio < 0.3:
             insights.append({
                 'type': 'info',
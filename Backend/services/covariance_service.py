@@ -0,0 +1,283 @@
+"""
+Covariance Service
+Rolling return covariance and correlation matrices with Ledoit-Wolf shrinkage
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import Config
+from services.ohlcv_store import get_ohlcv_store, normalize_symbol
+
+TRADING_DAYS = 252
+MIN_OBSERVATIONS = 20
+SNAPSHOT_CACHE_SIZE = 64
+
+
+def _read_only(array):
+    array = np.array(array, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+
+def shrink(sample, observations, fourth_moment):
+    """
+    Blend a sample covariance with a scaled identity at the Ledoit-Wolf
+    (2004) optimal intensity, given sum_t ||x_t - mean||^4 over the
+    `observations` returns it was estimated from. Returns (covariance, intensity).
+    """
+    assets = len(sample)
+    target = np.trace(sample) / assets
+    dispersion = sample.copy()
+    dispersion[np.diag_indices(assets)] -= target
+    d2 = float((dispersion ** 2).sum())
+    if d2 <= 0.0:
+        return sample, 0.0
+    # sum_t ||x_t x_t' - S||^2 = sum_t ||x_t||^4 - T ||S||^2
+    b2 = (fourth_moment - observations * float((sample ** 2).sum())) / observations ** 2
+    intensity = min(max(b2, 0.0), d2) / d2
+    shrunk = (1.0 - intensity) * sample
+    shrunk[np.diag_indices(assets)] += intensity * target
+    return shrunk, intensity
+
+
+def ledoit_wolf(returns):
+    """
+    Shrink the sample covariance of (observations x assets) returns towards
+    a scaled identity with the Ledoit-Wolf (2004) optimal intensity.
+    Returns (covariance, intensity).
+    """
+    observations = len(returns)
+    centered = returns - returns.mean(axis=0)
+    sample = centered.T @ centered / observations
+    return shrink(sample, observations, float(((centered ** 2).sum(axis=1) ** 2).sum()))
+
+
+class CovarianceMatrix:
+    """
+    Covariance estimate for a fixed symbol list as of one bar.
+
+    Every array is read-only and the object is shared by all callers of the
+    same `version`, so optimizers and simulators never copy or recompute it.
+    """
+
+    __slots__ = ('symbols', 'version', 'as_of', 'window', 'observations', 'shrinkage',
+                 'mean', 'covariance', 'annual_covariance', 'correlation', 'volatility')
+
+    def __init__(self, symbols, version, as_of, window, tracker):
+        covariance, shrinkage = shrink(
+            tracker.sample_covariance(), tracker.count, tracker.centered_fourth_moment()
+        )
+        deviation = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+        scale = np.outer(deviation, deviation)
+        correlation = np.divide(covariance, scale, out=np.zeros_like(covariance), where=scale > 0)
+        np.fill_diagonal(correlation, 1.0)
+
+        self.symbols = symbols
+        self.version = version
+        self.as_of = as_of
+        self.window = window
+        self.observations = tracker.count
+        self.shrinkage = shrinkage
+        self.mean = _read_only(tracker.mean)
+        self.covariance = _read_only(covariance)
+        self.annual_covariance = _read_only(covariance * TRADING_DAYS)
+        self.correlation = _read_only(correlation)
+        self.volatility = _read_only(deviation * np.sqrt(TRADING_DAYS))
+
+    def to_dict(self):
+        return {
+            'symbols': list(self.symbols),
+            'version': self.version,
+            'as_of': self.as_of,
+            'window': self.window,
+            'observations': self.observations,
+            'shrinkage': round(self.shrinkage, 6),
+            'volatility': self.volatility.tolist(),
+            'covariance': self.annual_covariance.tolist(),
+            'correlation': self.correlation.tolist()
+        }
+
+
+class RollingCovariance:
+    """
+    Sliding-window mean and co-moment of aligned daily log returns, plus
+    the raw sums the Ledoit-Wolf intensity needs (sum ||x||^4 and
+    sum ||x||^2 x).
+
+    Each bar adds the newest return and drops the oldest with Welford
+    updates in O(symbols^2), so a snapshot never rereads the window; the
+    window is recomputed exactly once per `window` updates so rounding
+    drift cannot accumulate.
+    """
+
+    def __init__(self, symbols, window):
+        self.symbols = symbols
+        self.window = window
+        self.returns = np.zeros((window, len(symbols)))
+        self.head = 0
+        self.count = 0
+        self.mean = np.zeros(len(symbols))
+        self.comoment = np.zeros((len(symbols), len(symbols)))
+        self.norm_fourth = 0.0
+        self.norm_weighted = np.zeros(len(symbols))
+        self.last_timestamp = None
+        self.last_close = None
+        self._updates = 0
+
+    @staticmethod
+    def _log_returns(previous, closes):
+        ratios = np.divide(closes, previous, out=np.ones_like(closes), where=previous > 0)
+        return np.log(np.where(ratios > 0, ratios, 1.0))
+
+    def seed(self, timestamps, closes):
+        """Initialise from aligned (bars x symbols) closes in one exact pass"""
+        if not len(timestamps):
+            return
+        closes = closes[-(self.window + 1):]
+        returns = self._log_returns(closes[:-1], closes[1:])
+        self.count = len(returns)
+        self.returns[:self.count] = returns
+        self.head = self.count % self.window
+        self.last_timestamp = int(timestamps[-1])
+        self.last_close = closes[-1].copy()
+        self._recompute()
+
+    def push(self, timestamp, closes):
+        """Advance by one aligned bar"""
+        closes = np.asarray(closes, dtype=np.float64)
+        if self.last_close is not None:
+            self._add(self._log_returns(self.last_close, closes))
+        self.last_timestamp = int(timestamp)
+        self.last_close = closes.copy()
+
+    def _add(self, value):
+        if self.count == self.window:
+            oldest = self.returns[self.head].copy()
+            self.count -= 1
+            delta = oldest - self.mean
+            self.mean -= delta / self.count
+            self.comoment -= np.outer(delta, oldest - self.mean)
+            norm = float(oldest @ oldest)
+            self.norm_fourth -= norm * norm
+            self.norm_weighted -= norm * oldest
+        self.returns[self.head] = value
+        self.head = (self.head + 1) % self.window
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.comoment += np.outer(delta, value - self.mean)
+        norm = float(value @ value)
+        self.norm_fourth += norm * norm
+        self.norm_weighted += norm * value
+
+        self._updates += 1
+        if self._updates >= self.window:
+            self._recompute()
+
+    def _recompute(self):
+        window = self.window_returns()
+        self.mean = window.mean(axis=0) if len(window) else np.zeros(len(self.symbols))
+        centered = window - self.mean
+        self.comoment = centered.T @ centered
+        norms = (window ** 2).sum(axis=1)
+        self.norm_fourth = float((norms ** 2).sum())
+        self.norm_weighted = norms @ window if len(window) else np.zeros(len(self.symbols))
+        self._updates = 0
+
+    def window_returns(self):
+        """Returns in the window, oldest first"""
+        if self.count < self.window:
+            return self.returns[:self.count]
+        return np.roll(self.returns, -self.head, axis=0)
+
+    def sample_covariance(self):
+        """Unshrunk covariance maintained by the incremental updates"""
+        return self.comoment / max(self.count, 1)
+
+    def centered_fourth_moment(self):
+        """
+        sum_t ||x_t - m||^4 from the running sums. With q_t = ||x_t||^2,
+        a_t = x_t . m and c = ||m||^2, expanding (q_t - 2 a_t + c)^2 and
+        using sum_t x_t = T m gives
+        sum q^2 - 4 m . sum q x + 4 m' R m + 2 c tr(R) - 3 T c^2,
+        where R = sum_t x_t x_t' = comoment + T m m'.
+        """
+        count = self.count
+        mean = self.mean
+        c = float(mean @ mean)
+        raw = self.comoment + count * np.outer(mean, mean)
+        total = self.norm_fourth - 4.0 * float(mean @ self.norm_weighted) + 4.0 * float(mean @ raw @ mean) \
+            + 2.0 * c * float(np.trace(raw)) - 3.0 * count * c * c
+        return max(total, 0.0)
+
+
+class CovarianceService:
+    """Keeps one rolling estimator per symbol list and caches a snapshot per version"""
+
+    _trackers = {}
+    _snapshots = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _version(symbols, window, as_of):
+        digest = hashlib.sha1(','.join(symbols).encode()).hexdigest()[:12]
+        return f'{digest}:{window}:{as_of}'
+
+    @staticmethod
+    def get_matrix(symbols, window=None):
+        """
+        Covariance snapshot for `symbols` (rows in the given order) as of
+        their latest common bar, or None with fewer than MIN_OBSERVATIONS
+        aligned returns.
+        """
+        window = window or Config.COVARIANCE_WINDOW
+        symbols = tuple(normalize_symbol(symbol) for symbol in symbols)
+        if not symbols or len(set(symbols)) != len(symbols):
+            raise ValueError('symbols must be a non-empty list without duplicates')
+        if window < 2:
+            raise ValueError('window must be at least 2')
+
+        store = get_ohlcv_store()
+        key = (symbols, window)
+        with CovarianceService._lock:
+            tracker = CovarianceService._trackers.get(key)
+            if tracker is not None and tracker.last_timestamp is not None:
+                timestamps, closes = store.read_aligned(symbols, start=tracker.last_timestamp + 1)
+                for timestamp, row in zip(timestamps, closes):
+                    tracker.push(timestamp, row)
+            else:
+                timestamps, closes = store.read_aligned(symbols)
+                tracker = RollingCovariance(symbols, window)
+                tracker.seed(timestamps, closes)
+                CovarianceService._trackers[key] = tracker
+
+            if tracker.count < MIN_OBSERVATIONS:
+                return None
+
+            version = CovarianceService._version(symbols, window, tracker.last_timestamp)
+            snapshot = CovarianceService._snapshots.get(version)
+            if snapshot is None:
+                snapshot = CovarianceMatrix(symbols, version, tracker.last_timestamp, window, tracker)
+                CovarianceService._snapshots[version] = snapshot
+                while len(CovarianceService._snapshots) > SNAPSHOT_CACHE_SIZE:
+                    CovarianceService._snapshots.popitem(last=False)
+            else:
+                CovarianceService._snapshots.move_to_end(version)
+            return snapshot
+
+    @staticmethod
+    def get_asset_class_matrix(asset_classes=None):
+        """
+        Covariance across asset classes using Config.ASSET_CLASS_PROXIES;
+        rows follow `asset_classes` (default: every configured class).
+        """
+        proxies = Config.ASSET_CLASS_PROXIES
+        asset_classes = tuple(asset_classes or proxies)
+        unknown = [asset_class for asset_class in asset_classes if asset_class not in proxies]
+        if unknown:
+            raise ValueError(f'No proxy configured for asset classes: {unknown}')
+        return CovarianceService.get_matrix([proxies[asset_class] for asset_class in asset_classes])
@@ -0,0 +1,227 @@
+"""
+Drift Scanner
+Allocation drift of every portfolio against its risk profile target, surfaced as AI insights
+"""
+
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import Float, func, select
+
+from config import Config
+from extensions import db
+from models.ai_insight import AIInsight
+from models.portfolio import Holding, Portfolio
+from models.portfolio_drift import PortfolioDrift
+from models.risk_profile import RiskProfile
+from services.portfolio_optimizer import ASSET_CLASSES, CATEGORY_SCORES, PortfolioOptimizer, risk_aversion
+
+DEFAULT_CATEGORY = 'moderate'
+
+DriftMeasurement = namedtuple('DriftMeasurement', (
+    'portfolio_ids', 'user_ids', 'assets', 'weights', 'targets', 'drift_tenths', 'profiles', 'profile_index'
+))
+
+
+def max_drift(values, targets):
+    """(current weights, largest absolute deviation from target) per row of a value matrix"""
+    totals = values.sum(axis=1, keepdims=True)
+    weights = np.divide(values, totals, out=np.zeros_like(values), where=totals > 0)
+    return weights, np.abs(weights - targets).max(axis=1)
+
+
+def _profile(category, score):
+    category = category or DEFAULT_CATEGORY
+    if score is None:
+        score = CATEGORY_SCORES.get(category, CATEGORY_SCORES[DEFAULT_CATEGORY])
+    return category, min(max(int(score), 0), 100)
+
+
+def _columns(query, width):
+    """Result rows of a `width`-column query transposed into columns"""
+    rows = db.session.execute(query).all()
+    return tuple(zip(*rows)) if rows else ((),) * width
+
+
+class DriftScanner:
+    """Measures allocation drift in bulk and records insights for portfolios that moved past tolerance"""
+
+    @staticmethod
+    def targets(profiles, assets):
+        """(profiles x assets) optimizer weights for distinct (risk category, risk score) pairs"""
+        frontiers = {}
+        targets = np.zeros((len(profiles), len(assets)))
+        for row, (category, score) in enumerate(profiles):
+            if category not in frontiers:
+                frontiers[category] = PortfolioOptimizer.frontier(category)[0]
+            targets[row, :len(ASSET_CLASSES)] = frontiers[category].at_aversion(risk_aversion(score))
+        return targets
+
+    @staticmethod
+    def measure(user_ids=None):
+        """
+        Current weights, targets and drift for every portfolio with holdings
+        (or those of `user_ids`). Values per asset type come from one GROUP
+        BY and owners from one pass joined to each user's latest risk
+        profile; the rest is array math. Asset types outside the optimizer's
+        classes have a target of zero.
+        """
+        holdings = Holding.__table__
+        portfolios = Portfolio.__table__
+        profiles = RiskProfile.__table__
+        latest = select(profiles.c.user_id, func.max(profiles.c.id).label('id')) \
+            .group_by(profiles.c.user_id).subquery()
+        value = func.sum(holdings.c.quantity * holdings.c.current_price, type_=Float)
+        values_query = select(holdings.c.portfolio_id, holdings.c.asset_type, value) \
+            .group_by(holdings.c.portfolio_id, holdings.c.asset_type)
+        owners_query = select(
+            portfolios.c.id, portfolios.c.user_id, profiles.c.risk_category, profiles.c.risk_score
+        ).select_from(
+            portfolios.outerjoin(latest, latest.c.user_id == portfolios.c.user_id)
+            .outerjoin(profiles, profiles.c.id == latest.c.id)
+        ).order_by(portfolios.c.id)
+        if user_ids is not None:
+            values_query = values_query.join(portfolios, portfolios.c.id == holdings.c.portfolio_id) \
+                .where(portfolios.c.user_id.in_(user_ids))
+            owners_query = owners_query.where(portfolios.c.user_id.in_(user_ids))
+
+        portfolio_column, type_column, value_column = _columns(values_query, 3)
+        owner_ids, user_column, category_column, score_column = _columns(owners_query, 4)
+
+        ids, rows = np.unique(np.array(portfolio_column, dtype=np.int64), return_inverse=True)
+        asset_index = {asset: column for column, asset in enumerate(ASSET_CLASSES)}
+        types = np.fromiter(
+            (asset_index.setdefault(asset_type, len(asset_index)) for asset_type in type_column),
+            dtype=np.intp, count=len(type_column)
+        )
+        assets = tuple(asset_index)
+        values = np.bincount(
+            rows * len(assets) + types,
+            weights=np.array(value_column, dtype=np.float64),
+            minlength=len(ids) * len(assets)
+        ).astype(np.float64, copy=False).reshape(len(ids), len(assets))  # bincount of nothing is int64
+
+        owners = np.searchsorted(np.array(owner_ids, dtype=np.int64), ids)
+        profile_keys = {}
+        owner_profiles = np.fromiter(
+            (profile_keys.setdefault(_profile(category, score), len(profile_keys))
+             for category, score in zip(category_column, score_column)),
+            dtype=np.intp, count=len(owner_ids)
+        )
+        profiles = tuple(profile_keys)
+        profile_index = owner_profiles[owners]
+        targets = DriftScanner.targets(profiles, assets)[profile_index]
+        weights, drift = max_drift(values, targets)
+        invested = values.sum(axis=1) > 0
+        return DriftMeasurement(
+            ids[invested], np.array(user_column, dtype=np.int64)[owners][invested], assets,
+            weights[invested], targets[invested], np.rint(drift[invested] * 1000).astype(np.int64),
+            profiles, profile_index[invested]
+        )
+
+    @staticmethod
+    def insight(measurement, row):
+        """AIInsight column values for one measured portfolio"""
+        drift = int(measurement.drift_tenths[row]) / 10
+        held = (measurement.weights[row] > 0) | (measurement.targets[row] > 0)
+        category, score = measurement.profiles[measurement.profile_index[row]]
+        return {
+            'user_id': int(measurement.user_ids[row]),
+            'type': 'portfolio_recommendation',
+            'title': 'Portfolio Rebalancing Suggestion',
+            'content': f'Your portfolio allocation has drifted {drift:.1f}% from its {category} target. '
+                       f'Consider rebalancing.',
+            'data': {
+                'portfolio_id': int(measurement.portfolio_ids[row]),
+                'current_allocation': {
+                    asset: round(float(weight), 4)
+                    for asset, weight, keep in zip(measurement.assets, measurement.weights[row], held) if keep
+                },
+                'target_allocation': {
+                    asset: round(float(weight), 4)
+                    for asset, weight, keep in zip(measurement.assets, measurement.targets[row], held) if keep
+                },
+                'drift': drift,
+                'risk_category': category,
+                'risk_score': score
+            }
+        }
+
+    @staticmethod
+    def scan(threshold=None, batch_size=None):
+        """
+        Record each portfolio's drift and insert an insight for every one
+        past `threshold` (default Config.REBALANCE_TOLERANCE). Portfolios
+        whose drift (to 0.1%) and target are unchanged since the last scan
+        are skipped, so users are not alerted twice for the same drift.
+        Drift rows of portfolios no longer measured (every holding removed)
+        are deleted, so they are alerted again once they are re-invested.
+        """
+        started = time.perf_counter()
+        threshold = Config.REBALANCE_TOLERANCE if threshold is None else threshold
+        batch_size = batch_size or Config.DRIFT_SCAN_BATCH_SIZE
+        measurement = DriftScanner.measure()
+        ids = measurement.portfolio_ids
+        drifts = PortfolioDrift.__table__
+
+        previous_column, drift_column, category_column, score_column = _columns(
+            select(drifts.c.portfolio_id, drifts.c.drift.cast(Float), drifts.c.risk_category, drifts.c.risk_score)
+            .order_by(drifts.c.portfolio_id), 4
+        )
+        previous_ids = np.array(previous_column, dtype=np.int64)
+        changed = np.ones(len(ids), dtype=bool)
+        if len(previous_ids):
+            position = np.minimum(np.searchsorted(previous_ids, ids), len(previous_ids) - 1)
+            seen = previous_ids[position] == ids
+            previous_tenths = np.rint(np.array(drift_column, dtype=np.float64) * 10).astype(np.int64)
+            # Previous targets as indexes into this scan's profiles, -1 for a profile no longer in use
+            profile_keys = {profile: index for index, profile in enumerate(measurement.profiles)}
+            previous_profiles = np.fromiter(
+                (profile_keys.get((category, score), -1) for category, score in zip(category_column, score_column)),
+                dtype=np.intp, count=len(previous_ids)
+            )
+            same = seen & (previous_tenths[position] == measurement.drift_tenths) & \
+                (previous_profiles[position] == measurement.profile_index)
+            changed = ~same
+
+        stale = previous_ids[~np.isin(previous_ids, ids)]
+        for start in range(0, len(stale), batch_size):
+            db.session.execute(
+                drifts.delete().where(drifts.c.portfolio_id.in_(stale[start:start + batch_size].tolist()))
+            )
+        if len(stale):
+            db.session.commit()
+
+        over = measurement.drift_tenths > int(round(threshold * 1000))
+        alerts = changed & over
+        now = datetime.utcnow()
+        updated = np.flatnonzero(changed)
+        for start in range(0, len(updated), batch_size):
+            batch = updated[start:start + batch_size]
+            PortfolioDrift.bulk_upsert([{
+                'portfolio_id': int(ids[row]),
+                'user_id': int(measurement.user_ids[row]),
+                'drift': int(measurement.drift_tenths[row]) / 10,
+                'risk_category': measurement.profiles[measurement.profile_index[row]][0],
+                'risk_score': measurement.profiles[measurement.profile_index[row]][1],
+                'scanned_at': now
+            } for row in batch])
+            insights = [
+                {**DriftScanner.insight(measurement, row), 'is_read': False, 'created_at': now}
+                for row in batch[alerts[batch]]
+            ]
+            if insights:
+                db.session.execute(AIInsight.__table__.insert(), insights)
+            db.session.commit()
+
+        return {
+            'portfolios': len(ids),
+            'changed': int(changed.sum()),
+            'over_threshold': int(over.sum()),
+            'insights': int(alerts.sum()),
+            'removed': len(stale),
+            'threshold': threshold,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
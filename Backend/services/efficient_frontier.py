@@ -0,0 +1,169 @@
+"""
+Efficient Frontier
+Precomputed mean-variance frontiers answered by interpolation, persisted to disk
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from config import Config
+
+# Risk aversions the frontier is solved at; wide enough to reach both the
+# maximum-return and the minimum-variance end of any bounded problem
+FRONTIER_POINTS = 256
+AVERSION_GRID = np.geomspace(0.25, 200.0, FRONTIER_POINTS)
+
+FRONTIER_CACHE_SIZE = 64
+MAX_FRONTIER_FILES = 256
+
+
+class EfficientFrontier:
+    """
+    Optimal weights on a dense risk-aversion grid for one problem.
+
+    Lookups binary-search the grid (by risk aversion or by target volatility)
+    and interpolate between the neighbouring portfolios; a convex blend of
+    two feasible portfolios stays feasible, so no solver call is needed.
+    """
+
+    __slots__ = ('key', 'assets', 'aversions', 'weights', 'expected_returns', 'covariance',
+                 'returns', 'volatility')
+
+    def __init__(self, key, assets, aversions, weights, expected_returns, covariance):
+        self.key = key
+        self.assets = tuple(assets)
+        self.aversions = np.asarray(aversions, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.expected_returns = np.asarray(expected_returns, dtype=np.float64)
+        self.covariance = np.asarray(covariance, dtype=np.float64)
+        self.returns = self.weights @ self.expected_returns
+        self.volatility = np.sqrt(np.maximum(
+            np.einsum('ki,ij,kj->k', self.weights, self.covariance, self.weights), 0.0
+        ))
+
+    @staticmethod
+    def _blend(grid, value, ascending=True):
+        """Index and weight of the upper neighbour of `value` on a sorted grid"""
+        if not ascending:
+            grid, value = -grid, -value
+        index = int(np.searchsorted(grid, value))
+        if index <= 0:
+            return 1, 0.0
+        if index >= len(grid):
+            return len(grid) - 1, 1.0
+        span = grid[index] - grid[index - 1]
+        return index, float((value - grid[index - 1]) / span) if span > 0 else 1.0
+
+    def at_aversion(self, aversion):
+        """Weights for a risk aversion, interpolated in log space"""
+        index, fraction = self._blend(np.log(self.aversions), np.log(aversion))
+        return (1.0 - fraction) * self.weights[index - 1] + fraction * self.weights[index]
+
+    def at_volatility(self, target):
+        """Frontier weights at a target annual volatility"""
+        # Volatility falls as risk aversion rises along the grid
+        index, fraction = self._blend(self.volatility, target, ascending=False)
+        return (1.0 - fraction) * self.weights[index - 1] + fraction * self.weights[index]
+
+    def save(self, path):
+        """Write atomically so concurrent workers never read a partial file"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as stream:
+                np.savez(
+                    stream, assets=np.array(self.assets), aversions=self.aversions,
+                    weights=self.weights, expected_returns=self.expected_returns,
+                    covariance=self.covariance
+                )
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, key, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                key, [str(asset) for asset in data['assets']], data['aversions'],
+                data['weights'], data['expected_returns'], data['covariance']
+            )
+
+
+class FrontierService:
+    """Builds each frontier once per input set and shares it across requests and workers"""
+
+    _frontiers = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def frontier_key(assets, expected_returns, version, lower, upper):
+        """Digest of everything the frontier depends on"""
+        inputs = {
+            'assets': list(assets),
+            'version': version,
+            'expected_returns': np.round(expected_returns, 8).tolist(),
+            'lower': np.round(lower, 6).tolist(),
+            'upper': np.round(upper, 6).tolist(),
+            'grid': [float(AVERSION_GRID[0]), float(AVERSION_GRID[-1]), FRONTIER_POINTS]
+        }
+        return hashlib.sha1(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def _path(key):
+        return os.path.join(Config.FRONTIER_CACHE_DIR, f'{key}.npz')
+
+    @staticmethod
+    def _prune():
+        """Keep only the most recently written frontier files"""
+        directory = Config.FRONTIER_CACHE_DIR
+        files = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.npz')]
+        if len(files) <= MAX_FRONTIER_FILES:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:-MAX_FRONTIER_FILES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def get(assets, expected_returns, covariance, version, lower, upper, solver):
+        """
+        Return (frontier, warm). Lookup order is memory, then disk, then a
+        single batched `solver(expected, covariance, aversions, lower, upper)`
+        call over the whole grid, whose result is persisted.
+        """
+        key = FrontierService.frontier_key(assets, expected_returns, version, lower, upper)
+        with FrontierService._lock:
+            frontier = FrontierService._frontiers.get(key)
+            if frontier is not None:
+                FrontierService._frontiers.move_to_end(key)
+                return frontier, True
+
+            warm = False
+            path = FrontierService._path(key)
+            try:
+                frontier = EfficientFrontier.load(key, path)
+                warm = True
+            except (OSError, ValueError, KeyError):
+                weights = solver(expected_returns, covariance, AVERSION_GRID, lower, upper)
+                frontier = EfficientFrontier(key, assets, AVERSION_GRID, weights, expected_returns, covariance)
+                try:
+                    frontier.save(path)
+                    FrontierService._prune()
+                except OSError:
+                    pass  # A read-only disk only costs new workers a rebuild
+
+            FrontierService._frontiers[key] = frontier
+            while len(FrontierService._frontiers) > FRONTIER_CACHE_SIZE:
+                FrontierService._frontiers.popitem(last=False)
+            return frontier, warm
@@ -0,0 +1,210 @@
+"""
+Exposure Service
+Beta, alpha and tracking error of portfolios and holdings against the benchmark indices
+"""
+
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import Float, select
+
+from config import Config
+from extensions import db
+from models.portfolio import Holding, Portfolio
+from services.covariance_service import TRADING_DAYS
+from services.ohlcv_store import get_ohlcv_store, normalize_symbol
+from utils.cache import cache_get_many, cache_set_many
+
+MIN_OBSERVATIONS = 60
+
+
+def exposure_cache_key(portfolio_id, day=None):
+    day = day or datetime.now(timezone.utc).date()
+    return f'exposure:{portfolio_id}:{day.isoformat()}'
+
+
+def regress(benchmark_returns, returns, risk_free_rate=0.0):
+    """
+    Regress every column of (dates x series) `returns` on each column of
+    (dates x benchmarks) `benchmark_returns`, both in excess of a daily
+    risk-free rate, as one batched solve of the stacked 2x2 normal
+    equations. Returns (benchmarks x series) arrays: beta, annualized
+    alpha, annualized tracking error, correlation and R squared.
+    """
+    daily_rate = risk_free_rate / TRADING_DAYS
+    y = returns - daily_rate
+    x = benchmark_returns - daily_rate
+    observations = len(y)
+
+    # Per benchmark b: [[n, sum x_b], [sum x_b, sum x_b^2]] @ [alpha, beta] = [sum y, sum x_b y]
+    sum_x = x.sum(axis=0)
+    normal = np.empty((x.shape[1], 2, 2))
+    normal[:, 0, 0] = observations
+    normal[:, 0, 1] = normal[:, 1, 0] = sum_x
+    normal[:, 1, 1] = np.einsum('tb,tb->b', x, x)
+    moments = np.empty((x.shape[1], 2, y.shape[1]))
+    moments[:, 0, :] = y.sum(axis=0)
+    moments[:, 1, :] = x.T @ y
+    alpha, beta = np.moveaxis(np.linalg.solve(normal, moments), 1, 0)
+
+    y_centered = y - y.mean(axis=0)
+    x_centered = x - x.mean(axis=0)
+    y_variance = np.einsum('tn,tn->n', y_centered, y_centered)
+    x_variance = np.einsum('tb,tb->b', x_centered, x_centered)
+    covariance = x_centered.T @ y_centered
+    denominator = np.sqrt(np.outer(x_variance, y_variance))
+    correlation = np.divide(covariance, denominator, out=np.zeros_like(covariance), where=denominator > 0)
+
+    # Active return variance: var(y) - 2 cov(x, y) + var(x), per (benchmark, series)
+    active_variance = (y_variance[None, :] - 2 * covariance + x_variance[:, None]) / (observations - 1)
+    return {
+        'beta': beta,
+        'alpha': alpha * TRADING_DAYS,
+        'tracking_error': np.sqrt(np.maximum(active_variance, 0.0) * TRADING_DAYS),
+        'correlation': correlation,
+        'r_squared': correlation ** 2
+    }
+
+
+def _price_symbol(store, asset_name, asset_type, window):
+    """
+    The holding's own symbol when it has a priced bar on every date of the
+    benchmark `window`, up to the benchmarks' latest bar; else its asset
+    class proxy, so a stale or delisted holding cannot shorten the window
+    shared by the user's other holdings.
+    """
+    try:
+        symbol = normalize_symbol(asset_name)
+    except ValueError:
+        symbol = None
+    if symbol and len(window) and store.last_timestamp(symbol) == int(window[-1]):
+        history = store.read(symbol, start=int(window[0]))
+        if np.isin(window, history['timestamp'][history['close'] > 0]).all():
+            return symbol
+    return Config.ASSET_CLASS_PROXIES.get(asset_type)
+
+
+class ExposureService:
+    """Benchmark exposures for every portfolio of a user from one regression batch, cached per portfolio per day"""
+
+    @staticmethod
+    def holdings(user_id, portfolio_ids=None):
+        """(holding id, portfolio id, asset type, asset name, value) rows for the user's portfolios"""
+        holdings = Holding.__table__
+        portfolios = Portfolio.__table__
+        query = select(
+            holdings.c.id, holdings.c.portfolio_id, holdings.c.asset_type, holdings.c.asset_name,
+            (holdings.c.quantity * holdings.c.current_price).cast(Float)
+        ).join(portfolios, portfolios.c.id == holdings.c.portfolio_id) \
+            .where(portfolios.c.user_id == user_id).order_by(holdings.c.portfolio_id, holdings.c.id)
+        if portfolio_ids is not None:
+            query = query.where(holdings.c.portfolio_id.in_(portfolio_ids))
+        return db.session.execute(query).all()
+
+    @staticmethod
+    def compute(user_id, portfolio_ids):
+        """
+        {portfolio id: report} for `portfolio_ids` of `user_id`. Each holding
+        is priced by its own history if that covers the benchmarks' latest
+        window, else by its asset class proxy; portfolio returns are the
+        current value-weighted mix of its holdings' returns.
+        Holdings, then portfolios, are regressed together in one solve.
+        """
+        store = get_ohlcv_store()
+        benchmarks = tuple(Config.BENCHMARK_SYMBOLS)
+        benchmark_timestamps, benchmark_closes = store.read_aligned(
+            [Config.BENCHMARK_SYMBOLS[name] for name in benchmarks]
+        )
+        window = benchmark_timestamps[(benchmark_closes > 0).all(axis=1)][-(Config.EXPOSURE_WINDOW + 1):]
+        rows = ExposureService.holdings(user_id, portfolio_ids)
+        symbols = [
+            _price_symbol(store, asset_name, asset_type, window) for _, _, asset_type, asset_name, _ in rows
+        ]
+        priced = sorted({symbol for symbol in symbols if symbol})
+
+        timestamps, closes = store.read_aligned(
+            [Config.BENCHMARK_SYMBOLS[name] for name in benchmarks] + priced
+        )
+        valid = (closes > 0).all(axis=1)
+        timestamps, closes = timestamps[valid], closes[valid]
+        timestamps, closes = timestamps[-(Config.EXPOSURE_WINDOW + 1):], closes[-(Config.EXPOSURE_WINDOW + 1):]
+        if len(closes) <= MIN_OBSERVATIONS:
+            raise ValueError('Not enough common price history for the benchmarks and holdings')
+        daily = closes[1:] / closes[:-1] - 1.0
+        benchmark_returns, symbol_returns = daily[:, :len(benchmarks)], daily[:, len(benchmarks):]
+
+        column = {symbol: index for index, symbol in enumerate(priced)}
+        modeled = [row for row, symbol in enumerate(symbols) if symbol]
+        holding_returns = symbol_returns[:, [column[symbols[row]] for row in modeled]]
+
+        # Value weights of each portfolio's modeled holdings as a (holdings x portfolios) matrix
+        portfolio_index = {portfolio_id: index for index, portfolio_id in enumerate(portfolio_ids)}
+        values = np.array([rows[row][4] or 0.0 for row in modeled])
+        owners = np.array([portfolio_index[rows[row][1]] for row in modeled], dtype=np.intp)
+        modeled_value = np.bincount(owners, weights=values, minlength=len(portfolio_ids))
+        mix = np.zeros((len(modeled), len(portfolio_ids)))
+        mix[np.arange(len(modeled)), owners] = np.divide(
+            values, modeled_value[owners], out=np.zeros_like(values), where=modeled_value[owners] > 0
+        )
+        results = regress(
+            benchmark_returns, np.hstack([holding_returns, holding_returns @ mix]), Config.RISK_FREE_RATE
+        )
+
+        as_of = datetime.fromtimestamp(int(timestamps[-1]), tz=timezone.utc).date().isoformat()
+        total_value = np.bincount(
+            [portfolio_index[row[1]] for row in rows], weights=[row[4] or 0.0 for row in rows],
+            minlength=len(portfolio_ids)
+        ) if rows else np.zeros(len(portfolio_ids))
+        reports = {}
+        for index, portfolio_id in enumerate(portfolio_ids):
+            series = len(modeled) + index
+            invested = modeled_value[index] > 0
+            reports[portfolio_id] = {
+                'portfolio_id': portfolio_id,
+                'as_of': as_of,
+                'observations': len(daily),
+                'value': round(float(total_value[index]), 2),
+                'unmodeled_value': round(float(total_value[index] - modeled_value[index]), 2),
+                'benchmarks': {
+                    name: {
+                        metric: round(float(matrix[b, series]), 6) if invested else None
+                        for metric, matrix in results.items()
+                    } for b, name in enumerate(benchmarks)
+                },
+                'holdings': [{
+                    'id': rows[row][0],
+                    'asset_name': rows[row][3],
+                    'price_symbol': symbols[row],
+                    'weight': round(float(mix[position, index]), 6),
+                    'beta': {name: round(float(results['beta'][b, position]), 6) for b, name in enumerate(benchmarks)}
+                } for position, row in enumerate(modeled) if owners[position] == index]
+            }
+        return reports
+
+    @staticmethod
+    def portfolio_exposures(user_id, portfolio_ids):
+        """
+        Cached reports for `portfolio_ids`; the ones missing for today are
+        computed together and cached with one write.
+        """
+        started = time.perf_counter()
+        keys = {portfolio_id: exposure_cache_key(portfolio_id) for portfolio_id in portfolio_ids}
+        cached = cache_get_many(list(keys.values()))
+        reports = {portfolio_id: cached[key] for portfolio_id, key in keys.items() if cached.get(key) is not None}
+        missing = [portfolio_id for portfolio_id in portfolio_ids if portfolio_id not in reports]
+        if missing:
+            computed = ExposureService.compute(user_id, missing)
+            cache_set_many(
+                {keys[portfolio_id]: report for portfolio_id, report in computed.items()},
+                Config.CACHE_TTL_PORTFOLIO_EXPOSURE
+            )
+            reports.update(computed)
+        return {
+            'user_id': user_id,
+            'benchmarks': dict(Config.BENCHMARK_SYMBOLS),
+            'risk_free_rate': Config.RISK_FREE_RATE,
+            'portfolios': [reports[portfolio_id] for portfolio_id in portfolio_ids],
+            'computed': len(missing),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
@@ -0,0 +1,190 @@
+"""
+Feed Replayer
+Replays recorded or synthetic OHLCV bar files through market ingestion for load testing
+"""
+
+import csv
+import heapq
+import json
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from services.market_service import MarketService
+
+# Field order of a bar tuple; files use the same names as CSV headers / JSON keys
+FEED_FIELDS = ('timestamp', 'symbol', 'open', 'high', 'low', 'close', 'volume')
+
+
+def _parse_timestamp(value):
+    """Epoch seconds (int/float/numeric string) or an ISO-8601 string"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value).strip()
+    try:
+        return int(float(value))
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+
+
+def _parse_bar(record):
+    return (
+        _parse_timestamp(record['timestamp']),
+        str(record['symbol']).strip().upper(),
+        float(record['open']),
+        float(record['high']),
+        float(record['low']),
+        float(record['close']),
+        float(record.get('volume') or 0.0)
+    )
+
+
+def read_bars(path):
+    """
+    Yield bar tuples from a CSV (with header) or NDJSON feed file.
+    Files must be ordered by timestamp.
+    """
+    with open(path, newline='') as handle:
+        if path.endswith(('.ndjson', '.jsonl', '.json')):
+            for line in handle:
+                if line.strip():
+                    yield _parse_bar(json.loads(line))
+        else:
+            for record in csv.DictReader(handle):
+                yield _parse_bar(record)
+
+
+def write_synthetic_feed(path, symbols, bars, start=None, interval=86400, seed=0):
+    """
+    Write a geometric random-walk daily feed for `symbols` to a CSV or NDJSON
+    file and return the number of bars written.
+    """
+    rng = np.random.default_rng(seed)
+    start = start if start is not None else int(time.time()) - bars * interval
+    count = len(symbols)
+    closes = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, (bars, count)), axis=0))
+    opens = np.vstack([closes[:1], closes[:-1]])
+    spread = np.abs(rng.normal(0.0, 0.01, (bars, count)))
+    highs = np.maximum(opens, closes) * (1 + spread)
+    lows = np.minimum(opens, closes) * (1 - spread)
+    volumes = rng.integers(100_000, 5_000_000, (bars, count))
+
+    ndjson = path.endswith(('.ndjson', '.jsonl', '.json'))
+    with open(path, 'w', newline='') as handle:
+        writer = None if ndjson else csv.writer(handle)
+        if writer:
+            writer.writerow(FEED_FIELDS)
+        for t in range(bars):
+            timestamp = start + t * interval
+            for s, symbol in enumerate(symbols):
+                row = (timestamp, symbol, round(opens[t, s], 4), round(highs[t, s], 4),
+                       round(lows[t, s], 4), round(closes[t, s], 4), int(volumes[t, s]))
+                if writer:
+                    writer.writerow(row)
+                else:
+                    handle.write(json.dumps(dict(zip(FEED_FIELDS, row))) + '\n')
+    return bars * count
+
+
+def _percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3) if samples else None
+
+
+class FeedReplayer:
+    """
+    Merges one or more feed files by timestamp and pushes every bar through
+    MarketService.ingest_bars, optionally paced against the feed clock.
+
+    `speed` is a multiple of real time (1, 10, ...); None replays as fast as
+    possible. Indicator payloads are buffered and handed to `writer` in
+    batches of `db_batch_size` rows, latest bar per (date, symbol) winning.
+    """
+
+    def __init__(self, paths, speed=None, writer=None, db_batch_size=500):
+        if speed is not None and speed <= 0:
+            raise ValueError('speed must be positive')
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.speed = speed
+        self.writer = writer
+        self.db_batch_size = db_batch_size
+        self._pending = {}
+        self._latencies = []
+        self._counters = {'bars': 0, 'rejected': 0, 'db_rows': 0, 'db_batches': 0}
+        self._db_seconds = 0.0
+        self._elapsed = 0.0
+
+    def run(self):
+        """Replay every file and return the report"""
+        feeds = [read_bars(path) for path in self.paths]
+        started = time.perf_counter()
+        first_timestamp = None
+        for bar in heapq.merge(*feeds, key=lambda bar: bar[0]):
+            if self.speed is not None:
+                if first_timestamp is None:
+                    first_timestamp = bar[0]
+                delay = (bar[0] - first_timestamp) / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            self._ingest(bar)
+        self._flush()
+        self._elapsed = time.perf_counter() - started
+        return self.report()
+
+    def _ingest(self, bar):
+        timestamp, symbol, open_, high, low, close, volume = bar
+        began = time.perf_counter()
+        try:
+            payload = MarketService.ingest_bars(symbol, {
+                'timestamp': [timestamp], 'open': [open_], 'high': [high],
+                'low': [low], 'close': [close], 'volume': [volume]
+            })
+        except ValueError:
+            # Out-of-order, duplicate or malformed bars are counted, not fatal
+            self._counters['rejected'] += 1
+            return
+        self._latencies.append(time.perf_counter() - began)
+        self._counters['bars'] += 1
+
+        if payload is not None and self.writer is not None:
+            self._pending[(payload['date'], symbol)] = payload
+            if len(self._pending) >= self.db_batch_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._pending or self.writer is None:
+            self._pending.clear()
+            return
+        by_day = {}
+        for (day, _), payload in self._pending.items():
+            by_day.setdefault(day, []).append(payload)
+        began = time.perf_counter()
+        for day, payloads in by_day.items():
+            self.writer(payloads, date.fromisoformat(day))
+            self._counters['db_rows'] += len(payloads)
+            self._counters['db_batches'] += 1
+        self._db_seconds += time.perf_counter() - began
+        self._pending.clear()
+
+    def report(self):
+        """Throughput, indicator-update latency percentiles and DB write rates"""
+        bars = self._counters['bars']
+        elapsed = self._elapsed
+        return {
+            **self._counters,
+            'speed': self.speed,
+            'elapsed_seconds': round(elapsed, 3),
+            'bars_per_second': round(bars / elapsed, 1) if elapsed else None,
+            'update_latency_ms': {
+                'p50': _percentile_ms(self._latencies, 50),
+                'p95': _percentile_ms(self._latencies, 95),
+                'p99': _percentile_ms(self._latencies, 99),
+                'max': _percentile_ms(self._latencies, 100)
+            },
+            'db_rows_per_second': round(self._counters['db_rows'] / self._db_seconds, 1)
+            if self._db_seconds else None,
+            'db_seconds': round(self._db_seconds, 3)
+        }
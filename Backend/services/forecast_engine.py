@@ -0,0 +1,227 @@
+"""
+Forecast Engine
+Batched AR(p) return forecasts with GARCH(1,1) volatility estimates
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+AR_ORDER = 5
+ESTIMATION_WINDOW = 504  # two years of daily returns
+MIN_OBSERVATIONS = 60
+FORECAST_HORIZON = 30  # trading days
+TRADING_DAYS = 252
+RIDGE = 1e-8
+MAX_PERSISTENCE = 0.98  # cap on sum(|phi|) so forecasts stay mean-reverting
+
+# GARCH(1,1) parameters are chosen per symbol from this grid by likelihood
+GARCH_ALPHAS = (0.02, 0.05, 0.08, 0.12, 0.16, 0.20)
+GARCH_PERSISTENCE = (0.80, 0.85, 0.90, 0.95, 0.98)
+
+MODEL_CACHE_SIZE = 4096
+
+
+class ForecastModel:
+    """
+    Fitted forecast for one symbol as of its last bar.
+
+    `weights` maps the AR state [1, r_t, ..., r_{t-p+1}] to the cumulative
+    log return over the `horizon` it was fitted for, so predicting is one
+    dot product.
+    """
+
+    __slots__ = ('symbol', 'last_timestamp', 'horizon', 'weights', 'state', 'horizon_variance',
+                 'coefficients', 'garch', 'observations')
+
+    def __init__(self, symbol, last_timestamp, horizon, weights, state, horizon_variance,
+                 coefficients, garch, observations):
+        self.symbol = symbol
+        self.last_timestamp = last_timestamp
+        self.horizon = horizon
+        self.weights = weights
+        self.state = state
+        self.horizon_variance = horizon_variance
+        self.coefficients = coefficients
+        self.garch = garch
+        self.observations = observations
+
+    def predict(self):
+        """Annualized expected return and volatility over the fitted horizon"""
+        expected = float(self.weights @ self.state)
+        deviation = math.sqrt(max(self.horizon_variance, 0.0))
+        # Probability that the realised horizon return has the forecast sign
+        confidence = 0.5 * (1.0 + math.erf(abs(expected) / (deviation * math.sqrt(2.0)))) \
+            if deviation > 0 else 0.5
+        return {
+            'expected_return': expected * TRADING_DAYS / self.horizon,
+            'volatility': deviation * math.sqrt(TRADING_DAYS / self.horizon),
+            'prediction_confidence': confidence,
+            'time_horizon_days': self.horizon
+        }
+
+
+def _returns_matrix(closes):
+    """Left-padded (symbols x window) log returns and the matching validity mask"""
+    series = []
+    for close in closes:
+        close = np.asarray(close, dtype=np.float64)[-(ESTIMATION_WINDOW + 1):]
+        ratios = np.divide(close[1:], close[:-1], out=np.ones(len(close) - 1), where=close[:-1] > 0)
+        series.append(np.log(np.where(ratios > 0, ratios, 1.0)))
+    width = max(len(values) for values in series)
+    returns = np.zeros((len(series), width))
+    mask = np.zeros((len(series), width), dtype=bool)
+    for row, values in enumerate(series):
+        if len(values):
+            returns[row, -len(values):] = values
+            mask[row, -len(values):] = True
+    return returns, mask
+
+
+def _fit_ar(returns, mask):
+    """Stacked least squares for every symbol's AR(p) coefficients"""
+    symbols, width = returns.shape
+    p = AR_ORDER
+    rows = width - p
+
+    design = np.ones((symbols, rows, p + 1))
+    for lag in range(1, p + 1):
+        design[:, :, lag] = returns[:, p - lag:width - lag]
+    target = returns[:, p:]
+    valid = mask[:, :rows]  # the oldest lag of each row must be real data
+    design *= valid[:, :, None]
+    target = target * valid
+
+    gram = np.einsum('nti,ntj->nij', design, design) + RIDGE * np.eye(p + 1)
+    moment = np.einsum('nti,nt->ni', design, target)
+    coefficients = np.linalg.solve(gram, moment[:, :, None])[:, :, 0]
+
+    # Shrink explosive fits back inside the stationary region
+    persistence = np.abs(coefficients[:, 1:]).sum(axis=1)
+    scale = np.where(persistence > MAX_PERSISTENCE, MAX_PERSISTENCE / np.maximum(persistence, 1e-12), 1.0)
+    coefficients[:, 1:] *= scale[:, None]
+
+    residuals = (target - np.einsum('nti,ni->nt', design, coefficients)) * valid
+    return coefficients, residuals, valid
+
+
+def _fit_garch(residuals, valid):
+    """Grid-search GARCH(1,1) with variance targeting, all symbols and grid points at once"""
+    counts = np.maximum(valid.sum(axis=1), 1)
+    long_run = np.maximum((residuals ** 2).sum(axis=1) / counts, 1e-12)
+
+    grid = [(alpha, persistence - alpha) for alpha in GARCH_ALPHAS
+            for persistence in GARCH_PERSISTENCE if persistence - alpha >= 0]
+    alpha = np.array([a for a, _ in grid])[:, None]
+    beta = np.array([b for _, b in grid])[:, None]
+    omega = long_run[None, :] * (1.0 - alpha - beta)
+
+    shocks = residuals ** 2
+    variance = np.repeat(long_run[None, :], len(grid), axis=0)
+    loglik = np.zeros_like(variance)
+    for t in range(residuals.shape[1]):
+        observed = valid[:, t][None, :]
+        loglik += np.where(observed, np.log(variance) + shocks[:, t] / variance, 0.0)
+        updated = omega + alpha * shocks[:, t] + beta * variance
+        variance = np.where(observed, updated, variance)
+
+    best = loglik.argmin(axis=0)
+    columns = np.arange(residuals.shape[0])
+    return alpha[best, 0], beta[best, 0], long_run, variance[best, columns]
+
+
+def _horizon_weights(coefficients, horizon):
+    """Rows w with w @ [1, r_t, ..., r_{t-p+1}] = expected sum of the next `horizon` returns"""
+    symbols, size = coefficients.shape
+    companion = np.zeros((symbols, size, size))
+    companion[:, 0, 0] = 1.0
+    companion[:, 1, :] = coefficients
+    for row in range(2, size):
+        companion[:, row, row - 1] = 1.0
+
+    power = np.repeat(np.eye(size)[None], symbols, axis=0)
+    weights = np.zeros((symbols, size))
+    for _ in range(horizon):
+        power = power @ companion
+        weights += power[:, 1, :]
+    return weights
+
+
+class ForecastEngine:
+    """Fits forecast models for many symbols at once and caches them per last bar"""
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def fit(histories, horizon=FORECAST_HORIZON):
+        """
+        Fit models for {symbol: (last_timestamp, closes)} in one batched solve.
+        Symbols with fewer than MIN_OBSERVATIONS returns are skipped.
+        """
+        eligible = {
+            symbol: (last_timestamp, closes) for symbol, (last_timestamp, closes) in histories.items()
+            if len(closes) > MIN_OBSERVATIONS
+        }
+        if not eligible:
+            return {}
+
+        symbols = list(eligible)
+        returns, mask = _returns_matrix([eligible[symbol][1] for symbol in symbols])
+        coefficients, residuals, valid = _fit_ar(returns, mask)
+        alpha, beta, long_run, last_variance = _fit_garch(residuals, valid)
+        weights = _horizon_weights(coefficients, horizon)
+
+        # Variance forecast: one-step-ahead from the last shock, then decay to the long-run level
+        next_variance = long_run * (1.0 - alpha - beta) + alpha * residuals[:, -1] ** 2 + beta * last_variance
+        persistence = alpha + beta
+        decay = persistence[:, None] ** np.arange(horizon)[None, :]
+        horizon_variance = (long_run[:, None] + decay * (next_variance - long_run)[:, None]).sum(axis=1)
+
+        states = np.ones((len(symbols), AR_ORDER + 1))
+        states[:, 1:] = returns[:, ::-1][:, :AR_ORDER]
+
+        models = {}
+        for row, symbol in enumerate(symbols):
+            models[symbol] = ForecastModel(
+                symbol=symbol,
+                last_timestamp=eligible[symbol][0],
+                horizon=horizon,
+                weights=weights[row],
+                state=states[row],
+                horizon_variance=float(horizon_variance[row]),
+                coefficients=coefficients[row],
+                garch={'alpha': float(alpha[row]), 'beta': float(beta[row]),
+                       'long_run_variance': float(long_run[row])},
+                observations=int(valid[row].sum())
+            )
+        return models
+
+    @staticmethod
+    def get_models(histories):
+        """
+        Return cached models for {symbol: (last_timestamp, closes)}, fitting
+        only the symbols whose last bar changed since they were cached.
+        """
+        models = {}
+        missing = {}
+        with ForecastEngine._lock:
+            for symbol, (last_timestamp, closes) in histories.items():
+                model = ForecastEngine._cache.get((symbol, last_timestamp))
+                if model is None:
+                    missing[symbol] = (last_timestamp, closes)
+                else:
+                    ForecastEngine._cache.move_to_end((symbol, last_timestamp))
+                    models[symbol] = model
+
+        if missing:
+            fitted = ForecastEngine.fit(missing)
+            with ForecastEngine._lock:
+                for symbol, model in fitted.items():
+                    ForecastEngine._cache[(symbol, model.last_timestamp)] = model
+                while len(ForecastEngine._cache) > MODEL_CACHE_SIZE:
+                    ForecastEngine._cache.popitem(last=False)
+            models.update(fitted)
+        return models
@@ -0,0 +1,147 @@
+"""
+Holdings Import
+Streaming CSV / NDJSON broker statements upserted into a portfolio in chunks
+"""
+
+import csv
+import io
+import json
+import math
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from config import Config
+from models.portfolio import Holding
+
+FORMATS = ('csv', 'ndjson')
+REQUIRED_FIELDS = ('asset_type', 'asset_name', 'quantity', 'current_price', 'purchase_price')
+RECOMMENDATIONS = ('buy', 'hold', 'sell')
+
+# (decimal places, exclusive upper bound) of each numeric column
+NUMERIC_FIELDS = {
+    'quantity': (4, Decimal('1e11')),
+    'current_price': (2, Decimal('1e13')),
+    'purchase_price': (2, Decimal('1e13')),
+    'allocation': (2, Decimal('1e3'))
+}
+STRING_LIMITS = {'asset_type': 50, 'asset_name': 200}
+
+
+def iter_csv(stream):
+    """(line number, record) for each data row of a CSV byte stream with a header row"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for record in reader:
+        yield reader.line_num, record
+
+
+def iter_ndjson(stream):
+    """(line number, record or error message) for each non-blank line of an NDJSON byte stream"""
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8-sig'), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, 'Invalid JSON'
+            continue
+        yield line_number, record if isinstance(record, dict) else 'Expected a JSON object'
+
+
+def _decimal(value, field):
+    places, limit = NUMERIC_FIELDS[field]
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'{field} must be a number')
+    if not number.is_finite() or number < 0:
+        raise ValueError(f'{field} must be a non-negative number')
+    # Checked before quantizing too: quantize raises InvalidOperation past the context precision
+    if number >= limit:
+        raise ValueError(f'{field} is too large')
+    number = number.quantize(Decimal(1).scaleb(-places), ROUND_HALF_UP)
+    if number >= limit:
+        raise ValueError(f'{field} is too large')
+    return number
+
+
+def validate(record):
+    """Holding column values from a statement record; raises ValueError on the first problem"""
+    for field in REQUIRED_FIELDS:
+        value = record.get(field)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            raise ValueError(f'Missing required field: {field}')
+        if isinstance(value, bool) or (isinstance(value, float) and not math.isfinite(value)):
+            raise ValueError(f'Invalid value for {field}')
+
+    row = {}
+    for field, limit in STRING_LIMITS.items():
+        row[field] = str(record[field]).strip()
+        if len(row[field]) > limit:
+            raise ValueError(f'{field} is longer than {limit} characters')
+    row['asset_type'] = row['asset_type'].lower()
+    for field in NUMERIC_FIELDS:
+        value = record.get(field)
+        row[field] = _decimal(value, field) if value not in (None, '') else Decimal('0.00')
+
+    recommendation = record.get('ai_recommendation') or None
+    if recommendation is not None:
+        recommendation = str(recommendation).strip().lower()
+        if recommendation not in RECOMMENDATIONS:
+            raise ValueError(f"ai_recommendation must be one of {', '.join(RECOMMENDATIONS)}")
+    row['ai_recommendation'] = recommendation
+    return row
+
+
+class HoldingsImporter:
+    """Validates statement rows and upserts them into one portfolio"""
+
+    @staticmethod
+    def records(stream, statement_format):
+        """(line number, record) pairs from a CSV or NDJSON statement, parsed as they are read"""
+        if statement_format == 'csv':
+            return iter_csv(stream)
+        if statement_format == 'ndjson':
+            return iter_ndjson(stream)
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+    @staticmethod
+    def import_records(portfolio_id, records, chunk_size=None):
+        """
+        Upsert valid records into the portfolio, `chunk_size` rows per
+        statement, keyed on asset name (a later row for the same asset wins).
+        Inserted and updated count distinct assets against the portfolio
+        before the import. Invalid rows are skipped and reported by line.
+        The caller owns the transaction.
+        """
+        chunk_size = chunk_size or Config.HOLDINGS_IMPORT_CHUNK_SIZE
+        summary = {'rows': 0, 'imported': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []}
+        chunk = {}
+        written = set()
+
+        def flush():
+            inserted, updated = Holding.bulk_upsert(portfolio_id, list(chunk.values()))
+            # Assets written by an earlier chunk now exist and come back as updates; they were counted then
+            summary['inserted'] += inserted
+            summary['updated'] += updated - len(written.intersection(chunk))
+            written.update(chunk)
+            chunk.clear()
+
+        for line, record in records:
+            summary['rows'] += 1
+            try:
+                if isinstance(record, str):
+                    raise ValueError(record)
+                row = validate(record)
+            except ValueError as e:
+                summary['failed'] += 1
+                if len(summary['errors']) < Config.HOLDINGS_IMPORT_MAX_ERRORS:
+                    summary['errors'].append({'line': line, 'error': str(e)})
+                continue
+            summary['imported'] += 1
+            chunk.pop(row['asset_name'], None)
+            chunk[row['asset_name']] = row
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+        summary['errors_truncated'] = summary['failed'] > len(summary['errors'])
+        return summary
@@ -0,0 +1,101 @@
+"""
+Household Service
+Consolidated view across every portfolio a user owns
+"""
+
+from sqlalchemy import Float, func, select
+
+from config import Config
+from extensions import db
+from models.portfolio import Holding, Portfolio
+from utils.cache import cache_get, cache_set
+
+
+def household_cache_key(user_id):
+    return f'household:{user_id}'
+
+
+def _percent(part, whole):
+    return round(part * 100 / whole, 4) if whole > 0 else 0.0
+
+
+class HouseholdService:
+    """Aggregates all of a user's portfolios from one grouped query, cached under one key per user"""
+
+    @staticmethod
+    def aggregate(user_id):
+        """
+        Totals, allocation by asset type and a per-portfolio breakdown for
+        every portfolio of `user_id`, from portfolios LEFT JOIN holdings
+        grouped by (portfolio, asset type). None if the user has no portfolio.
+        """
+        portfolios = Portfolio.__table__
+        holdings = Holding.__table__
+        query = select(
+            portfolios.c.id, portfolios.c.last_updated, holdings.c.asset_type,
+            func.count(holdings.c.id),
+            func.sum(holdings.c.quantity * holdings.c.current_price, type_=Float),
+            func.sum(holdings.c.quantity * holdings.c.purchase_price, type_=Float)
+        ).select_from(
+            portfolios.outerjoin(holdings, holdings.c.portfolio_id == portfolios.c.id)
+        ).where(portfolios.c.user_id == user_id).group_by(
+            portfolios.c.id, portfolios.c.last_updated, holdings.c.asset_type
+        ).order_by(portfolios.c.id)
+
+        rows = db.session.execute(query).all()
+        if not rows:
+            return None
+
+        members = {}
+        asset_values = {}
+        for portfolio_id, last_updated, asset_type, count, value, cost in rows:
+            member = members.setdefault(portfolio_id, {
+                'id': portfolio_id,
+                'total_value': 0.0,
+                'total_cost': 0.0,
+                'holdings_count': 0,
+                'last_updated': last_updated.isoformat() if last_updated else None
+            })
+            if asset_type is None:
+                continue
+            member['total_value'] += value or 0.0
+            member['total_cost'] += cost or 0.0
+            member['holdings_count'] += count
+            asset_values[asset_type] = asset_values.get(asset_type, 0.0) + (value or 0.0)
+
+        total_value = sum(member['total_value'] for member in members.values())
+        total_cost = sum(member['total_cost'] for member in members.values())
+        for member in members.values():
+            gain_loss = member['total_value'] - member['total_cost']
+            member['total_gain_loss'] = round(gain_loss, 2)
+            member['total_gain_loss_percent'] = _percent(gain_loss, member['total_cost'])
+            member['weight'] = _percent(member['total_value'], total_value)
+            member['total_value'] = round(member['total_value'], 2)
+            member['total_cost'] = round(member['total_cost'], 2)
+
+        return {
+            'user_id': user_id,
+            'portfolio_count': len(members),
+            'holdings_count': sum(member['holdings_count'] for member in members.values()),
+            'total_value': round(total_value, 2),
+            'total_cost': round(total_cost, 2),
+            'total_gain_loss': round(total_value - total_cost, 2),
+            'total_gain_loss_percent': _percent(total_value - total_cost, total_cost),
+            'asset_allocation': {
+                asset_type: {'value': round(value, 2), 'percentage': _percent(value, total_value)}
+                for asset_type, value in sorted(asset_values.items(), key=lambda item: -item[1])
+            },
+            'portfolios': list(members.values())
+        }
+
+    @staticmethod
+    def household(user_id):
+        """Cached aggregate for `user_id`, computed on a miss"""
+        cache_key = household_cache_key(user_id)
+        cached = cache_get(cache_key)
+        if cached is not None:
+            return cached
+        result = HouseholdService.aggregate(user_id)
+        if result is not None:
+            cache_set(cache_key, result, Config.CACHE_TTL_PORTFOLIO)
+        return result
@@ -0,0 +1,278 @@
+"""
+Indicator Engine
+Vectorized technical indicators computed from OHLCV price arrays
+"""
+
+import numpy as np
+
+# Window lengths used by the indicator set
+SMA_WINDOWS = (5, 10, 20, 50, 200)
+EMA_WINDOWS = (5, 10, 20, 50)
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+ADX_PERIOD = 14
+STOCH_PERIOD = 14
+STOCH_SMOOTH = 3
+BOLLINGER_PERIOD = 20
+BOLLINGER_STD = 2.0
+CCI_PERIOD = 20
+AROON_PERIOD = 25
+VOLUME_PERIOD = 20
+SHORT_VOLUME_PERIOD = 5
+MOMENTUM_PERIOD = 10
+VOLATILITY_PERIOD = 20
+VOLATILITY_LOOKBACK = 252
+TRADING_DAYS = 252
+
+INDICATOR_NAMES = (
+    'sma_5', 'sma_10', 'sma_20', 'sma_50', 'sma_200',
+    'ema_5', 'ema_10', 'ema_20', 'ema_50',
+    'rsi', 'macd', 'macd_signal', 'macd_histogram',
+    'bollinger_upper', 'bollinger_middle', 'bollinger_lower',
+    'atr', 'obv', 'volume_ratio', 'momentum',
+    'stochastic_k', 'stochastic_d', 'williams_r', 'cci',
+    'adx', 'aroon_up', 'aroon_down'
+)
+
+
+def ema_alpha(period):
+    """Smoothing factor of a standard EMA"""
+    return 2.0 / (period + 1)
+
+
+def wilder_alpha(period):
+    """Smoothing factor of Wilder's moving average"""
+    return 1.0 / period
+
+
+def ewm(x, alpha):
+    """
+    Exponentially weighted mean along the last axis, seeded with the first value.
+
+    Equivalent to y[0] = x[0]; y[t] = y[t-1] + alpha * (x[t] - y[t-1]), but
+    evaluated as a closed-form scan over fixed-size blocks so the Python loop
+    runs once per block instead of once per bar.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty_like(x)
+    length = x.shape[-1]
+    if length == 0:
+        return out
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[...] = x
+        return out
+
+    # Keep decay ** -block below ~1e12 so the rescaled partial sums stay exact
+    block = int(min(256, max(1, 27.6 / -np.log(decay))))
+    steps = np.arange(block, dtype=np.float64)
+    grow = decay ** -steps
+    shrink = decay ** steps
+
+    prev = x[..., 0] * 1.0
+    start = 0
+    while start < length:
+        stop = min(start + block, length)
+        n = stop - start
+        acc = np.cumsum(x[..., start:stop] * (alpha * grow[:n]), axis=-1)
+        acc += (decay * prev)[..., None]
+        acc *= shrink[:n]
+        out[..., start:stop] = acc
+        prev = acc[..., -1]
+        start = stop
+    return out
+
+
+def _tail_mean(x, window):
+    """Mean of the last `window` values along the last axis (NaN if too short)"""
+    if x.shape[-1] < window:
+        return np.full(x.shape[:-1], np.nan)
+    return x[..., -window:].mean(axis=-1)
+
+
+def _safe_ratio(num, den, scale=1.0, default=np.nan):
+    """Elementwise scale * num / den with `default` where den is zero"""
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    out = np.full(np.broadcast(num, den).shape, default, dtype=np.float64)
+    np.divide(num * scale, den, out=out, where=den != 0)
+    return out
+
+
+def _column(ohlcv, name):
+    """Fetch a column from a mapping or structured array as a 2-D float array"""
+    values = np.asarray(ohlcv[name], dtype=np.float64)
+    return values[None, :] if values.ndim == 1 else values
+
+
+class IndicatorEngine:
+    """Batch technical indicator computation over symbols x bars arrays"""
+
+    @staticmethod
+    def compute(ohlcv, with_state=False):
+        """
+        Compute the full indicator set for the latest bar.
+
+        `ohlcv` is a mapping (or structured array) with 'high', 'low', 'close'
+        and 'volume' columns, each shaped (bars,) for a single symbol or
+        (symbols, bars) for an aligned cross-section. Returns a dict of
+        indicator name -> array of shape (symbols,), plus the volatility and
+        volume metrics used by the market features payload.
+
+        With `with_state=True` a second dict is returned holding the final
+        values of the recursive smoothers, used to seed IndicatorState.
+        """
+        high = _column(ohlcv, 'high')
+        low = _column(ohlcv, 'low')
+        close = _column(ohlcv, 'close')
+        volume = _column(ohlcv, 'volume')
+
+        bars = close.shape[-1]
+        if bars < 2:
+            raise ValueError('At least two bars are required to compute indicators')
+
+        result = {}
+
+        # Shared intermediates
+        prev_close = close[:, :-1]
+        delta = np.diff(close, axis=-1)
+        csum = np.concatenate(
+            [np.zeros((close.shape[0], 1)), np.cumsum(close, axis=-1)], axis=-1
+        )
+        true_range = np.empty_like(close)
+        true_range[:, 0] = high[:, 0] - low[:, 0]
+        true_range[:, 1:] = np.maximum(
+            high[:, 1:] - low[:, 1:],
+            np.maximum(np.abs(high[:, 1:] - prev_close), np.abs(low[:, 1:] - prev_close))
+        )
+        typical_price = (high + low + close) / 3.0
+        last_close = close[:, -1]
+
+        # Moving averages
+        for window in SMA_WINDOWS:
+            if bars >= window:
+                result[f'sma_{window}'] = (csum[:, -1] - csum[:, -1 - window]) / window
+            else:
+                result[f'sma_{window}'] = np.full(close.shape[0], np.nan)
+        for window in EMA_WINDOWS:
+            result[f'ema_{window}'] = ewm(close, ema_alpha(window))[:, -1]
+
+        # MACD
+        ema_fast = ewm(close, ema_alpha(MACD_FAST))
+        ema_slow = ewm(close, ema_alpha(MACD_SLOW))
+        macd_line = ema_fast - ema_slow
+        signal_line = ewm(macd_line, ema_alpha(MACD_SIGNAL))
+        result['macd'] = macd_line[:, -1]
+        result['macd_signal'] = signal_line[:, -1]
+        result['macd_histogram'] = result['macd'] - result['macd_signal']
+
+        # RSI (Wilder smoothing)
+        avg_gain = ewm(np.maximum(delta, 0.0), wilder_alpha(RSI_PERIOD))[:, -1]
+        avg_loss = ewm(np.maximum(-delta, 0.0), wilder_alpha(RSI_PERIOD))[:, -1]
+        result['rsi'] = _safe_ratio(avg_gain, avg_gain + avg_loss, scale=100.0, default=50.0)
+
+        # Bollinger Bands
+        middle = result['sma_20']
+        if bars >= BOLLINGER_PERIOD:
+            band = BOLLINGER_STD * close[:, -BOLLINGER_PERIOD:].std(axis=-1)
+        else:
+            band = np.full(close.shape[0], np.nan)
+        result['bollinger_upper'] = middle + band
+        result['bollinger_middle'] = middle
+        result['bollinger_lower'] = middle - band
+
+        # Average True Range
+        atr_series = ewm(true_range, wilder_alpha(ATR_PERIOD))
+        result['atr'] = atr_series[:, -1]
+
+        # On-Balance Volume
+        result['obv'] = (np.sign(delta) * volume[:, 1:]).sum(axis=-1)
+
+        # Volume and momentum
+        average_volume = _tail_mean(volume, VOLUME_PERIOD)
+        result['volume_ratio'] = _safe_ratio(volume[:, -1], average_volume)
+        if bars > MOMENTUM_PERIOD:
+            result['momentum'] = _safe_ratio(last_close, close[:, -1 - MOMENTUM_PERIOD])
+        else:
+            result['momentum'] = np.full(close.shape[0], np.nan)
+
+        # Stochastic oscillator and Williams %R
+        if bars >= STOCH_PERIOD + STOCH_SMOOTH - 1:
+            span = STOCH_PERIOD + STOCH_SMOOTH - 1
+            highs = np.lib.stride_tricks.sliding_window_view(high[:, -span:], STOCH_PERIOD, axis=-1).max(axis=-1)
+            lows = np.lib.stride_tricks.sliding_window_view(low[:, -span:], STOCH_PERIOD, axis=-1).min(axis=-1)
+            stoch_k = _safe_ratio(close[:, -STOCH_SMOOTH:] - lows, highs - lows, scale=100.0, default=50.0)
+            result['stochastic_k'] = stoch_k[:, -1]
+            result['stochastic_d'] = stoch_k.mean(axis=-1)
+            result['williams_r'] = _safe_ratio(highs[:, -1] - last_close, highs[:, -1] - lows[:, -1],
+                                               scale=-100.0, default=-50.0)
+        else:
+            for name in ('stochastic_k', 'stochastic_d', 'williams_r'):
+                result[name] = np.full(close.shape[0], np.nan)
+
+        # Commodity Channel Index
+        if bars >= CCI_PERIOD:
+            window = typical_price[:, -CCI_PERIOD:]
+            tp_mean = window.mean(axis=-1)
+            mean_dev = np.abs(window - tp_mean[:, None]).mean(axis=-1)
+            result['cci'] = _safe_ratio(typical_price[:, -1] - tp_mean, 0.015 * mean_dev, default=0.0)
+        else:
+            result['cci'] = np.full(close.shape[0], np.nan)
+
+        # Average Directional Index (reuses the ATR series as the smoothed range)
+        up_move = high[:, 1:] - high[:, :-1]
+        down_move = low[:, :-1] - low[:, 1:]
+        plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+        minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+        plus_dm = ewm(plus_dm, wilder_alpha(ADX_PERIOD))
+        minus_dm = ewm(minus_dm, wilder_alpha(ADX_PERIOD))
+        plus_di = _safe_ratio(plus_dm, atr_series[:, 1:], scale=100.0, default=0.0)
+        minus_di = _safe_ratio(minus_dm, atr_series[:, 1:], scale=100.0, default=0.0)
+        dx = _safe_ratio(np.abs(plus_di - minus_di), plus_di + minus_di, scale=100.0, default=0.0)
+        result['adx'] = ewm(dx, wilder_alpha(ADX_PERIOD))[:, -1]
+
+        # Aroon (ties resolve to the most recent extreme)
+        if bars > AROON_PERIOD:
+            recent_high = high[:, -AROON_PERIOD - 1:][:, ::-1]
+            recent_low = low[:, -AROON_PERIOD - 1:][:, ::-1]
+            since_high = recent_high.argmax(axis=-1)
+            since_low = recent_low.argmin(axis=-1)
+            result['aroon_up'] = 100.0 * (AROON_PERIOD - since_high) / AROON_PERIOD
+            result['aroon_down'] = 100.0 * (AROON_PERIOD - since_low) / AROON_PERIOD
+        else:
+            result['aroon_up'] = np.full(close.shape[0], np.nan)
+            result['aroon_down'] = np.full(close.shape[0], np.nan)
+
+        # Volatility metrics from rolling log-return windows
+        log_returns = np.log(_safe_ratio(close[:, 1:], prev_close, default=1.0))
+        if log_returns.shape[-1] >= VOLATILITY_PERIOD:
+            tail = min(log_returns.shape[-1], VOLATILITY_LOOKBACK + VOLATILITY_PERIOD - 1)
+            windows = np.lib.stride_tricks.sliding_window_view(
+                log_returns[:, -tail:], VOLATILITY_PERIOD, axis=-1
+            )
+            rolling_vol = windows.std(axis=-1, ddof=1) * np.sqrt(TRADING_DAYS)
+            current_vol = rolling_vol[:, -1]
+            result['historical_volatility'] = current_vol
+            result['volatility_percentile'] = (rolling_vol <= current_vol[:, None]).mean(axis=-1) * 100.0
+        else:
+            rolling_vol = np.empty((close.shape[0], 0))
+            result['historical_volatility'] = np.full(close.shape[0], np.nan)
+            result['volatility_percentile'] = np.full(close.shape[0], np.nan)
+
+        result['average_volume'] = average_volume
+        result['short_volume'] = _tail_mean(volume, SHORT_VOLUME_PERIOD)
+        if not with_state:
+            return result
+
+        state = {
+            'ema_fast': ema_fast[:, -1],
+            'ema_slow': ema_slow[:, -1],
+            'avg_gain': avg_gain,
+            'avg_loss': avg_loss,
+            'plus_dm': plus_dm[:, -1],
+            'minus_dm': minus_dm[:, -1],
+            'rolling_volatility': rolling_vol
+        }
+        return result, state
@@ -0,0 +1,362 @@
+"""
+Indicator State
+Incremental per-symbol technical indicators advanced one bar at a time
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+from services.indicator_engine import (
+    IndicatorEngine, SMA_WINDOWS, EMA_WINDOWS,
+    MACD_FAST, MACD_SLOW, MACD_SIGNAL, RSI_PERIOD, ATR_PERIOD, ADX_PERIOD,
+    STOCH_PERIOD, STOCH_SMOOTH, BOLLINGER_PERIOD, BOLLINGER_STD, CCI_PERIOD,
+    AROON_PERIOD, VOLUME_PERIOD, SHORT_VOLUME_PERIOD, MOMENTUM_PERIOD,
+    VOLATILITY_PERIOD, VOLATILITY_LOOKBACK, TRADING_DAYS,
+    ema_alpha, wilder_alpha
+)
+
+STATE_VERSION = 1
+
+# Ring buffer capacities, sized for the longest window that reads each series
+CLOSE_CAPACITY = max(max(SMA_WINDOWS), MOMENTUM_PERIOD) + 1
+RANGE_CAPACITY = max(AROON_PERIOD + 1, STOCH_PERIOD + STOCH_SMOOTH - 1)
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO of floats backed by a NumPy array"""
+
+    __slots__ = ('data', 'head', 'size')
+
+    def __init__(self, capacity, values=()):
+        self.data = np.zeros(capacity)
+        self.head = 0
+        self.size = 0
+        for value in np.asarray(values, dtype=np.float64)[-capacity:]:
+            self.push(value)
+
+    def push(self, value):
+        """Append a value and return the one it evicted (None while filling)"""
+        capacity = len(self.data)
+        evicted = self.data[self.head] if self.size == capacity else None
+        self.data[self.head] = value
+        self.head = (self.head + 1) % capacity
+        self.size = min(self.size + 1, capacity)
+        return evicted
+
+    def back(self, offset):
+        """Value `offset` positions before the newest (0 is the newest)"""
+        return self.data[(self.head - 1 - offset) % len(self.data)]
+
+    def last(self, count):
+        """The newest `count` values, oldest first"""
+        count = min(count, self.size)
+        start = self.head - count
+        if start >= 0:
+            return self.data[start:self.head]
+        return np.concatenate([self.data[start:], self.data[:self.head]])
+
+    def to_list(self):
+        return self.last(self.size).tolist()
+
+
+class IndicatorState:
+    """
+    Per-symbol indicator state advanced in O(1) per bar.
+
+    Recursive indicators (EMA, MACD, Wilder RSI/ATR/ADX, OBV) keep their
+    last value; windowed indicators keep ring buffers with running sums.
+    The state round-trips through to_dict/from_dict so a worker restart can
+    resume from the last processed bar, and it reproduces
+    IndicatorEngine.compute on the same history within floating-point
+    tolerance.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.last_timestamp = None
+        self.prev_close = None
+        self.prev_high = None
+        self.prev_low = None
+        self.ema = {}
+        self.macd_signal = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.atr = None
+        self.plus_dm = None
+        self.minus_dm = None
+        self.adx = None
+        self.obv = 0.0
+        self.sums = {window: 0.0 for window in SMA_WINDOWS}
+        self.volume_sum = 0.0
+        self.closes = RingBuffer(CLOSE_CAPACITY)
+        self.highs = RingBuffer(RANGE_CAPACITY)
+        self.lows = RingBuffer(RANGE_CAPACITY)
+        self.typical = RingBuffer(CCI_PERIOD)
+        self.volumes = RingBuffer(VOLUME_PERIOD)
+        self.returns = RingBuffer(VOLATILITY_PERIOD)
+        self.volatility = RingBuffer(VOLATILITY_LOOKBACK)
+
+    @staticmethod
+    def _smooth(previous, value, alpha):
+        return value if previous is None else previous + alpha * (value - previous)
+
+    def update(self, timestamp, high, low, close, volume):
+        """Advance the state by one bar"""
+        high, low, close, volume = float(high), float(low), float(close), float(volume)
+        first = self.count == 0
+
+        # Exponential averages of the close and the MACD signal line
+        for window in EMA_WINDOWS + (MACD_FAST, MACD_SLOW):
+            self.ema[window] = self._smooth(self.ema.get(window), close, ema_alpha(window))
+        self.macd_signal = self._smooth(
+            self.macd_signal, self.ema[MACD_FAST] - self.ema[MACD_SLOW], ema_alpha(MACD_SIGNAL)
+        )
+
+        # True range and ATR
+        if first:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.atr = self._smooth(self.atr, true_range, wilder_alpha(ATR_PERIOD))
+
+        if not first:
+            delta = close - self.prev_close
+            self.avg_gain = self._smooth(self.avg_gain, max(delta, 0.0), wilder_alpha(RSI_PERIOD))
+            self.avg_loss = self._smooth(self.avg_loss, max(-delta, 0.0), wilder_alpha(RSI_PERIOD))
+            self.obv += math.copysign(volume, delta) if delta else 0.0
+
+            up_move = high - self.prev_high
+            down_move = self.prev_low - low
+            plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+            minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+            self.plus_dm = self._smooth(self.plus_dm, plus_dm, wilder_alpha(ADX_PERIOD))
+            self.minus_dm = self._smooth(self.minus_dm, minus_dm, wilder_alpha(ADX_PERIOD))
+            plus_di = 100.0 * self.plus_dm / self.atr if self.atr else 0.0
+            minus_di = 100.0 * self.minus_dm / self.atr if self.atr else 0.0
+            di_sum = plus_di + minus_di
+            dx = 100.0 * abs(plus_di - minus_di) / di_sum if di_sum else 0.0
+            self.adx = self._smooth(self.adx, dx, wilder_alpha(ADX_PERIOD))
+
+            ratio = close / self.prev_close if self.prev_close else 1.0
+            self.returns.push(math.log(ratio))
+            if self.returns.size == VOLATILITY_PERIOD:
+                vol = float(np.std(self.returns.data, ddof=1)) * math.sqrt(TRADING_DAYS)
+                self.volatility.push(vol)
+
+        # Rolling windows: running sums plus ring buffers
+        self.closes.push(close)
+        self.count += 1
+        for window in SMA_WINDOWS:
+            self.sums[window] += close
+            if self.count > window:
+                self.sums[window] -= self.closes.back(window)
+        evicted = self.volumes.push(volume)
+        self.volume_sum += volume - (evicted or 0.0)
+        self.highs.push(high)
+        self.lows.push(low)
+        self.typical.push((high + low + close) / 3.0)
+
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+        self.last_timestamp = int(timestamp)
+
+    def values(self):
+        """Current indicator values keyed like IndicatorEngine.compute output"""
+        if self.count < 2:
+            raise ValueError('At least two bars are required to compute indicators')
+        nan = float('nan')
+        close = self.prev_close
+        result = {}
+
+        for window in SMA_WINDOWS:
+            result[f'sma_{window}'] = self.sums[window] / window if self.count >= window else nan
+        for window in EMA_WINDOWS:
+            result[f'ema_{window}'] = self.ema[window]
+        result['macd'] = self.ema[MACD_FAST] - self.ema[MACD_SLOW]
+        result['macd_signal'] = self.macd_signal
+        result['macd_histogram'] = result['macd'] - self.macd_signal
+
+        gain_loss = self.avg_gain + self.avg_loss
+        result['rsi'] = 100.0 * self.avg_gain / gain_loss if gain_loss else 50.0
+
+        middle = result['sma_20']
+        band = BOLLINGER_STD * float(np.std(self.closes.last(BOLLINGER_PERIOD))) \
+            if self.count >= BOLLINGER_PERIOD else nan
+        result['bollinger_upper'] = middle + band
+        result['bollinger_middle'] = middle
+        result['bollinger_lower'] = middle - band
+
+        result['atr'] = self.atr
+        result['obv'] = self.obv
+
+        average_volume = self.volume_sum / VOLUME_PERIOD if self.count >= VOLUME_PERIOD else nan
+        result['volume_ratio'] = self.volumes.back(0) / average_volume if average_volume else nan
+        if self.count > MOMENTUM_PERIOD:
+            base = self.closes.back(MOMENTUM_PERIOD)
+            result['momentum'] = close / base if base else nan
+        else:
+            result['momentum'] = nan
+
+        span = STOCH_PERIOD + STOCH_SMOOTH - 1
+        if self.count >= span:
+            highs = np.lib.stride_tricks.sliding_window_view(self.highs.last(span), STOCH_PERIOD).max(axis=-1)
+            lows = np.lib.stride_tricks.sliding_window_view(self.lows.last(span), STOCH_PERIOD).min(axis=-1)
+            closes = self.closes.last(STOCH_SMOOTH)
+            ranges = highs - lows
+            stoch_k = np.where(ranges != 0, 100.0 * (closes - lows) / np.where(ranges != 0, ranges, 1.0), 50.0)
+            result['stochastic_k'] = float(stoch_k[-1])
+            result['stochastic_d'] = float(stoch_k.mean())
+            result['williams_r'] = -100.0 * (highs[-1] - close) / ranges[-1] if ranges[-1] else -50.0
+        else:
+            result['stochastic_k'] = result['stochastic_d'] = result['williams_r'] = nan
+
+        if self.count >= CCI_PERIOD:
+            window = self.typical.last(CCI_PERIOD)
+            tp_mean = window.mean()
+            mean_dev = np.abs(window - tp_mean).mean()
+            result['cci'] = (window[-1] - tp_mean) / (0.015 * mean_dev) if mean_dev else 0.0
+        else:
+            result['cci'] = nan
+
+        result['adx'] = self.adx
+
+        if self.count > AROON_PERIOD:
+            since_high = int(self.highs.last(AROON_PERIOD + 1)[::-1].argmax())
+            since_low = int(self.lows.last(AROON_PERIOD + 1)[::-1].argmin())
+            result['aroon_up'] = 100.0 * (AROON_PERIOD - since_high) / AROON_PERIOD
+            result['aroon_down'] = 100.0 * (AROON_PERIOD - since_low) / AROON_PERIOD
+        else:
+            result['aroon_up'] = result['aroon_down'] = nan
+
+        if self.volatility.size:
+            history = self.volatility.last(self.volatility.size)
+            current = history[-1]
+            result['historical_volatility'] = float(current)
+            result['volatility_percentile'] = float((history <= current).mean() * 100.0)
+        else:
+            result['historical_volatility'] = result['volatility_percentile'] = nan
+
+        result['average_volume'] = average_volume
+        result['short_volume'] = float(self.volumes.last(SHORT_VOLUME_PERIOD).mean()) \
+            if self.count >= SHORT_VOLUME_PERIOD else nan
+        return {name: float(value) for name, value in result.items()}
+
+    @classmethod
+    def from_history(cls, ohlcv):
+        """
+        Seed a state from a full OHLCV history in one vectorized pass.
+
+        Recursive values come from IndicatorEngine.compute; windowed values
+        are copied from the tail of the history, so no bar-by-bar replay runs.
+        """
+        timestamps = np.asarray(ohlcv['timestamp'])
+        high = np.asarray(ohlcv['high'], dtype=np.float64)
+        low = np.asarray(ohlcv['low'], dtype=np.float64)
+        close = np.asarray(ohlcv['close'], dtype=np.float64)
+        volume = np.asarray(ohlcv['volume'], dtype=np.float64)
+
+        state = cls()
+        if len(close) < 2:
+            for index in range(len(close)):
+                state.update(timestamps[index], high[index], low[index], close[index], volume[index])
+            return state
+
+        values, seeds = IndicatorEngine.compute(ohlcv, with_state=True)
+        row = {name: float(column[0]) for name, column in values.items()}
+
+        state.count = len(close)
+        state.last_timestamp = int(timestamps[-1])
+        state.prev_close, state.prev_high, state.prev_low = float(close[-1]), float(high[-1]), float(low[-1])
+        state.ema = {window: row[f'ema_{window}'] for window in EMA_WINDOWS}
+        state.ema[MACD_FAST] = float(seeds['ema_fast'][0])
+        state.ema[MACD_SLOW] = float(seeds['ema_slow'][0])
+        state.macd_signal = row['macd_signal']
+        state.avg_gain = float(seeds['avg_gain'][0])
+        state.avg_loss = float(seeds['avg_loss'][0])
+        state.atr = row['atr']
+        state.plus_dm = float(seeds['plus_dm'][0])
+        state.minus_dm = float(seeds['minus_dm'][0])
+        state.adx = row['adx']
+        state.obv = row['obv']
+        state.sums = {window: float(close[-window:].sum()) for window in SMA_WINDOWS}
+        state.volume_sum = float(volume[-VOLUME_PERIOD:].sum())
+        state.closes = RingBuffer(CLOSE_CAPACITY, close)
+        state.highs = RingBuffer(RANGE_CAPACITY, high)
+        state.lows = RingBuffer(RANGE_CAPACITY, low)
+        state.typical = RingBuffer(CCI_PERIOD, (high + low + close)[-CCI_PERIOD:] / 3.0)
+        state.volumes = RingBuffer(VOLUME_PERIOD, volume)
+        tail = close[-VOLATILITY_PERIOD - 1:]
+        ratios = np.divide(tail[1:], tail[:-1], out=np.ones(len(tail) - 1), where=tail[:-1] != 0)
+        state.returns = RingBuffer(VOLATILITY_PERIOD, np.log(ratios))
+        state.volatility = RingBuffer(VOLATILITY_LOOKBACK, seeds['rolling_volatility'][0])
+        return state
+
+    def to_dict(self):
+        """JSON-serializable snapshot of the state"""
+        return {
+            'version': STATE_VERSION,
+            'count': self.count,
+            'last_timestamp': self.last_timestamp,
+            'prev_close': self.prev_close,
+            'prev_high': self.prev_high,
+            'prev_low': self.prev_low,
+            'ema': {str(window): value for window, value in self.ema.items()},
+            'macd_signal': self.macd_signal,
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss,
+            'atr': self.atr,
+            'plus_dm': self.plus_dm,
+            'minus_dm': self.minus_dm,
+            'adx': self.adx,
+            'obv': self.obv,
+            'sums': {str(window): value for window, value in self.sums.items()},
+            'volume_sum': self.volume_sum,
+            'closes': self.closes.to_list(),
+            'highs': self.highs.to_list(),
+            'lows': self.lows.to_list(),
+            'typical': self.typical.to_list(),
+            'volumes': self.volumes.to_list(),
+            'returns': self.returns.to_list(),
+            'volatility': self.volatility.to_list()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a state saved by to_dict (None if the format is outdated)"""
+        if not data or data.get('version') != STATE_VERSION:
+            return None
+        state = cls()
+        for name in ('count', 'last_timestamp', 'prev_close', 'prev_high', 'prev_low',
+                     'macd_signal', 'avg_gain', 'avg_loss', 'atr', 'plus_dm', 'minus_dm',
+                     'adx', 'obv', 'volume_sum'):
+            setattr(state, name, data[name])
+        state.ema = {int(window): value for window, value in data['ema'].items()}
+        state.sums = {int(window): value for window, value in data['sums'].items()}
+        state.closes = RingBuffer(CLOSE_CAPACITY, data['closes'])
+        state.highs = RingBuffer(RANGE_CAPACITY, data['highs'])
+        state.lows = RingBuffer(RANGE_CAPACITY, data['lows'])
+        state.typical = RingBuffer(CCI_PERIOD, data['typical'])
+        state.volumes = RingBuffer(VOLUME_PERIOD, data['volumes'])
+        state.returns = RingBuffer(VOLATILITY_PERIOD, data['returns'])
+        state.volatility = RingBuffer(VOLATILITY_LOOKBACK, data['volatility'])
+        return state
+
+
+def load_indicator_state(store, symbol):
+    """Read a symbol's saved state from its store directory (None if absent)"""
+    try:
+        with open(store.sidecar_path(symbol, 'indicator_state.json')) as handle:
+            return IndicatorState.from_dict(json.load(handle))
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def save_indicator_state(store, symbol, state):
+    """Atomically write a symbol's state next to its price history"""
+    path = store.sidecar_path(symbol, 'indicator_state.json')
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as handle:
+        json.dump(state.to_dict(), handle)
+    os.replace(temp_path, path)
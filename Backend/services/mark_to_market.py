@@ -0,0 +1,150 @@
+"""
+Mark-to-Market Service
+Set-based repricing of every holding and portfolio from a batch of prices
+"""
+
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import (
+    Column, Integer, MetaData, Numeric, String, Table, case, func, insert, select, update
+)
+
+from extensions import db
+from models.portfolio import Holding, Portfolio
+from services.exposure_service import exposure_cache_key
+from services.household_service import household_cache_key
+from services.risk_engine import risk_cache_key
+from utils.cache import cache_delete_many
+
+PRICE_INSERT_BATCH = 5000
+
+# Session-local staging tables for one batch of prices and the portfolios it moves
+_staging = MetaData()
+price_updates = Table(
+    'mtm_price_updates', _staging,
+    Column('asset_name', String(200), primary_key=True),
+    Column('price', Numeric(15, 2), nullable=False),
+    prefixes=['TEMPORARY']
+)
+repriced_portfolios = Table(
+    'mtm_repriced_portfolios', _staging,
+    Column('portfolio_id', Integer, primary_key=True),
+    Column('value_delta', Numeric(24, 6), nullable=False),
+    prefixes=['TEMPORARY']
+)
+
+
+def normalize_prices(prices):
+    """
+    {asset_name: price} from a mapping or (asset_name, price) pairs, as
+    Decimals rounded to paise. Raises ValueError on a non-positive price.
+    """
+    items = prices.items() if hasattr(prices, 'items') else prices
+    normalized = {}
+    for asset_name, price in items:
+        try:
+            value = Decimal(str(price)).quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f'Invalid price for {asset_name}: {price!r}')
+        if not value.is_finite() or value <= 0:
+            raise ValueError(f'Invalid price for {asset_name}: {price!r}')
+        normalized[str(asset_name)] = value
+    return normalized
+
+
+class MarkToMarketService:
+    """Revalues holdings and portfolio totals with a fixed number of statements per batch"""
+
+    @staticmethod
+    def apply_prices(prices, invalidate_cache=True):
+        """
+        Reprice every holding whose asset_name appears in `prices` and shift
+        the aggregates of the portfolios that changed by their value delta.
+
+        The batch is staged in a temporary table and joined in UPDATE ... FROM
+        statements, so the statement count does not grow with the number of
+        holdings. Returns a summary with the affected portfolio and user ids.
+        """
+        started = time.perf_counter()
+        prices = normalize_prices(prices)
+        summary = {'prices': len(prices), 'holdings': 0, 'portfolios': 0, 'portfolio_ids': [], 'user_ids': []}
+        if not prices:
+            return summary
+
+        connection = db.session.connection()
+        _staging.create_all(connection, checkfirst=True)
+        try:
+            connection.execute(price_updates.delete())
+            connection.execute(repriced_portfolios.delete())
+            rows = [{'asset_name': name, 'price': price} for name, price in prices.items()]
+            for start in range(0, len(rows), PRICE_INSERT_BATCH):
+                connection.execute(price_updates.insert(), rows[start:start + PRICE_INSERT_BATCH])
+            MarkToMarketService._reprice(connection, summary)
+        except Exception:
+            # An aborted transaction rejects the DROP too; rolling back discards the staging tables
+            # where DDL is transactional, and any left behind are emptied by the next batch
+            db.session.rollback()
+            raise
+        _staging.drop_all(connection, checkfirst=True)
+        db.session.commit()
+        if invalidate_cache:
+            cache_delete_many(
+                [f'portfolio:{user_id}' for user_id in summary['user_ids']] +
+                [household_cache_key(user_id) for user_id in summary['user_ids']] +
+                [risk_cache_key(portfolio_id) for portfolio_id in summary['portfolio_ids']] +
+                [exposure_cache_key(portfolio_id) for portfolio_id in summary['portfolio_ids']]
+            )
+        summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return summary
+
+    @staticmethod
+    def _reprice(connection, summary):
+        """
+        Stage each moved portfolio's change in value, UPDATE ... FROM the
+        staged prices, then shift the portfolio aggregates by those deltas.
+        A price move leaves the cost basis unchanged.
+        """
+        now = datetime.utcnow()
+        holdings = Holding.__table__
+        portfolios = Portfolio.__table__
+        moved = (
+            holdings.c.asset_name == price_updates.c.asset_name,
+            holdings.c.current_price != price_updates.c.price
+        )
+
+        connection.execute(insert(repriced_portfolios).from_select(
+            ['portfolio_id', 'value_delta'],
+            select(
+                holdings.c.portfolio_id,
+                func.sum(holdings.c.quantity * (price_updates.c.price - holdings.c.current_price))
+            ).where(*moved).group_by(holdings.c.portfolio_id)
+        ))
+        summary['portfolios'] = connection.execute(
+            select(func.count()).select_from(repriced_portfolios)
+        ).scalar()
+        if not summary['portfolios']:
+            return
+
+        summary['holdings'] = connection.execute(
+            update(holdings).where(*moved).values(current_price=price_updates.c.price, last_updated=now)
+        ).rowcount
+
+        delta = repriced_portfolios.c.value_delta
+        cost = portfolios.c.total_value - portfolios.c.total_gain_loss
+        gain_loss = portfolios.c.total_gain_loss + delta
+        connection.execute(
+            update(portfolios).where(portfolios.c.id == repriced_portfolios.c.portfolio_id).values(
+                total_value=portfolios.c.total_value + delta,
+                total_gain_loss=gain_loss,
+                total_gain_loss_percent=case((cost > 0, gain_loss * 100 / cost), else_=0),
+                last_updated=now
+            )
+        )
+
+        owners = connection.execute(select(portfolios.c.id, portfolios.c.user_id).where(
+            portfolios.c.id == repriced_portfolios.c.portfolio_id
+        )).all()
+        summary['portfolio_ids'] = sorted(row[0] for row in owners)
+        summary['user_ids'] = sorted({row[1] for row in owners})
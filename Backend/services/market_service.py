@@ -5,6 +5,27 @@ Market data, predictions, and technical indicators
 
 from datetime import datetime, timedelta
 import json
+import math
+from services.indicator_engine import IndicatorEngine, INDICATOR_NAMES
+from services.forecast_engine import ForecastEngine, AR_ORDER
+from services.indicator_state import IndicatorState, load_indicator_state, save_indicator_state
+from services.ohlcv_store import get_ohlcv_store, normalize_symbol
+import numpy as np
+import threading
+import time
+
+# Indicator subset returned alongside predictions
+PREDICTION_INDICATORS = (
+    'rsi', 'macd', 'sma_50', 'sma_200', 'bollinger_upper', 'bollinger_lower',
+    'atr', 'obv', 'volume_ratio'
+)
+
+# Seconds between on-disk snapshots of a symbol's indicator state
+STATE_SAVE_INTERVAL = 5.0
+
+_indicator_states = {}
+_indicator_states_saved = {}
+_indicator_state_lock = threading.Lock()
 
 class MarketService:
     """Service for market data and predictions"""
@@ -34,12 +55,126 @@ class MarketService:
             }
         }
     
+    @staticmethod
+    def get_price_history(symbol, last=None):
+        """
+        Read OHLCV history for a symbol from the columnar store
+        Returns zero-copy column views, or None when no bars are stored
+        """
+        try:
+            history = get_ohlcv_store().read(symbol, last=last)
+        except ValueError:
+            return None
+        if len(history['timestamp']) == 0:
+            return None
+        return history
+    
+    @staticmethod
+    def get_indicator_state(symbol):
+        """
+        Load a symbol's incremental indicator state and advance it over any
+        bars appended since it was last seen. Returns None without price history.
+        
+        States stay in memory between calls and are written to disk at most
+        every STATE_SAVE_INTERVAL seconds; the stored bars remain the source
+        of truth, so a restart just advances a slightly older snapshot.
+        """
+        history = MarketService.get_price_history(symbol)
+        if history is None:
+            return None
+        
+        store = get_ohlcv_store()
+        key = normalize_symbol(symbol)
+        timestamps = history['timestamp']
+        with _indicator_state_lock:
+            state = _indicator_states.get(key) or load_indicator_state(store, key)
+            start = 0
+            if state is not None and state.last_timestamp is not None:
+                start = int(np.searchsorted(timestamps, state.last_timestamp, side='right'))
+            
+            # Rebuild from history when the state does not line up with it
+            if state is None or start == 0 or timestamps[start - 1] != state.last_timestamp \
+                    or state.count != start:
+                state = IndicatorState.from_history(history)
+            else:
+                for index in range(start, len(timestamps)):
+                    state.update(
+                        timestamps[index], history['high'][index], history['low'][index],
+                        history['close'][index], history['volume'][index]
+                    )
+            _indicator_states[key] = state
+            
+            now = time.time()
+            saved_at, saved_timestamp = _indicator_states_saved.get(key, (0.0, None))
+            if saved_timestamp != state.last_timestamp and now - saved_at >= STATE_SAVE_INTERVAL:
+                save_indicator_state(store, key, state)
+                _indicator_states_saved[key] = (now, state.last_timestamp)
+        return state
+    
+    @staticmethod
+    def ingest_bars(symbol, bars):
+        """
+        Ingest new OHLCV bars for a symbol
+        Appends them to the columnar store, advances the incremental
+        indicator state and returns the refreshed indicator payload.
+        """
+        get_ohlcv_store().append(symbol, bars)
+        state = MarketService.get_indicator_state(symbol)
+        if state is None or state.count < 2:
+            return None
+        as_of = datetime.utcfromtimestamp(state.last_timestamp).date()
+        return MarketService.build_indicator_payload(symbol, state.values(), as_of=as_of)
+    
     @staticmethod
     def get_market_predictions(symbol):
         """
         Get market predictions for a symbol
-        Uses LSTM/ARIMA models from Project 25
+        AR/GARCH forecasts from the batched ForecastEngine (Project 25)
         """
+        return MarketService.get_market_predictions_batch([symbol])[0]
+    
+    @staticmethod
+    def get_market_predictions_batch(symbols):
+        """
+        Get market predictions for many symbols
+        Models are fitted together and cached per (symbol, last bar), so
+        repeat calls only evaluate one dot product per symbol.
+        """
+        histories = {}
+        for symbol in symbols:
+            history = MarketService.get_price_history(symbol)
+            if history is not None:
+                histories[symbol] = (int(history['timestamp'][-1]), history['close'])
+        models = ForecastEngine.get_models(histories)
+        
+        predictions = []
+        for symbol in symbols:
+            model = models.get(symbol)
+            if model is None:
+                predictions.append(MarketService._placeholder_prediction(symbol))
+                continue
+            
+            forecast = model.predict()
+            indicators = MarketService.get_technical_indicators(symbol)['technical_indicators']
+            predictions.append({
+                'symbol': symbol,
+                'expected_return': round(forecast['expected_return'], 4),
+                'volatility': round(forecast['volatility'], 4),
+                'prediction_confidence': round(forecast['prediction_confidence'], 4),
+                'time_horizon_days': forecast['time_horizon_days'],
+                'technical_indicators': {name: indicators.get(name) for name in PREDICTION_INDICATORS},
+                'model': {
+                    'type': f'AR({AR_ORDER})-GARCH(1,1)',
+                    'observations': model.observations,
+                    'garch': model.garch
+                },
+                'prediction_date': datetime.utcnow().isoformat()
+            })
+        return predictions
+    
+    @staticmethod
+    def _placeholder_prediction(symbol):
+        """Prediction returned when a symbol has too little price history"""
         # Placeholder - in production, use actual trained models
         return {
             'symbol': symbol,
@@ -62,11 +197,26 @@ class MarketService:
         }
     
     @staticmethod
-    def get_technical_indicators(symbol):
+    def get_technical_indicators(symbol, ohlcv=None, as_of=None):
         """
         Get technical indicators for a symbol
         Includes 80+ features from Project 29
+
+        Indicators are computed by the vectorized IndicatorEngine from a
+        supplied OHLCV history. Otherwise the symbol's incremental indicator
+        state is advanced over newly stored bars. Placeholder values are
+        returned when no history is available.
         """
+        if ohlcv is not None:
+            values = IndicatorEngine.compute(ohlcv)
+            row = {name: column[0] for name, column in values.items()}
+            return MarketService.build_indicator_payload(symbol, row, as_of=as_of)
+        
+        state = MarketService.get_indicator_state(symbol)
+        if state is not None and state.count >= 2:
+            as_of = as_of or datetime.utcfromtimestamp(state.last_timestamp).date()
+            return MarketService.build_indicator_payload(symbol, state.values(), as_of=as_of)
+
         # Placeholder - in production, calculate from historical data
         return {
             'symbol': symbol,
@@ -116,4 +266,68 @@ class MarketService:
                 'average_volume': 1000000
             }
         }
-
+    
+    @staticmethod
+    def get_technical_indicators_batch(symbols):
+        """
+        Get technical indicators for many symbols at once
+        Symbols whose histories have the same length are stacked into one
+        (symbols x bars) array and computed in a single IndicatorEngine pass.
+        """
+        payloads = {}
+        groups = {}
+        for symbol in symbols:
+            history = MarketService.get_price_history(symbol)
+            if history is None or len(history['close']) < 2:
+                payloads[symbol] = MarketService.get_technical_indicators(symbol)
+            else:
+                groups.setdefault(len(history['close']), []).append((symbol, history))
+        
+        for members in groups.values():
+            stacked = {
+                column: np.stack([history[column] for _, history in members])
+                for column in ('high', 'low', 'close', 'volume')
+            }
+            values = IndicatorEngine.compute(stacked)
+            for index, (symbol, history) in enumerate(members):
+                row = {name: column[index] for name, column in values.items()}
+                as_of = datetime.utcfromtimestamp(int(history['timestamp'][-1])).date()
+                payloads[symbol] = MarketService.build_indicator_payload(symbol, row, as_of=as_of)
+        
+        return [payloads[symbol] for symbol in symbols]
+    
+    @staticmethod
+    def build_indicator_payload(symbol, row, as_of=None):
+        """Shape one symbol's indicator values into the technical indicators response"""
+        def value(name):
+            number = float(row[name])
+            return round(number, 4) if math.isfinite(number) else None
+        
+        average_volume = value('average_volume')
+        short_volume = value('short_volume')
+        if average_volume is None or short_volume is None:
+            volume_trend = None
+        else:
+            volume_trend = 'increasing' if short_volume >= average_volume else 'decreasing'
+        
+        return {
+            'symbol': symbol,
+            'date': (as_of or datetime.utcnow().date()).isoformat(),
+            'technical_indicators': {name: value(name) for name in INDICATOR_NAMES},
+            'market_sentiment': {
+                # Sentiment comes from the news pipeline, not from price history
+                'overall_sentiment': 'neutral',
+                'confidence': 0.5,
+                'news_count': 0
+            },
+            'volatility_metrics': {
+                'historical_volatility': value('historical_volatility'),
+                'implied_volatility': None,  # No options data available
+                'volatility_percentile': value('volatility_percentile')
+            },
+            'volume_analysis': {
+                'volume_ratio': value('volume_ratio'),
+                'volume_trend': volume_trend,
+                'average_volume': average_volume
+            }
+        }
@@ -0,0 +1,210 @@
+"""
+Market Stream
+Process-wide market indices poller that fans out deltas to SSE subscribers
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class StreamMessage:
+    """A pre-encoded Server-Sent Events frame shared by every subscriber"""
+
+    __slots__ = ('payload', 'published_at')
+
+    def __init__(self, event, event_id, data):
+        self.payload = f'event: {event}\nid: {event_id}\ndata: {json.dumps(data)}\n\n'
+        self.published_at = time.time()
+
+
+class Subscriber:
+    """One connected client: a bounded queue of frames waiting to be written"""
+
+    def __init__(self, max_pending):
+        self.messages = queue.Queue(maxsize=max_pending)
+        self.closed = False
+
+    def next(self, timeout):
+        """Next frame, or None on timeout or once the subscriber was dropped"""
+        if self.closed:
+            return None
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class MarketStreamBroadcaster:
+    """
+    Polls a snapshot source once per interval for the whole process and
+    pushes only the fields that changed to every subscriber.
+
+    `volatile_fields` (such as a per-poll timestamp) are left out of the
+    comparison and the frames; each frame carries the poll time once as
+    `_as_of` instead, so an unchanged poll sends nothing.
+
+    Each frame is JSON-encoded once, so a client costs one queue get and one
+    socket write. Clients that fall `max_pending` frames behind are dropped
+    instead of buffering without bound.
+    """
+
+    def __init__(self, source, interval=5.0, max_pending=32, event='indices', volatile_fields=()):
+        self.source = source
+        self.volatile_fields = frozenset(volatile_fields)
+        self.interval = interval
+        self.max_pending = max_pending
+        self.event = event
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._producer = None
+        self._snapshot = None
+        self._as_of = None
+        self._event_id = 0
+        self._counters = {
+            'connections_total': 0,
+            'dropped_clients': 0,
+            'messages_published': 0,
+            'frames_delivered': 0,
+            'poll_errors': 0
+        }
+        self._fanout_last = None
+        self._fanout_max = 0.0
+        self._fanout_total = 0.0
+        self._delivery_total = 0.0
+        self._delivery_max = 0.0
+
+    def subscribe(self):
+        """Register a client; its first frame is the latest full snapshot"""
+        subscriber = Subscriber(self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            self._counters['connections_total'] += 1
+            if self._snapshot is not None:
+                subscriber.messages.put_nowait(
+                    StreamMessage('snapshot', self._event_id, {**self._snapshot, '_as_of': self._as_of})
+                )
+            if self._producer is None or not self._producer.is_alive():
+                self._producer = threading.Thread(
+                    target=self._run, name=f'{self.event}-stream-producer', daemon=True
+                )
+                self._producer.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def record_delivery(self, message):
+        """Called after a frame was written to a client socket"""
+        lag = time.time() - message.published_at
+        with self._lock:
+            self._counters['frames_delivered'] += 1
+            self._delivery_total += lag
+            self._delivery_max = max(self._delivery_max, lag)
+
+    def _run(self):
+        """Producer loop; exits once the last subscriber disconnects"""
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._producer = None
+                    return
+            try:
+                self.publish(self.source())
+            except Exception as e:
+                with self._lock:
+                    self._counters['poll_errors'] += 1
+                logger.warning(f'{self.event} stream poll failed: {e}')
+            time.sleep(self.interval)
+
+    def _stable(self, snapshot):
+        """Snapshot without the volatile fields of its entries"""
+        return {
+            key: {field: item for field, item in value.items() if field not in self.volatile_fields}
+            if isinstance(value, dict) else value
+            for key, value in snapshot.items()
+        }
+
+    @staticmethod
+    def _changes(previous, snapshot):
+        """Changed entries; for dict entries only their changed fields"""
+        data = {}
+        for key, value in snapshot.items():
+            before = previous.get(key)
+            if before == value:
+                continue
+            if isinstance(value, dict) and isinstance(before, dict):
+                data[key] = {field: item for field, item in value.items() if before.get(field) != item}
+            else:
+                data[key] = value
+        removed = [key for key in previous if key not in snapshot]
+        if removed:
+            data['_removed'] = removed
+        return data
+
+    def publish(self, snapshot):
+        """Send the fields of `snapshot` that changed since the previous poll"""
+        snapshot = self._stable(snapshot)
+        as_of = datetime.utcnow().isoformat()
+        with self._lock:
+            if self._snapshot is None:
+                event, data = 'snapshot', dict(snapshot)
+            else:
+                event, data = 'delta', self._changes(self._snapshot, snapshot)
+            self._snapshot = snapshot
+            self._as_of = as_of
+            if not data:
+                return None
+            data['_as_of'] = as_of
+            self._event_id += 1
+            message = StreamMessage(event, self._event_id, data)
+            subscribers = list(self._subscribers)
+
+        started = time.time()
+        dropped = []
+        for subscriber in subscribers:
+            try:
+                subscriber.messages.put_nowait(message)
+            except queue.Full:
+                dropped.append(subscriber)
+        elapsed = time.time() - started
+
+        with self._lock:
+            for subscriber in dropped:
+                subscriber.closed = True
+                self._subscribers.discard(subscriber)
+            self._counters['dropped_clients'] += len(dropped)
+            self._counters['messages_published'] += 1
+            self._fanout_last = elapsed
+            self._fanout_max = max(self._fanout_max, elapsed)
+            self._fanout_total += elapsed
+        return message
+
+    def metrics(self):
+        """Connection, fan-out and delivery counters for this process"""
+        with self._lock:
+            counters = dict(self._counters)
+            connections = len(self._subscribers)
+            published = counters['messages_published']
+            delivered = counters['frames_delivered']
+            return {
+                'connections': connections,
+                **counters,
+                'fanout_latency_ms': {
+                    'last': round(self._fanout_last * 1000, 3) if self._fanout_last is not None else None,
+                    'average': round(self._fanout_total / published * 1000, 3) if published else None,
+                    'max': round(self._fanout_max * 1000, 3) if published else None
+                },
+                'delivery_latency_ms': {
+                    'average': round(self._delivery_total / delivered * 1000, 3) if delivered else None,
+                    'max': round(self._delivery_max * 1000, 3) if delivered else None
+                },
+                'poll_interval_seconds': self.interval
+            }
@@ -0,0 +1,220 @@
+"""
+OHLCV Store
+Append-only, memory-mapped columnar price history per symbol
+"""
+
+import os
+import re
+import threading
+from functools import reduce
+
+import numpy as np
+
+# One fixed-dtype file per column; timestamps are UTC epoch seconds
+COLUMNS = (
+    ('timestamp', np.dtype('<i8')),
+    ('open', np.dtype('<f8')),
+    ('high', np.dtype('<f8')),
+    ('low', np.dtype('<f8')),
+    ('close', np.dtype('<f8')),
+    ('volume', np.dtype('<f8')),
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+_SYMBOL_PATTERN = re.compile(r'^[A-Z0-9][A-Z0-9._&-]{0,49}$')
+
+
+def normalize_symbol(symbol):
+    """Upper-case a symbol and reject anything unsafe to use as a directory name"""
+    symbol = (symbol or '').strip().upper()
+    if not _SYMBOL_PATTERN.match(symbol) or '..' in symbol:
+        raise ValueError(f'Invalid symbol: {symbol!r}')
+    return symbol
+
+
+class _SymbolColumns:
+    """Memory maps for one symbol, valid for a fixed number of rows"""
+
+    __slots__ = ('length', 'columns')
+
+    def __init__(self, length, columns):
+        self.length = length
+        self.columns = columns
+
+
+class OHLCVStore:
+    """
+    Per-symbol columnar store for OHLCV bars.
+
+    Each symbol is a directory with one little-endian binary file per column.
+    Appends go to the end of every file; reads return read-only views of the
+    memory-mapped files, so range queries never copy data or touch the database.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._maps = {}
+        self._lock = threading.RLock()
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.root, symbol)
+
+    def _column_path(self, symbol, column):
+        return os.path.join(self._symbol_dir(symbol), f'{column}.bin')
+
+    def _row_count(self, symbol):
+        """
+        Rows committed to every column.
+
+        The timestamp column is always written last, so its length is the
+        commit marker and a torn append in the other columns stays invisible.
+        """
+        try:
+            size = os.stat(self._column_path(symbol, 'timestamp')).st_size
+        except FileNotFoundError:
+            return 0
+        return size // COLUMNS[0][1].itemsize
+
+    def _columns(self, symbol):
+        """Return memory maps covering every committed row, remapping after growth"""
+        symbol = normalize_symbol(symbol)
+        length = self._row_count(symbol)
+        cached = self._maps.get(symbol)
+        if cached is not None and cached.length == length:
+            return cached
+
+        with self._lock:
+            cached = self._maps.get(symbol)
+            if cached is not None and cached.length == length:
+                return cached
+            columns = {}
+            for name, dtype in COLUMNS:
+                if length == 0:
+                    columns[name] = np.empty(0, dtype=dtype)
+                else:
+                    mapped = np.memmap(
+                        self._column_path(symbol, name), dtype=dtype, mode='r', shape=(length,)
+                    )
+                    # Plain ndarray view of the mapping: slicing stays zero-copy
+                    # without the per-slice overhead of the memmap subclass
+                    columns[name] = mapped.view(np.ndarray)
+            cached = _SymbolColumns(length, columns)
+            self._maps[symbol] = cached
+            return cached
+
+    def sidecar_path(self, symbol, filename):
+        """Path for derived data kept alongside a symbol's columns"""
+        return os.path.join(self._symbol_dir(normalize_symbol(symbol)), filename)
+
+    def symbols(self):
+        """List symbols that have a history directory"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            entry for entry in os.listdir(self.root)
+            if os.path.isdir(os.path.join(self.root, entry))
+        )
+
+    def length(self, symbol):
+        """Number of bars stored for a symbol"""
+        return self._columns(symbol).length
+
+    def last_timestamp(self, symbol):
+        """Timestamp of the latest bar, or None when the symbol has no history"""
+        cached = self._columns(symbol)
+        if cached.length == 0:
+            return None
+        return int(cached.columns['timestamp'][-1])
+
+    def read(self, symbol, start=None, end=None, last=None):
+        """
+        Read bars as a dict of column -> read-only array view.
+
+        `start`/`end` filter by timestamp (inclusive start, exclusive end);
+        `last` keeps only the trailing N bars of the selected range.
+        """
+        cached = self._columns(symbol)
+        lo, hi = 0, cached.length
+        if cached.length and (start is not None or end is not None):
+            timestamps = cached.columns['timestamp']
+            if start is not None:
+                lo = int(np.searchsorted(timestamps, start, side='left'))
+            if end is not None:
+                hi = int(np.searchsorted(timestamps, end, side='left'))
+        if last is not None:
+            lo = max(lo, hi - int(last))
+        return {name: column[lo:hi] for name, column in cached.columns.items()}
+
+    def read_aligned(self, symbols, start=None, end=None, column='close'):
+        """
+        Timestamps on which every symbol has a bar, with the matching
+        (bars x symbols) values of `column`.
+        """
+        histories = [self.read(symbol, start=start, end=end) for symbol in symbols]
+        common = reduce(np.intersect1d, [history['timestamp'] for history in histories])
+        if not len(common):
+            return common, np.empty((0, len(symbols)))
+        values = np.column_stack([
+            history[column][np.searchsorted(history['timestamp'], common)] for history in histories
+        ])
+        return common, values
+
+    def append(self, symbol, bars):
+        """
+        Append bars for a symbol.
+
+        `bars` maps every column name to an equal-length sequence. Timestamps
+        must be strictly increasing and later than the stored history.
+        Returns the number of bars written.
+        """
+        missing = [name for name in COLUMN_NAMES if name not in bars]
+        if missing:
+            raise ValueError(f'Missing OHLCV columns: {missing}')
+
+        arrays = {
+            name: np.ascontiguousarray(np.asarray(bars[name]).astype(dtype, copy=False).ravel())
+            for name, dtype in COLUMNS
+        }
+        count = len(arrays['timestamp'])
+        if any(len(values) != count for values in arrays.values()):
+            raise ValueError('OHLCV columns must have equal lengths')
+        if count == 0:
+            return 0
+        if count > 1 and np.any(np.diff(arrays['timestamp']) <= 0):
+            raise ValueError('Bar timestamps must be strictly increasing')
+
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            os.makedirs(self._symbol_dir(symbol), exist_ok=True)
+            length = self._row_count(symbol)
+            if length:
+                last = self._columns(symbol).columns['timestamp'][-1]
+                if arrays['timestamp'][0] <= last:
+                    raise ValueError('Bars must be newer than the stored history')
+
+            # Drop any torn tail left by an interrupted append, then write the
+            # timestamp column last so a partial write never becomes visible
+            for name, dtype in COLUMNS:
+                path = self._column_path(symbol, name)
+                if os.path.exists(path) and os.path.getsize(path) != length * dtype.itemsize:
+                    os.truncate(path, length * dtype.itemsize)
+            for name, _ in COLUMNS[1:] + COLUMNS[:1]:
+                with open(self._column_path(symbol, name), 'ab') as handle:
+                    arrays[name].tofile(handle)
+            self._maps.pop(symbol, None)
+        return count
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_ohlcv_store():
+    """Process-wide store rooted at Config.OHLCV_STORE_DIR"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                from config import Config
+                _default_store = OHLCVStore(Config.OHLCV_STORE_DIR)
+    return _default_store
@@ -0,0 +1,303 @@
+"""
+Portfolio Optimizer
+Constrained mean-variance allocation solved with batched projected gradient
+"""
+
+import hashlib
+import math
+
+import numpy as np
+
+from config import Config
+from services.behavioral_service import BehavioralService
+from services.covariance_service import CovarianceService, TRADING_DAYS
+from services.efficient_frontier import FrontierService
+
+ASSET_CLASSES = ('equity', 'debt', 'gold', 'international')
+
+# Long-run annual return assumptions per asset class
+EXPECTED_RETURNS = {'equity': 0.12, 'debt': 0.07, 'gold': 0.08, 'international': 0.10}
+
+# Fallback risk model while the asset class proxies lack price history
+DEFAULT_VOLATILITY = {'equity': 0.18, 'debt': 0.05, 'gold': 0.15, 'international': 0.20}
+DEFAULT_CORRELATION = {
+    ('equity', 'debt'): 0.10,
+    ('equity', 'gold'): -0.05,
+    ('equity', 'international'): 0.60,
+    ('debt', 'gold'): 0.10,
+    ('debt', 'international'): 0.05,
+    ('gold', 'international'): 0.05
+}
+FALLBACK_RETURN = 0.08
+FALLBACK_VOLATILITY = 0.20
+
+# (min, max) weight per asset class for each risk category
+ASSET_CLASS_BOUNDS = {
+    'conservative': {
+        'equity': (0.10, 0.40), 'debt': (0.40, 0.80), 'gold': (0.00, 0.15), 'international': (0.00, 0.15)
+    },
+    'moderate': {
+        'equity': (0.30, 0.65), 'debt': (0.15, 0.50), 'gold': (0.00, 0.15), 'international': (0.00, 0.20)
+    },
+    'aggressive': {
+        'equity': (0.50, 0.85), 'debt': (0.05, 0.30), 'gold': (0.00, 0.10), 'international': (0.00, 0.25)
+    }
+}
+DEFAULT_BOUNDS = (0.0, 0.25)
+
+# Risk score 0 maps to the highest risk aversion, 100 to the lowest
+RISK_AVERSION_MAX = 12.0
+RISK_AVERSION_MIN = 1.5
+RISK_BUCKET_WIDTH = 10
+CATEGORY_SCORES = {'conservative': 20, 'moderate': 50, 'aggressive': 80}
+
+MAX_ITERATIONS = 5000
+TOLERANCE = 1e-10
+TURNOVER_GRID = 64  # blend fractions per refinement of the turnover limit
+TURNOVER_ROUNDS = 4
+
+
+def risk_bucket(risk_score):
+    """Bucket index for a 0-100 risk score"""
+    score = min(max(float(risk_score), 0.0), 100.0)
+    return min(int(score // RISK_BUCKET_WIDTH), 100 // RISK_BUCKET_WIDTH - 1)
+
+
+def risk_aversion(risk_score):
+    """Log-linear map from a 0-100 risk score to mean-variance risk aversion"""
+    fraction = min(max(float(risk_score), 0.0), 100.0) / 100.0
+    return RISK_AVERSION_MAX * (RISK_AVERSION_MIN / RISK_AVERSION_MAX) ** fraction
+
+
+def project_capped_simplex(points, lower, upper):
+    """
+    Euclidean projection of each row onto {lower <= w <= upper, sum(w) = 1}.
+
+    The projection is clip(v - tau, lower, upper) where the sum hits one.
+    That sum is piecewise linear in tau with breakpoints at v - upper and
+    v - lower, so sorting them locates tau exactly for every row at once.
+    """
+    batch, assets = points.shape
+    lower = np.broadcast_to(lower, points.shape)
+    upper = np.broadcast_to(upper, points.shape)
+    breaks = np.concatenate([points - upper, points - lower], axis=1)
+    # Passing v - upper frees a coordinate (slope -1), passing v - lower pins it again
+    changes = np.concatenate([-np.ones((batch, assets)), np.ones((batch, assets))], axis=1)
+    order = np.argsort(breaks, axis=1)
+    breaks = np.take_along_axis(breaks, order, axis=1)
+    slopes = np.cumsum(np.take_along_axis(changes, order, axis=1), axis=1)
+
+    totals = np.empty_like(breaks)
+    totals[:, 0] = upper.sum(axis=1)
+    totals[:, 1:] = totals[:, :1] + np.cumsum(slopes[:, :-1] * np.diff(breaks, axis=1), axis=1)
+
+    segment = np.maximum((totals >= 1.0).sum(axis=1) - 1, 0)[:, None]
+    start = np.take_along_axis(breaks, segment, axis=1)[:, 0]
+    total = np.take_along_axis(totals, segment, axis=1)[:, 0]
+    slope = np.take_along_axis(slopes, segment, axis=1)[:, 0]
+    tau = np.where(slope < 0, start + (total - 1.0) / np.where(slope < 0, -slope, 1.0), start)
+    return np.clip(points - tau[:, None], lower, upper)
+
+
+def solve_mean_variance(expected_returns, covariance, aversion, lower, upper):
+    """
+    Maximise mu'w - (aversion / 2) w'Sigma w subject to the bounds and
+    full investment, for a batch of risk aversions (and bounds) at once.
+
+    Accelerated projected gradient (FISTA); returns a (batch x assets) array.
+    """
+    mu = np.asarray(expected_returns, dtype=np.float64)
+    sigma = np.asarray(covariance, dtype=np.float64)
+    gammas = np.atleast_1d(np.asarray(aversion, dtype=np.float64))
+    batch, assets = len(gammas), len(mu)
+    lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), (batch, assets))
+    upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), (batch, assets))
+    if np.any(gammas <= 0):
+        raise ValueError('Risk aversion must be positive')
+    if np.any(lower > upper) or np.any(lower.sum(axis=1) > 1 + 1e-9) or np.any(upper.sum(axis=1) < 1 - 1e-9):
+        raise ValueError('Weight bounds are infeasible')
+
+    step = 1.0 / (gammas * max(float(np.linalg.eigvalsh(sigma)[-1]), 1e-12))
+    weights = project_capped_simplex(np.full((batch, assets), 1.0 / assets), lower, upper)
+    momentum = weights.copy()
+    t = 1.0
+    for _ in range(MAX_ITERATIONS):
+        gradient = gammas[:, None] * (momentum @ sigma) - mu
+        updated = project_capped_simplex(momentum - step[:, None] * gradient, lower, upper)
+        t_next = 0.5 * (1.0 + math.sqrt(1.0 + 4.0 * t * t))
+        momentum = updated + ((t - 1.0) / t_next) * (updated - weights)
+        converged = np.abs(updated - weights).max() < TOLERANCE
+        weights, t = updated, t_next
+        if converged:
+            break
+    return weights
+
+
+def _turnover(weights, current):
+    return 0.5 * float(np.abs(weights - current).sum())
+
+
+def limit_turnover(target, current, max_turnover, lower, upper):
+    """
+    Move from `current` towards `target` only as far as the one-way turnover
+    cap allows, staying within [lower, upper]; returns (weights, turnover,
+    limited). Blends are projected back onto the bounds, and the largest
+    blend within the cap is located on successively finer grids of blend
+    fractions, one batched projection per grid. When the bounds alone need
+    more turnover than the cap (projecting `current` onto them), the bounds
+    win and that turnover becomes the cap.
+    """
+    turnover = _turnover(target, current)
+    if max_turnover is None or turnover <= max_turnover:
+        return target, turnover, False
+
+    weights = project_capped_simplex(current[None, :], lower, upper)[0]
+    limit = max(max_turnover, _turnover(weights, current))
+    low, high = 0.0, 1.0
+    for _ in range(TURNOVER_ROUNDS):
+        fractions = np.linspace(low, high, TURNOVER_GRID + 1)[1:]
+        blends = project_capped_simplex(current + fractions[:, None] * (target - current), lower, upper)
+        within = np.flatnonzero(0.5 * np.abs(blends - current).sum(axis=1) <= limit)
+        step = (high - low) / TURNOVER_GRID
+        if len(within):
+            weights = blends[within[-1]]
+            low = fractions[within[-1]]
+        high = min(low + step, high)
+    return weights, _turnover(weights, current), True
+
+
+def _default_covariance(assets):
+    volatility = np.array([DEFAULT_VOLATILITY.get(asset, FALLBACK_VOLATILITY) for asset in assets])
+    correlation = np.eye(len(assets))
+    for i, first in enumerate(assets):
+        for j, second in enumerate(assets):
+            if i != j:
+                correlation[i, j] = DEFAULT_CORRELATION.get(
+                    (first, second), DEFAULT_CORRELATION.get((second, first), 0.0)
+                )
+    return np.outer(volatility, volatility) * correlation
+
+
+class PortfolioOptimizer:
+    """Mean-variance allocation across asset classes with behavioral constraints"""
+
+    @staticmethod
+    def risk_model(assets):
+        """
+        Annual expected returns, covariance and version for `assets`, from the
+        rolling covariance service or the default assumptions.
+        """
+        try:
+            matrix = CovarianceService.get_asset_class_matrix(assets)
+        except ValueError:
+            matrix = None
+        if matrix is None:
+            covariance = _default_covariance(assets)
+            historical = {}
+            version = 'default-' + hashlib.sha1(covariance.tobytes()).hexdigest()[:12]
+        else:
+            covariance = matrix.annual_covariance
+            historical = dict(zip(assets, matrix.mean * TRADING_DAYS))
+            version = matrix.version
+        expected = np.array([
+            EXPECTED_RETURNS.get(asset, historical.get(asset, FALLBACK_RETURN)) for asset in assets
+        ])
+        return expected, covariance, version
+
+    @staticmethod
+    def bounds(risk_category, assets, equity_cap_reduction=0.0):
+        """Per-asset (lower, upper) arrays, with the behavioral equity cap applied"""
+        table = ASSET_CLASS_BOUNDS.get(risk_category, ASSET_CLASS_BOUNDS['moderate'])
+        lower = np.array([table.get(asset, DEFAULT_BOUNDS)[0] for asset in assets])
+        upper = np.array([table.get(asset, DEFAULT_BOUNDS)[1] for asset in assets])
+        if equity_cap_reduction > 0 and 'equity' in assets:
+            index = assets.index('equity')
+            upper[index] = max(upper[index] - equity_cap_reduction, 0.0)
+            lower[index] = min(lower[index], upper[index])
+        return lower, upper
+
+    @staticmethod
+    def equity_cap_reduction(behavioral_data):
+        """Equity ceiling cut implied by the behavioral risk adjustments"""
+        if not behavioral_data:
+            return 0.0
+        adjustments = BehavioralService.analyze_behavioral_metrics(behavioral_data)['risk_adjustments']
+        return round(max(0.0, -sum(adjustments.values())), 4)
+
+    @staticmethod
+    def frontier(risk_category, assets=ASSET_CLASSES, equity_cap_reduction=0.0):
+        """
+        Precomputed efficient frontier for a category's bounds under the
+        current risk model; returns (frontier, warm, covariance_version).
+        """
+        assets = tuple(assets)
+        expected, covariance, version = PortfolioOptimizer.risk_model(assets)
+        lower, upper = PortfolioOptimizer.bounds(risk_category, assets, equity_cap_reduction)
+        frontier, warm = FrontierService.get(
+            assets, expected, covariance, version, lower, upper, solve_mean_variance
+        )
+        return frontier, warm, version
+
+    @staticmethod
+    def optimize(risk_category, risk_score=None, behavioral_data=None, current_allocation=None,
+                 max_turnover=None, assets=ASSET_CLASSES):
+        """
+        Optimal weights plus risk metrics, interpolated from the efficient
+        frontier for the (risk model, constraint set) pair.
+        """
+        assets = tuple(assets)
+        if risk_score is None:
+            risk_score = CATEGORY_SCORES.get(risk_category, CATEGORY_SCORES['moderate'])
+        aversion = risk_aversion(risk_score)
+        cap_reduction = PortfolioOptimizer.equity_cap_reduction(behavioral_data)
+
+        frontier, warm, version = PortfolioOptimizer.frontier(risk_category, assets, cap_reduction)
+        weights = frontier.at_aversion(aversion)
+        if cap_reduction > 0:
+            # Compare against the uncapped frontier to report the cap's effect
+            unconstrained = PortfolioOptimizer.frontier(risk_category, assets)[0].at_aversion(aversion)
+        else:
+            unconstrained = weights
+        shift = {asset: float(weights[i] - unconstrained[i]) for i, asset in enumerate(assets)}
+
+        turnover = None
+        turnover_limited = turnover_exceeded = False
+        if current_allocation:
+            current = np.array([float(current_allocation.get(asset, 0.0)) for asset in assets])
+            if current.sum() > 0:
+                lower, upper = PortfolioOptimizer.bounds(risk_category, assets, cap_reduction)
+                weights, turnover, turnover_limited = limit_turnover(
+                    weights, current / current.sum(), max_turnover, lower, upper
+                )
+                # The category bounds and equity cap needed more turnover than max_turnover allows
+                turnover_exceeded = max_turnover is not None and turnover > max_turnover + 1e-9
+
+        expected, covariance = frontier.expected_returns, frontier.covariance
+        expected_return = float(weights @ expected)
+        volatility = math.sqrt(max(float(weights @ covariance @ weights), 0.0))
+        sharpe = (expected_return - Config.RISK_FREE_RATE) / volatility if volatility > 0 else 0.0
+
+        return {
+            'allocation': {asset: round(float(weight), 4) for asset, weight in zip(assets, weights)},
+            'expected_return': round(expected_return, 4),
+            'risk_metrics': {
+                'volatility': round(volatility, 4),
+                'sharpe_ratio': round(sharpe, 4),
+                # Two-sigma one-year loss, a parametric stand-in for drawdown
+                'max_drawdown': round(max(0.0, 2.0 * volatility - expected_return), 4)
+            },
+            'behavioral_adjustments': {
+                'equity_cap_reduction': cap_reduction,
+                'equity_reduction': round(max(0.0, -shift.get('equity', 0.0)), 4),
+                'debt_increase': round(max(0.0, shift.get('debt', 0.0)), 4)
+            },
+            'optimization': {
+                'risk_bucket': risk_bucket(risk_score),
+                'risk_aversion': round(aversion, 4),
+                'covariance_version': version,
+                'turnover': round(turnover, 4) if turnover is not None else None,
+                'turnover_limited': turnover_limited,
+                'turnover_exceeded': turnover_exceeded
+            },
+            'cached': warm
+        }
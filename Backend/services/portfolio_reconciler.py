@@ -0,0 +1,98 @@
+"""
+Portfolio Reconciler
+Consistency check of incrementally maintained portfolio aggregates
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import bindparam, update
+
+from config import Config
+from extensions import db
+from models.portfolio import Portfolio
+from services.household_service import household_cache_key
+from services.valuation_engine import ValuationEngine
+from utils.cache import cache_delete_many
+
+_PAISE = Decimal('0.01')
+_BASIS = Decimal('0.0001')
+
+
+def _exact_figures(total_value, total_cost):
+    """Aggregates as stored (paise, 4dp percent) from exact totals in 1e-6 units"""
+    value = Decimal(total_value).scaleb(-6)
+    cost = Decimal(total_cost).scaleb(-6)
+    gain_loss = value - cost
+    percent = gain_loss / cost * 100 if cost > 0 else Decimal('0')
+    return (
+        value.quantize(_PAISE, ROUND_HALF_UP),
+        gain_loss.quantize(_PAISE, ROUND_HALF_UP),
+        percent.quantize(_BASIS, ROUND_HALF_UP)
+    )
+
+
+class PortfolioReconciler:
+    """Recomputes every portfolio from its holdings and repairs drifted aggregates"""
+
+    @staticmethod
+    def check(fix=False, tolerance=None):
+        """
+        Compare stored total_value / total_gain_loss with the exact sums over
+        holdings. Portfolios off by more than `tolerance` rupees are reported
+        and, with `fix`, rewritten in one executemany UPDATE.
+        """
+        tolerance = Decimal(str(Config.PORTFOLIO_DRIFT_TOLERANCE if tolerance is None else tolerance))
+        exact = {
+            portfolio_id: _exact_figures(value, cost)
+            for portfolio_id, (value, cost)
+            in ValuationEngine.totals_by_portfolio(*ValuationEngine.load_columns()).items()
+        }
+        empty = (Decimal('0.00'), Decimal('0.00'), Decimal('0.0000'))
+
+        stored = db.session.query(
+            Portfolio.id, Portfolio.user_id, Portfolio.total_value, Portfolio.total_gain_loss
+        ).all()
+        drifted = []
+        for portfolio_id, user_id, total_value, total_gain_loss in stored:
+            value, gain_loss, percent = exact.get(portfolio_id, empty)
+            value_drift = abs(Decimal(total_value or 0) - value)
+            gain_loss_drift = abs(Decimal(total_gain_loss or 0) - gain_loss)
+            if value_drift > tolerance or gain_loss_drift > tolerance:
+                drifted.append({
+                    'portfolio_id': portfolio_id,
+                    'user_id': user_id,
+                    'stored_value': float(total_value or 0),
+                    'expected_value': float(value),
+                    'stored_gain_loss': float(total_gain_loss or 0),
+                    'expected_gain_loss': float(gain_loss),
+                    '_exact': (value, gain_loss, percent)
+                })
+
+        if fix and drifted:
+            table = Portfolio.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_id')).values(
+                    total_value=bindparam('b_value'),
+                    total_gain_loss=bindparam('b_gain_loss'),
+                    total_gain_loss_percent=bindparam('b_percent')
+                ),
+                [{
+                    'b_id': row['portfolio_id'],
+                    'b_value': row['_exact'][0],
+                    'b_gain_loss': row['_exact'][1],
+                    'b_percent': row['_exact'][2]
+                } for row in drifted]
+            )
+            db.session.commit()
+            user_ids = sorted({row['user_id'] for row in drifted})
+            cache_delete_many([f'portfolio:{user_id}' for user_id in user_ids] +
+                              [household_cache_key(user_id) for user_id in user_ids])
+
+        for row in drifted:
+            del row['_exact']
+        return {
+            'checked': len(stored),
+            'drifted': len(drifted),
+            'fixed': len(drifted) if fix else 0,
+            'portfolios': drifted
+        }
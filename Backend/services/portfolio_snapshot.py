@@ -0,0 +1,103 @@
+"""
+Portfolio Snapshot
+Immutable view of a portfolio, its holdings and aggregates from a single query
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import func, select
+
+from extensions import db
+from models.portfolio import Holding, Portfolio
+from services.valuation_engine import ValuationEngine
+
+HOLDING_FIELDS = (
+    'id', 'portfolio_id', 'asset_type', 'asset_name', 'quantity', 'current_price',
+    'purchase_price', 'allocation', 'ai_recommendation', 'last_updated'
+)
+
+
+class HoldingSnapshot(namedtuple('HoldingSnapshot', HOLDING_FIELDS)):
+    """Read-only holding row with the same serialization as the ORM model"""
+
+    __slots__ = ()
+
+    totals = Holding.totals
+    to_dict = Holding.to_dict
+
+
+class PortfolioSnapshot(namedtuple('PortfolioSnapshot', (
+    'id', 'user_id', 'total_value', 'total_gain_loss', 'total_gain_loss_percent',
+    'last_updated', 'holdings_count', 'asset_values', 'holdings'
+))):
+    """
+    Portfolio row plus its holdings, holdings count and current value per
+    asset type. Built by PortfolioSnapshot.load; never attached to a session.
+    """
+
+    __slots__ = ()
+
+    performance = Portfolio.performance
+
+    def to_dict(self):
+        """Same shape as Portfolio.to_dict, without the extra count query"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'total_value': float(self.total_value) if self.total_value else 0.0,
+            'total_gain_loss': float(self.total_gain_loss) if self.total_gain_loss else 0.0,
+            'total_gain_loss_percent': float(self.total_gain_loss_percent) if self.total_gain_loss_percent else 0.0,
+            'last_updated': self.last_updated.isoformat() if self.last_updated else None,
+            'holdings_count': self.holdings_count
+        }
+
+    def holdings_to_dict(self):
+        """Serialized holdings with values computed column-wise"""
+        return [
+            holding.to_dict(valuation=valuation)
+            for holding, valuation in zip(self.holdings, ValuationEngine.holding_values(self.holdings))
+        ]
+
+    @classmethod
+    def load(cls, user_id=None, portfolio_id=None):
+        """
+        Snapshot of a portfolio by id, or of the user's first portfolio, in
+        one round trip: portfolios LEFT JOIN holdings with the holdings count
+        and per-asset-type values as window aggregates. None if not found.
+        """
+        portfolios = Portfolio.__table__
+        holdings = Holding.__table__
+        if portfolio_id is not None:
+            condition = portfolios.c.id == portfolio_id
+        elif user_id is not None:
+            condition = portfolios.c.id == select(func.min(portfolios.c.id)) \
+                .where(portfolios.c.user_id == user_id).scalar_subquery()
+        else:
+            raise ValueError('user_id or portfolio_id is required')
+
+        value = holdings.c.quantity * holdings.c.current_price
+        query = select(
+            portfolios.c.id, portfolios.c.user_id, portfolios.c.total_value, portfolios.c.total_gain_loss,
+            portfolios.c.total_gain_loss_percent, portfolios.c.last_updated,
+            func.count(holdings.c.id).over(partition_by=portfolios.c.id).label('holdings_count'),
+            func.sum(value).over(partition_by=(portfolios.c.id, holdings.c.asset_type)).label('asset_value'),
+            *(holdings.c[name] for name in HOLDING_FIELDS)
+        ).select_from(
+            portfolios.outerjoin(holdings, holdings.c.portfolio_id == portfolios.c.id)
+        ).where(condition).order_by(holdings.c.id)
+
+        rows = db.session.execute(query).all()
+        if not rows:
+            return None
+        first = rows[0]
+        holding_rows = tuple(
+            HoldingSnapshot(*row[8:]) for row in rows if row[8] is not None
+        )
+        asset_values = {}
+        for row in rows:
+            if row[8] is not None:
+                asset_values[row.asset_type] = float(row.asset_value or 0)
+        return cls(
+            first[0], first[1], first[2], first[3], first[4], first[5],
+            first.holdings_count, asset_values, holding_rows
+        )
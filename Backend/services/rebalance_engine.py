@@ -0,0 +1,208 @@
+"""
+Rebalance Engine
+Cost-aware rebalancing into tolerance bands with the fewest per-holding trades
+"""
+
+import math
+
+import numpy as np
+
+from config import Config
+
+QUANTITY_DECIMALS = 4
+WEIGHT_EPSILON = 1e-12
+# Trade to this fraction of the band so costs and lot rounding cannot push a class back out
+BAND_TARGET_FRACTION = 0.9
+
+
+def trade_costs(amounts, asset_types):
+    """Brokerage (a rate capped per order) plus securities transaction tax per trade"""
+    amounts = np.abs(np.asarray(amounts, dtype=np.float64))
+    stt = np.array([Config.REBALANCE_STT_RATES.get(asset_type, 0.0) for asset_type in asset_types])
+    brokerage = np.minimum(amounts * Config.REBALANCE_BROKERAGE_RATE, Config.REBALANCE_BROKERAGE_CAP)
+    return np.where(amounts > 0, brokerage + amounts * stt, 0.0)
+
+
+def affordable(budgets, asset_types):
+    """
+    Largest trade amount per budget whose amount plus trade_costs fits it:
+    budget / (1 + brokerage rate + STT) while brokerage is under its cap,
+    otherwise (budget - cap) / (1 + STT).
+    """
+    budgets = np.maximum(np.asarray(budgets, dtype=np.float64), 0.0)
+    stt = np.array([Config.REBALANCE_STT_RATES.get(asset_type, 0.0) for asset_type in asset_types])
+    uncapped = budgets / (1.0 + Config.REBALANCE_BROKERAGE_RATE + stt)
+    capped = np.maximum(budgets - Config.REBALANCE_BROKERAGE_CAP, 0.0) / (1.0 + stt)
+    return np.where(uncapped * Config.REBALANCE_BROKERAGE_RATE <= Config.REBALANCE_BROKERAGE_CAP, uncapped, capped)
+
+
+def band_weights(current, target, tolerance, cost_rates):
+    """
+    Cheapest class weights within [target - tolerance, target + tolerance]
+    that sum to one.
+
+    Clipping into the bands is the unavoidable move. Any excess or shortfall
+    it leaves is absorbed by the classes with the lowest cost rate first,
+    which solves this single-budget linear program exactly.
+    """
+    lower = np.clip(target - tolerance, 0.0, 1.0)
+    upper = np.clip(target + tolerance, 0.0, 1.0)
+    if lower.sum() > 1.0 + WEIGHT_EPSILON or upper.sum() < 1.0 - WEIGHT_EPSILON:
+        raise ValueError('Target allocation cannot be met within the tolerance')
+
+    weights = np.clip(current, lower, upper)
+    excess = weights.sum() - 1.0
+    if abs(excess) > WEIGHT_EPSILON:
+        room = (weights - lower) if excess > 0 else (upper - weights)
+        for index in np.argsort(cost_rates, kind='stable'):
+            shift = min(room[index], abs(excess))
+            weights[index] -= math.copysign(shift, excess)
+            excess -= math.copysign(shift, excess)
+            if abs(excess) <= WEIGHT_EPSILON:
+                break
+    return weights
+
+
+def _round_lots(units, lots):
+    """Nearest whole number of lots, at the precision quantities are stored"""
+    return np.round(np.round(units / lots) * lots, QUANTITY_DECIMALS)
+
+
+class RebalanceEngine:
+    """Per-holding trade lists that bring asset class weights back within tolerance"""
+
+    @staticmethod
+    def plan(holdings, target_allocation, tolerance=None, lot_sizes=None):
+        """
+        Trades that move each asset class into its tolerance band around
+        `target_allocation` at the least transaction cost.
+
+        Sells come out of the largest holdings first, so each class needs as
+        few orders as possible. Each class buy is one order in its largest
+        holding. Sale proceeds, net of all costs, fund the buys. Quantities
+        are rounded to `lot_sizes` (asset_name -> units, default 1).
+        """
+        tolerance = Config.REBALANCE_TOLERANCE if tolerance is None else float(tolerance)
+        lot_sizes = lot_sizes or {}
+        holdings = [holding for holding in holdings if float(holding.quantity or 0) > 0]
+
+        classes = sorted(set(target_allocation) | {holding.asset_type for holding in holdings})
+        class_index = {asset_type: index for index, asset_type in enumerate(classes)}
+        rows = np.array([class_index[holding.asset_type] for holding in holdings], dtype=np.intp)
+        quantity = np.array([float(holding.quantity) for holding in holdings])
+        price = np.array([float(holding.current_price or 0) for holding in holdings])
+        lots = np.array([float(lot_sizes.get(holding.asset_name, 1)) for holding in holdings])
+        values = quantity * price
+        total = float(values.sum())
+
+        target = np.array([float(target_allocation.get(asset_type, 0.0)) for asset_type in classes])
+        class_values = np.bincount(rows, weights=values, minlength=len(classes))
+        current = class_values / total if total > 0 else np.zeros(len(classes))
+        summary = {
+            'total_value': round(total, 2),
+            'tolerance': tolerance,
+            'current_allocation': {c: round(float(w), 4) for c, w in zip(classes, current)},
+            'target_allocation': {c: round(float(w), 4) for c, w in zip(classes, target)}
+        }
+        if total <= 0:
+            summary.update({'allocation_after': summary['current_allocation'], 'within_tolerance': True,
+                            'turnover': 0.0, 'total_cost': 0.0, 'cash_remaining': 0.0, 'trades': 0})
+            return [], summary
+
+        cost_rates = np.array([
+            Config.REBALANCE_BROKERAGE_RATE + Config.REBALANCE_STT_RATES.get(asset_type, 0.0)
+            for asset_type in classes
+        ])
+        deltas = (band_weights(current, target, tolerance * BAND_TARGET_FRACTION, cost_rates) - current) * total
+
+        # Sells: walk each class's holdings from the largest down until the amount is covered
+        sell_amount = np.maximum(-deltas, 0.0)
+        order = np.lexsort((-values, rows))
+        sorted_rows = rows[order]
+        cumulative = np.cumsum(values[order])
+        group_start = np.r_[0, np.flatnonzero(np.diff(sorted_rows)) + 1]
+        offsets = np.repeat(cumulative[group_start] - values[order][group_start],
+                            np.diff(np.r_[group_start, len(order)]))
+        covered_before = cumulative - values[order] - offsets
+        sells = np.clip(sell_amount[sorted_rows] - covered_before, 0.0, values[order])
+        sell_units = np.zeros(len(holdings))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sell_units[order] = np.where(price[order] > 0, sells / price[order], 0.0)
+        sell_units = np.minimum(_round_lots(sell_units, lots), quantity)
+
+        types = [holding.asset_type for holding in holdings]
+        sell_values = sell_units * price
+        proceeds = float(sell_values.sum()) - float(trade_costs(sell_values, types).sum())
+
+        # Buys: one order per underweight class in its largest holding. Each class's budget
+        # covers its amount plus buy costs, and the budgets together stay within the proceeds
+        buy_amount = np.maximum(deltas, 0.0)
+        buy_budget = buy_amount + np.where(buy_amount > 0, trade_costs(buy_amount, classes), 0.0)
+        if buy_budget.sum() > 0:
+            buy_budget *= min(1.0, max(proceeds, 0.0) / buy_budget.sum())
+        buy_amount = np.where(buy_amount > 0, affordable(buy_budget, classes), 0.0)
+        largest = np.full(len(classes), -1, dtype=np.intp)
+        largest[sorted_rows[group_start]] = order[group_start]
+
+        trades = []
+        for index in np.flatnonzero(sell_units > 0):
+            trades.append(RebalanceEngine._trade(holdings[index], 'sell', sell_units[index], price[index]))
+        for class_id in np.flatnonzero(buy_amount > 0):
+            holding_index = largest[class_id]
+            if holding_index < 0:
+                # No position in this class yet: recommend an amount, not units
+                trades.append({
+                    'asset_type': classes[class_id], 'asset_name': None, 'holding_id': None,
+                    'action': 'buy', 'quantity': None, 'price': None,
+                    'amount': math.floor(float(buy_amount[class_id]) * 100) / 100
+                })
+                continue
+            units = float(_round_lots(
+                np.array([buy_amount[class_id] / price[holding_index]]), np.array([lots[holding_index]])
+            )[0])
+            # Stay within the proceeds after rounding up to a lot
+            if units * price[holding_index] > buy_amount[class_id] + 1e-9:
+                units = max(units - lots[holding_index], 0.0)
+            if units > 0:
+                trades.append(RebalanceEngine._trade(holdings[holding_index], 'buy', units, price[holding_index]))
+
+        # Lot rounding only ever rounds buys down, but confirm the proceeds cover every buy with its cost
+        buys = [trade for trade in trades if trade['action'] == 'buy']
+        buy_total = sum(trade['amount'] for trade in buys) + \
+            float(trade_costs([trade['amount'] for trade in buys], [trade['asset_type'] for trade in buys]).sum())
+        if buys and buy_total > max(proceeds, 0.0) + 0.01:
+            raise ValueError('Rebalance buys exceed sale proceeds after costs')
+
+        costs = trade_costs([trade['amount'] for trade in trades], [trade['asset_type'] for trade in trades])
+        for trade, cost in zip(trades, costs):
+            trade['cost'] = round(float(cost), 2)
+
+        after = class_values.copy()
+        for trade in trades:
+            after[class_index[trade['asset_type']]] += trade['amount'] if trade['action'] == 'buy' else -trade['amount']
+        after_total = after.sum()
+        allocation_after = after / after_total if after_total > 0 else after
+        lower = np.clip(target - tolerance, 0.0, 1.0)
+        upper = np.clip(target + tolerance, 0.0, 1.0)
+
+        summary.update({
+            'allocation_after': {c: round(float(w), 4) for c, w in zip(classes, allocation_after)},
+            'within_tolerance': bool(np.all((allocation_after >= lower - 1e-6) & (allocation_after <= upper + 1e-6))),
+            'turnover': round(sum(trade['amount'] for trade in trades) / (2 * total), 4),
+            'total_cost': round(float(costs.sum()), 2),
+            'cash_remaining': round(proceeds - buy_total, 2) if trades else 0.0,
+            'trades': len(trades)
+        })
+        return trades, summary
+
+    @staticmethod
+    def _trade(holding, action, units, price):
+        return {
+            'asset_type': holding.asset_type,
+            'asset_name': holding.asset_name,
+            'holding_id': holding.id,
+            'action': action,
+            'quantity': round(float(units), QUANTITY_DECIMALS),
+            'price': round(float(price), 2),
+            'amount': round(float(units * price), 2)
+        }
@@ -0,0 +1,178 @@
+"""
+Returns Service
+Time-weighted return and XIRR from daily NAV history and transaction cash flows
+"""
+
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import case, func, or_
+
+from extensions import db
+from models.portfolio_nav import PortfolioNAV
+from models.transaction import Transaction
+
+DAYS_PER_YEAR = 365.0
+
+# Holdings NAV carries no cash, so buys add money to it and sells take money out;
+# deposits and withdrawals only move cash outside the portfolio
+FLOW_SIGNS = {'buy': 1.0, 'sell': -1.0}
+FLOW_STATUSES = ('completed',)
+
+XIRR_GUESSES = np.array([-0.9, -0.5, -0.2, 0.0, 0.1, 0.3, 1.0, 3.0])
+XIRR_MAX_ITERATIONS = 100
+XIRR_TOLERANCE = 1e-10
+
+
+def time_weighted_return(navs, flows):
+    """
+    Chain-linked daily TWR. `flows[t]` is the net money added on day t,
+    already reflected in navs[t]; periods starting from a zero NAV are skipped.
+    """
+    navs = np.asarray(navs, dtype=np.float64)
+    flows = np.asarray(flows, dtype=np.float64)
+    if len(navs) < 2:
+        return 0.0
+    previous = navs[:-1]
+    valid = previous > 0
+    growth = np.ones(len(previous))
+    growth[valid] = (navs[1:][valid] - flows[1:][valid]) / previous[valid]
+    return float(np.prod(growth) - 1.0)
+
+
+def xirr(amounts, days):
+    """
+    Annual internal rate of return of `amounts` (negative = invested) paid
+    `days` after the first flow, or None when no rate zeroes the NPV.
+
+    Newton iterations run from several starting guesses at once as a
+    (guesses x flows) array; the converged root nearest zero wins.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    years = np.asarray(days, dtype=np.float64) / DAYS_PER_YEAR
+    if len(amounts) < 2 or not (amounts > 0).any() or not (amounts < 0).any():
+        return None
+
+    rates = XIRR_GUESSES.copy()
+    active = np.ones(len(rates), dtype=bool)
+    with np.errstate(all='ignore'):
+        for _ in range(XIRR_MAX_ITERATIONS):
+            # Discount factors (1 + r)^-t in log space to stay finite over decades
+            discount = np.exp(-np.outer(np.log1p(rates), years))
+            npv = discount @ amounts
+            slope = -(discount * (years / (1.0 + rates[:, None]))) @ amounts
+            step = np.where(active & (slope != 0), npv / slope, 0.0)
+            rates = np.maximum(rates - step, -0.999999)
+            active &= np.isfinite(rates) & (np.abs(step) > XIRR_TOLERANCE * np.maximum(1.0, np.abs(rates)))
+            if not active.any():
+                break
+        discount = np.exp(-np.outer(np.log1p(rates), years))
+        residual = np.abs(discount @ amounts)
+
+    scale = max(np.abs(amounts).max(), 1.0)
+    converged = np.isfinite(rates) & np.isfinite(residual) & (residual <= 1e-6 * scale) & (rates > -0.999999)
+    if not converged.any():
+        return None
+    candidates = rates[converged]
+    return float(candidates[np.argmin(np.abs(candidates))])
+
+
+def _annualize(total_return, days):
+    if days < DAYS_PER_YEAR or total_return <= -1.0:
+        return None
+    return (1.0 + total_return) ** (DAYS_PER_YEAR / days) - 1.0
+
+
+def _round(value, digits=6):
+    return round(value, digits) if value is not None and math.isfinite(value) else None
+
+
+class ReturnsService:
+    """NAV history snapshots and money- and time-weighted returns"""
+
+    @staticmethod
+    def snapshot_navs(day=None):
+        """Record today's (or `day`'s) NAV for every portfolio; returns the row count"""
+        day = day or datetime.utcnow().date()
+        count = PortfolioNAV.snapshot_all(day)
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def nav_history(portfolio_id, start=None, end=None):
+        """(dates as datetime64[D], navs) ordered by date"""
+        query = db.session.query(PortfolioNAV.date, PortfolioNAV.nav) \
+            .filter(PortfolioNAV.portfolio_id == portfolio_id)
+        if start:
+            query = query.filter(PortfolioNAV.date >= start)
+        if end:
+            query = query.filter(PortfolioNAV.date <= end)
+        rows = query.order_by(PortfolioNAV.date).all()
+        dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+        navs = np.array([float(row[1]) for row in rows], dtype=np.float64)
+        return dates, navs
+
+    @staticmethod
+    def cash_flows(user_id, portfolio_id, start, end):
+        """Net completed buy/sell amounts per day in (start, end], as (dates, amounts)"""
+        day = func.date(Transaction.created_at)
+        signed = func.sum(case(
+            *((Transaction.type == kind, Transaction.amount * sign) for kind, sign in FLOW_SIGNS.items()),
+            else_=0
+        ))
+        rows = db.session.query(day, signed).filter(
+            or_(Transaction.portfolio_id == portfolio_id,
+                (Transaction.portfolio_id.is_(None)) & (Transaction.user_id == user_id)),
+            Transaction.type.in_(list(FLOW_SIGNS)),
+            Transaction.status.in_(FLOW_STATUSES),
+            Transaction.created_at >= datetime.combine(start + timedelta(days=1), datetime.min.time()),
+            Transaction.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time())
+        ).group_by(day).all()
+        dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+        amounts = np.array([float(row[1] or 0) for row in rows], dtype=np.float64)
+        return dates, amounts
+
+    @staticmethod
+    def portfolio_returns(user_id, portfolio_id, start=None, end=None):
+        """
+        TWR (total and annualized) and XIRR over the NAV history between
+        `start` and `end`. Flows on days without a snapshot count towards
+        the next snapshot.
+        """
+        dates, navs = ReturnsService.nav_history(portfolio_id, start, end)
+        result = {
+            'portfolio_id': portfolio_id,
+            'start': None, 'end': None, 'days': 0, 'observations': len(navs),
+            'start_nav': None, 'end_nav': None, 'net_flows': 0.0,
+            'twr': None, 'twr_annualized': None, 'xirr': None
+        }
+        if len(navs) < 2:
+            return result
+
+        first, last = dates[0].astype(date), dates[-1].astype(date)
+        flow_dates, flow_amounts = ReturnsService.cash_flows(user_id, portfolio_id, first, last)
+        flows = np.zeros(len(navs))
+        if len(flow_dates):
+            np.add.at(flows, np.searchsorted(dates, flow_dates, side='left'), flow_amounts)
+
+        days = int((dates[-1] - dates[0]).astype(int))
+        twr = time_weighted_return(navs, flows)
+
+        # Investor cash flows: the opening NAV and every contribution go in,
+        # distributions and the closing NAV come out
+        offsets = np.concatenate([[0], (flow_dates - dates[0]).astype(int), [days]])
+        amounts = np.concatenate([[-navs[0]], -flow_amounts, [navs[-1]]])
+
+        result.update({
+            'start': first.isoformat(),
+            'end': last.isoformat(),
+            'days': days,
+            'start_nav': float(navs[0]),
+            'end_nav': float(navs[-1]),
+            'net_flows': round(float(flow_amounts.sum()), 2),
+            'twr': _round(twr),
+            'twr_annualized': _round(_annualize(twr, days)),
+            'xirr': _round(xirr(amounts, offsets))
+        })
+        return result
@@ -0,0 +1,233 @@
+"""
+Risk Engine
+Portfolio VaR and CVaR by historical simulation, delta-normal and Monte Carlo
+methods over one shared scenario matrix per run
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from statistics import NormalDist
+
+import numpy as np
+from sqlalchemy import func
+
+from config import Config
+from extensions import db
+from models.portfolio import Holding
+from services.covariance_service import ledoit_wolf
+from services.ohlcv_store import get_ohlcv_store
+from services.portfolio_optimizer import ASSET_CLASSES
+from utils.cache import cache_get, cache_set, cache_set_many
+
+METHODS = ('historical', 'parametric', 'monte_carlo')
+MIN_OBSERVATIONS = 60
+
+
+def risk_cache_key(portfolio_id):
+    return f'risk:{portfolio_id}'
+
+
+def tail_risk(pnl, confidence_levels):
+    """
+    {confidence: (VaR, CVaR)} per row of a (portfolios x scenarios) P&L
+    matrix, as positive losses: the k-th worst loss and the mean of the k
+    worst, with k = ceil((1 - confidence) * scenarios).
+
+    Partitions `pnl` in place once, at the deepest tail, and sorts only
+    that tail.
+    """
+    scenarios = pnl.shape[1]
+    tails = {
+        confidence: max(1, math.ceil((1.0 - confidence) * scenarios - 1e-9))
+        for confidence in confidence_levels
+    }
+    deepest = max(tails.values())
+    pnl.partition(deepest - 1, axis=1)
+    worst = np.sort(pnl[:, :deepest], axis=1)
+    cumulative = np.cumsum(worst, axis=1)
+    return {
+        confidence: (-worst[:, tail - 1], -cumulative[:, tail - 1] / tail)
+        for confidence, tail in tails.items()
+    }
+
+
+def _horizon_returns(log_returns, horizon):
+    """Simple returns over overlapping `horizon`-day windows of daily log returns"""
+    cumulative = np.vstack([np.zeros(log_returns.shape[1]), np.cumsum(log_returns, axis=0)])
+    return np.expm1(cumulative[horizon:] - cumulative[:-horizon])
+
+
+class ScenarioSet:
+    """
+    Daily log returns of the asset class proxies and everything derived from
+    them for one as-of date: historical and simulated horizon returns and the
+    shrunk covariance. Read-only and shared by every portfolio in a run.
+    """
+
+    def __init__(self, assets, timestamps, log_returns, horizons, simulations, seed):
+        self.assets = assets
+        self.as_of = datetime.fromtimestamp(int(timestamps[-1]), tz=timezone.utc).date().isoformat()
+        self.observations = len(log_returns)
+        self.horizons = horizons
+        self.mean = log_returns.mean(axis=0)
+        self.covariance = ledoit_wolf(log_returns)[0]
+        self.historical = {horizon: _horizon_returns(log_returns, horizon) for horizon in horizons}
+
+        # One set of normal draws serves every horizon: log returns scale as
+        # mean * h and covariance * h, then compound to simple returns
+        eigenvalues, eigenvectors = np.linalg.eigh(self.covariance)
+        root = eigenvectors * np.sqrt(np.maximum(eigenvalues, 0.0))
+        draws = np.random.default_rng(seed).standard_normal((simulations, len(assets))) @ root.T
+        self.simulated = {
+            horizon: np.expm1(self.mean * horizon + draws * math.sqrt(horizon)) for horizon in horizons
+        }
+        self.version = hashlib.sha1(
+            f"{','.join(assets)}:{self.as_of}:{self.observations}:{simulations}:{seed}".encode()
+        ).hexdigest()[:12]
+
+    def score(self, exposures, confidence_levels):
+        """
+        {method: {(horizon, confidence): (VaR, CVaR)}} for (portfolios x
+        assets) rupee exposures, every portfolio scored against the same
+        scenarios in one matrix product per horizon.
+        """
+        results = {method: {} for method in METHODS}
+        variance = np.einsum('pi,ij,pj->p', exposures, self.covariance, exposures)
+        for horizon in self.horizons:
+            expected = exposures @ self.mean * horizon
+            deviation = np.sqrt(np.maximum(variance * horizon, 0.0))
+            for confidence in confidence_levels:
+                z = NormalDist().inv_cdf(confidence)
+                results['parametric'][horizon, confidence] = (
+                    z * deviation - expected,
+                    deviation * math.exp(-z * z / 2) / math.sqrt(2 * math.pi) / (1.0 - confidence) - expected
+                )
+            for method, scenarios in (('historical', self.historical), ('monte_carlo', self.simulated)):
+                for confidence, risk in tail_risk(exposures @ scenarios[horizon].T, confidence_levels).items():
+                    results[method][horizon, confidence] = risk
+        return results
+
+
+class RiskEngine:
+    """Caches one VaR/CVaR report per portfolio and rebuilds all of them in nightly batches"""
+
+    _scenarios = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def scenarios():
+        """Scenario set over the proxies' latest common history, rebuilt when new bars arrive"""
+        proxies = Config.ASSET_CLASS_PROXIES
+        assets = tuple(asset for asset in ASSET_CLASSES if asset in proxies) + \
+            tuple(sorted(set(proxies) - set(ASSET_CLASSES)))
+        timestamps, closes = get_ohlcv_store().read_aligned([proxies[asset] for asset in assets])
+        valid = (closes > 0).all(axis=1)
+        timestamps, closes = timestamps[valid], closes[valid]
+        timestamps, closes = timestamps[-(Config.VAR_HISTORY_DAYS + 1):], closes[-(Config.VAR_HISTORY_DAYS + 1):]
+        if len(closes) <= max(MIN_OBSERVATIONS, max(Config.VAR_HORIZONS)):
+            raise ValueError('Not enough common price history for the asset class proxies')
+
+        with RiskEngine._lock:
+            cached = RiskEngine._scenarios
+            key = (assets, int(timestamps[-1]), len(timestamps))
+            if cached is None or cached[0] != key:
+                scenarios = ScenarioSet(
+                    assets, timestamps, np.diff(np.log(closes), axis=0),
+                    tuple(Config.VAR_HORIZONS), Config.VAR_SIMULATIONS, Config.VAR_SEED
+                )
+                RiskEngine._scenarios = cached = (key, scenarios)
+            return cached[1]
+
+    @staticmethod
+    def exposures(assets, portfolio_ids=None):
+        """(portfolio ids, portfolios x `assets` value matrix, value in other asset types per portfolio)"""
+        value = func.sum(Holding.quantity * Holding.current_price)
+        query = db.session.query(Holding.portfolio_id, Holding.asset_type, value) \
+            .group_by(Holding.portfolio_id, Holding.asset_type)
+        if portfolio_ids is not None:
+            query = query.filter(Holding.portfolio_id.in_(portfolio_ids))
+        rows = query.all()
+
+        ids = sorted({row[0] for row in rows} | set(portfolio_ids or ()))
+        index = {portfolio_id: i for i, portfolio_id in enumerate(ids)}
+        columns = {asset: i for i, asset in enumerate(assets)}
+        matrix = np.zeros((len(ids), len(columns)))
+        unmodeled = np.zeros(len(ids))
+        for portfolio_id, asset_type, amount in rows:
+            column = columns.get(asset_type)
+            if column is None:
+                unmodeled[index[portfolio_id]] += float(amount or 0)
+            else:
+                matrix[index[portfolio_id], column] += float(amount or 0)
+        return ids, matrix, unmodeled
+
+    @staticmethod
+    def reports(portfolio_ids, exposures, unmodeled, scenarios):
+        """One JSON-ready report per portfolio from a batch score"""
+        confidence_levels = tuple(Config.VAR_CONFIDENCE_LEVELS)
+        scores = scenarios.score(exposures, confidence_levels)
+        values = exposures.sum(axis=1)
+        reports = {}
+        for row, portfolio_id in enumerate(portfolio_ids):
+            methods = {}
+            for method, results in scores.items():
+                methods[method] = [{
+                    'horizon_days': horizon,
+                    'confidence': confidence,
+                    'var': round(float(var[row]), 2),
+                    'cvar': round(float(cvar[row]), 2),
+                    'var_percent': round(float(var[row] / values[row]), 6) if values[row] > 0 else 0.0
+                } for (horizon, confidence), (var, cvar) in results.items()]
+            reports[portfolio_id] = {
+                'portfolio_id': portfolio_id,
+                'as_of': scenarios.as_of,
+                'scenario_version': scenarios.version,
+                'observations': scenarios.observations,
+                'simulations': Config.VAR_SIMULATIONS,
+                'value': round(float(values[row]), 2),
+                'unmodeled_value': round(float(unmodeled[row]), 2),
+                'exposures': {asset: round(float(amount), 2) for asset, amount in zip(scenarios.assets, exposures[row])},
+                'methods': methods
+            }
+        return reports
+
+    @staticmethod
+    def portfolio_risk(portfolio_id):
+        """Cached VaR/CVaR report for one portfolio, computed on a miss"""
+        cached = cache_get(risk_cache_key(portfolio_id))
+        if cached is not None:
+            cached['cached'] = True
+            return cached
+        scenarios = RiskEngine.scenarios()
+        ids, exposures, unmodeled = RiskEngine.exposures(scenarios.assets, [portfolio_id])
+        report = RiskEngine.reports(ids, exposures, unmodeled, scenarios)[portfolio_id]
+        cache_set(risk_cache_key(portfolio_id), report, Config.CACHE_TTL_PORTFOLIO_RISK)
+        report['cached'] = False
+        return report
+
+    @staticmethod
+    def score_all(batch_size=None):
+        """
+        Recompute and cache every portfolio's report against one scenario
+        set, `batch_size` portfolios per matrix product. Returns a summary.
+        """
+        started = time.perf_counter()
+        batch_size = batch_size or Config.VAR_BATCH_SIZE
+        scenarios = RiskEngine.scenarios()
+        ids, exposures, unmodeled = RiskEngine.exposures(scenarios.assets)
+        for start in range(0, len(ids), batch_size):
+            batch = slice(start, start + batch_size)
+            reports = RiskEngine.reports(ids[batch], exposures[batch], unmodeled[batch], scenarios)
+            cache_set_many(
+                {risk_cache_key(portfolio_id): report for portfolio_id, report in reports.items()},
+                Config.CACHE_TTL_PORTFOLIO_RISK
+            )
+        return {
+            'portfolios': len(ids),
+            'as_of': scenarios.as_of,
+            'scenario_version': scenarios.version,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
@@ -0,0 +1,343 @@
+"""
+Screener Service
+Vectorized cross-sectional screening over an in-memory symbols x features matrix
+"""
+
+import math
+import re
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import func
+
+from config import Config
+from extensions import db
+from models.market_features import MarketFeatures
+
+# MarketFeatures JSON columns flattened into matrix features, first name wins
+FEATURE_SECTIONS = ('technical_indicators', 'volatility_metrics', 'volume_analysis')
+MAX_EXPRESSION_LENGTH = 1000
+MAX_NESTING = 32
+
+_TOKEN_PATTERN = re.compile(r'''
+    (?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op><=|>=|==|!=|<|>|=|\+|-|\*|/|\(|\))
+    )''', re.VERBOSE)
+
+_COMPARISONS = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater, '>=': np.greater_equal,
+    '=': np.equal, '==': np.equal, '!=': np.not_equal
+}
+_ARITHMETIC = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+
+
+def _compare(compare, left, right):
+    """(true, false) masks of a comparison; unknown where either side is NaN"""
+    known = ~(np.isnan(left) | np.isnan(right))
+    result = compare(left, right)
+    return result & known, ~result & known
+
+
+def _negate(value):
+    return value[1], value[0]
+
+
+def _both(left, right):
+    return left[0] & right[0], left[1] | right[1]
+
+
+def _either(left, right):
+    return left[0] | right[0], left[1] & right[1]
+
+
+class FeatureMatrix:
+    """One trading day's features for every symbol, stored column-wise"""
+
+    def __init__(self, symbols, columns, as_of=None, signature=None):
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.names = tuple(columns)
+        self.values = np.array([columns[name] for name in self.names], dtype=np.float64) \
+            .reshape(len(self.names), len(self.symbols))
+        self.values.flags.writeable = False
+        self.columns = {name: self.values[row] for row, name in enumerate(self.names)}
+        self.as_of = as_of
+        self.signature = signature
+
+    @classmethod
+    def from_payloads(cls, rows, as_of=None, signature=None):
+        """Build from (symbol, {section: {name: value}}) rows"""
+        symbols = []
+        columns = {}
+        for index, (symbol, sections) in enumerate(rows):
+            symbols.append(symbol)
+            seen = set()
+            for section in FEATURE_SECTIONS:
+                for name, value in (sections.get(section) or {}).items():
+                    if name in seen or isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    seen.add(name)
+                    column = columns.get(name)
+                    if column is None:
+                        column = columns[name] = []
+                    # Pad columns first seen after earlier symbols
+                    column.extend([math.nan] * (index - len(column)))
+                    column.append(float(value))
+        for column in columns.values():
+            column.extend([math.nan] * (len(symbols) - len(column)))
+        return cls(symbols, columns, as_of=as_of, signature=signature)
+
+
+class _Parser:
+    """
+    Recursive-descent parser for screening expressions such as
+    `rsi < 30 AND (volume_ratio > 1.5 OR close > sma_50 * 1.05)`.
+
+    Each node compiles to ('bool' | 'num', fn(columns)) so the whole
+    expression evaluates as a handful of NumPy array operations. Conditions
+    use three-valued logic: a 'bool' fn returns (true, false) masks, and a
+    comparison reading a missing (NaN) value is neither, which NOT keeps.
+    """
+
+    def __init__(self, expression):
+        self.tokens = self._tokenize(expression)
+        self.position = 0
+        self.depth = 0
+        self.features = set()
+
+    @staticmethod
+    def _tokenize(expression):
+        tokens = []
+        position = 0
+        while position < len(expression):
+            if expression[position].isspace():
+                position += 1
+                continue
+            match = _TOKEN_PATTERN.match(expression, position)
+            if not match:
+                raise ValueError(f'Unexpected character at position {position}: {expression[position]!r}')
+            kind = match.lastgroup
+            text = match.group(kind)
+            if kind == 'name' and text.upper() in ('AND', 'OR', 'NOT'):
+                kind, text = 'keyword', text.upper()
+            tokens.append((kind, text))
+            position = match.end()
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _accept(self, kind, *texts):
+        token_kind, text = self._peek()
+        if token_kind == kind and (not texts or text in texts):
+            self.position += 1
+            return text
+        return None
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError('Expression is empty')
+        kind, fn = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f'Unexpected token: {self._peek()[1]!r}')
+        if kind != 'bool':
+            raise ValueError('Expression must be a condition, e.g. rsi < 30')
+        return lambda c: fn(c)[0]
+
+    @staticmethod
+    def _require(kind, expected, context):
+        if kind != expected:
+            raise ValueError(f'{context} needs a {"condition" if expected == "bool" else "number"}')
+
+    def _or(self):
+        kind, fn = self._and()
+        while self._accept('keyword', 'OR'):
+            self._require(kind, 'bool', 'OR')
+            right_kind, right = self._and()
+            self._require(right_kind, 'bool', 'OR')
+            fn = (lambda a, b: lambda c: _either(a(c), b(c)))(fn, right)
+        return kind, fn
+
+    def _and(self):
+        kind, fn = self._not()
+        while self._accept('keyword', 'AND'):
+            self._require(kind, 'bool', 'AND')
+            right_kind, right = self._not()
+            self._require(right_kind, 'bool', 'AND')
+            fn = (lambda a, b: lambda c: _both(a(c), b(c)))(fn, right)
+        return kind, fn
+
+    def _not(self):
+        if self._accept('keyword', 'NOT'):
+            kind, fn = self._not()
+            self._require(kind, 'bool', 'NOT')
+            return 'bool', (lambda a: lambda c: _negate(a(c)))(fn)
+        return self._comparison()
+
+    def _comparison(self):
+        kind, fn = self._additive()
+        op = self._accept('op', *_COMPARISONS)
+        if op is None:
+            return kind, fn
+        right_kind, right = self._additive()
+        self._require(kind, 'num', op)
+        self._require(right_kind, 'num', op)
+        return 'bool', (lambda a, b, f: lambda c: _compare(f, a(c), b(c)))(fn, right, _COMPARISONS[op])
+
+    def _additive(self):
+        kind, fn = self._multiplicative()
+        while True:
+            op = self._accept('op', '+', '-')
+            if op is None:
+                return kind, fn
+            right_kind, right = self._multiplicative()
+            self._require(kind, 'num', op)
+            self._require(right_kind, 'num', op)
+            fn = (lambda a, b, f: lambda c: f(a(c), b(c)))(fn, right, _ARITHMETIC[op])
+
+    def _multiplicative(self):
+        kind, fn = self._unary()
+        while True:
+            op = self._accept('op', '*', '/')
+            if op is None:
+                return kind, fn
+            right_kind, right = self._unary()
+            self._require(kind, 'num', op)
+            self._require(right_kind, 'num', op)
+            fn = (lambda a, b, f: lambda c: f(a(c), b(c)))(fn, right, _ARITHMETIC[op])
+
+    def _unary(self):
+        if self._accept('op', '-'):
+            kind, fn = self._unary()
+            self._require(kind, 'num', 'Negation')
+            return 'num', (lambda a: lambda c: -a(c))(fn)
+        return self._atom()
+
+    def _atom(self):
+        kind, text = self._peek()
+        if kind == 'number':
+            self.position += 1
+            number = float(text)
+            return 'num', lambda c: number
+        if kind == 'name':
+            self.position += 1
+            self.features.add(text)
+            return 'num', lambda c: c[text]
+        if self._accept('op', '('):
+            self.depth += 1
+            if self.depth > MAX_NESTING:
+                raise ValueError(f'Parentheses nested deeper than {MAX_NESTING} levels')
+            result = self._or()
+            self.depth -= 1
+            if not self._accept('op', ')'):
+                raise ValueError('Missing closing parenthesis')
+            return result
+        raise ValueError(f'Unexpected token: {text!r}' if text else 'Expression ended unexpectedly')
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression):
+    """Parse an expression once; returns (fn(columns) -> mask, referenced features)"""
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f'Expression longer than {MAX_EXPRESSION_LENGTH} characters')
+    parser = _Parser(expression)
+    fn = parser.parse()
+    return fn, tuple(sorted(parser.features))
+
+
+class ScreenerService:
+    """Screens the latest MarketFeatures cross-section held in memory"""
+
+    _matrix = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _signature():
+        """Latest feature date and its row count; changes when a new day's features land"""
+        latest = db.session.query(func.max(MarketFeatures.date)).scalar()
+        if latest is None:
+            return None
+        count = db.session.query(func.count(MarketFeatures.id)) \
+            .filter(MarketFeatures.date == latest).scalar()
+        return latest, count
+
+    @staticmethod
+    def _load(signature):
+        rows = db.session.query(
+            MarketFeatures.symbol, *(getattr(MarketFeatures, section) for section in FEATURE_SECTIONS)
+        ).filter(MarketFeatures.date == signature[0]).order_by(MarketFeatures.symbol).all()
+        return FeatureMatrix.from_payloads(
+            ((row[0], dict(zip(FEATURE_SECTIONS, row[1:]))) for row in rows),
+            as_of=signature[0], signature=signature
+        )
+
+    @staticmethod
+    def get_matrix():
+        """
+        Current feature matrix. The database is checked for a new signature
+        at most every SCREENER_RELOAD_CHECK_INTERVAL seconds and the matrix is
+        rebuilt only when it changed.
+        """
+        now = time.time()
+        matrix = ScreenerService._matrix
+        if matrix is not None and now - ScreenerService._checked_at < Config.SCREENER_RELOAD_CHECK_INTERVAL:
+            return matrix
+        with ScreenerService._lock:
+            if ScreenerService._matrix is not None and \
+                    now - ScreenerService._checked_at < Config.SCREENER_RELOAD_CHECK_INTERVAL:
+                return ScreenerService._matrix
+            signature = ScreenerService._signature()
+            if signature is None:
+                ScreenerService._matrix = FeatureMatrix([], {})
+            elif ScreenerService._matrix is None or ScreenerService._matrix.signature != signature:
+                ScreenerService._matrix = ScreenerService._load(signature)
+            ScreenerService._checked_at = now
+            return ScreenerService._matrix
+
+    @staticmethod
+    def screen(expression, matrix=None, fields=None, sort_by=None, descending=True, limit=100):
+        """
+        Evaluate `expression` over every symbol and return the matches with
+        the requested feature values (default: the features it references).
+        """
+        fn, referenced = compile_expression(expression)
+        matrix = matrix if matrix is not None else ScreenerService.get_matrix()
+        fields = list(fields) if fields else list(referenced)
+        wanted = set(referenced) | set(fields) | ({sort_by} if sort_by else set())
+        unknown = sorted(name for name in wanted if name not in matrix.columns)
+        if unknown and len(matrix.symbols):
+            raise ValueError(f'Unknown features: {unknown}')
+
+        if not len(matrix.symbols):
+            matches = np.empty(0, dtype=np.intp)
+        else:
+            with np.errstate(all='ignore'):
+                mask = np.broadcast_to(fn(matrix.columns), matrix.symbols.shape)
+            matches = np.flatnonzero(mask)
+
+        if sort_by and len(matches):
+            keys = matrix.columns[sort_by][matches]
+            keys = np.where(np.isnan(keys), -np.inf if descending else np.inf, keys)
+            order = np.argsort(-keys if descending else keys, kind='stable')
+            matches = matches[order]
+        total = len(matches)
+        matches = matches[:limit]
+
+        results = []
+        for index in matches:
+            result = {'symbol': matrix.symbols[index]}
+            for name in fields:
+                value = matrix.columns[name][index]
+                result[name] = float(value) if math.isfinite(value) else None
+            results.append(result)
+        return {
+            'as_of': matrix.as_of.isoformat() if matrix.as_of else None,
+            'universe': len(matrix.symbols),
+            'total': total,
+            'count': len(results),
+            'results': results
+        }
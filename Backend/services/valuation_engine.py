@@ -0,0 +1,185 @@
+"""
+Valuation Engine
+Exact fixed-point portfolio valuation over integer NumPy columns
+"""
+
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import BigInteger, cast, func
+
+from extensions import db
+from models.portfolio import Holding
+
+# Column scales match the Numeric precision of Holding: quantity has four
+# decimal places, prices two, so every stored value is an exact integer here
+QUANTITY_SCALE = 10_000
+PRICE_SCALE = 100
+VALUE_SCALE = QUANTITY_SCALE * PRICE_SCALE
+
+# Largest magnitude int64 -> float64 converts exactly
+_EXACT_FLOAT = 2 ** 53
+_INT64_MAX = np.iinfo(np.int64).max
+_LIMB = 10 ** 9
+
+
+def to_units(values, scale):
+    """
+    Scale decimal column values to int64 units.
+
+    Holding columns carry at most 15 significant digits, which float64
+    represents to within half a unit, so rounding recovers the exact value.
+    """
+    array = np.fromiter((float(value or 0) for value in values), dtype=np.float64) \
+        if not isinstance(values, np.ndarray) else values.astype(np.float64, copy=False)
+    return np.rint(array * scale).astype(np.int64)
+
+
+def _products(left, right):
+    """Exact elementwise products; rows that could overflow int64 use Python ints"""
+    left = np.asarray(left, dtype=np.int64)
+    right = np.asarray(right, dtype=np.int64)
+    limit = _INT64_MAX // np.maximum(np.abs(right), 1)
+    safe = np.abs(left) <= limit
+    if safe.all():
+        return left * right
+    products = np.empty(len(left), dtype=object)
+    products[safe] = (left[safe] * right[safe]).astype(object)
+    for index in np.flatnonzero(~safe):
+        products[index] = int(left[index]) * int(right[index])
+    return products
+
+
+def _exact_sum(values, starts=None):
+    """
+    Sum int64 values (optionally per segment starting at `starts`) without
+    overflow by summing base-1e9 limbs separately; returns Python ints.
+    """
+    if values.dtype == object:
+        if starts is None:
+            return sum(values.tolist())
+        bounds = list(starts) + [len(values)]
+        return [sum(values[bounds[i]:bounds[i + 1]].tolist()) for i in range(len(starts))]
+
+    high, low = np.divmod(values, _LIMB)
+    if starts is None:
+        if len(values) == 0:
+            return 0
+        return int(high.sum()) * _LIMB + int(low.sum())
+    high_sums = np.add.reduceat(high, starts) if len(values) else np.zeros(0, dtype=np.int64)
+    low_sums = np.add.reduceat(low, starts) if len(values) else np.zeros(0, dtype=np.int64)
+    return [int(h) * _LIMB + int(l) for h, l in zip(high_sums, low_sums)]
+
+
+def _unit_floats(units, scale):
+    """Correctly rounded floats for integer units (exact int->float, one division)"""
+    if units.dtype != object and (len(units) == 0 or np.abs(units).max() < _EXACT_FLOAT):
+        return units.astype(np.float64) / scale
+    return np.array([float(Decimal(int(unit)) / scale) for unit in units])
+
+
+def performance_figures(total_value, total_cost):
+    """
+    Performance dict from exact totals in value units, identical to the
+    Decimal arithmetic of PortfolioService.calculate_portfolio_performance.
+    """
+    value = Decimal(total_value).scaleb(-6)
+    cost = Decimal(total_cost).scaleb(-6)
+    gain_loss = value - cost
+    gain_loss_percent = (gain_loss / cost * 100) if cost > 0 else Decimal('0.00')
+    return {
+        'total_value': float(value),
+        'total_cost': float(cost),
+        'total_gain_loss': float(gain_loss),
+        'total_gain_loss_percent': float(gain_loss_percent)
+    }
+
+
+class ValuationEngine:
+    """Values holdings from integer quantity (1e-4) and price (paise) columns"""
+
+    @staticmethod
+    def columns(holdings):
+        """Integer (quantity, current_price, purchase_price) columns from Holding objects"""
+        return (
+            to_units([holding.quantity for holding in holdings], QUANTITY_SCALE),
+            to_units([holding.current_price for holding in holdings], PRICE_SCALE),
+            to_units([holding.purchase_price for holding in holdings], PRICE_SCALE)
+        )
+
+    @staticmethod
+    def load_columns(portfolio_ids=None):
+        """
+        Read integer columns straight from the database, grouped by portfolio.
+        Returns (portfolio_ids, quantity, current_price, purchase_price).
+        """
+        query = db.session.query(
+            Holding.portfolio_id,
+            cast(func.round(Holding.quantity * QUANTITY_SCALE), BigInteger),
+            cast(func.round(Holding.current_price * PRICE_SCALE), BigInteger),
+            cast(func.round(Holding.purchase_price * PRICE_SCALE), BigInteger)
+        )
+        if portfolio_ids is not None:
+            query = query.filter(Holding.portfolio_id.in_(list(portfolio_ids)))
+        rows = query.order_by(Holding.portfolio_id).all()
+        if not rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty, empty
+        columns = np.array(rows, dtype=np.int64)
+        return columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3]
+
+    @staticmethod
+    def totals(quantity, current_price, purchase_price):
+        """Exact (total_value, total_cost) in 1e-6 units"""
+        return (
+            _exact_sum(_products(quantity, current_price)),
+            _exact_sum(_products(quantity, purchase_price))
+        )
+
+    @staticmethod
+    def performance(holdings):
+        """Same figures as the Decimal loop in calculate_portfolio_performance"""
+        return performance_figures(*ValuationEngine.totals(*ValuationEngine.columns(holdings)))
+
+    @staticmethod
+    def totals_by_portfolio(portfolio_ids, quantity, current_price, purchase_price):
+        """
+        Exact {portfolio_id: (total_value, total_cost)} in 1e-6 units for
+        columns sorted by portfolio id.
+        """
+        if len(portfolio_ids) == 0:
+            return {}
+        starts = np.flatnonzero(np.r_[True, portfolio_ids[1:] != portfolio_ids[:-1]])
+        values = _exact_sum(_products(quantity, current_price), starts)
+        costs = _exact_sum(_products(quantity, purchase_price), starts)
+        return {
+            int(portfolio_ids[start]): (value, cost)
+            for start, value, cost in zip(starts, values, costs)
+        }
+
+    @staticmethod
+    def performance_by_portfolio(portfolio_ids, quantity, current_price, purchase_price):
+        """
+        Performance per portfolio for columns sorted by portfolio id, as
+        {portfolio_id: performance dict}; used for mass revaluation.
+        """
+        totals = ValuationEngine.totals_by_portfolio(portfolio_ids, quantity, current_price, purchase_price)
+        return {portfolio_id: performance_figures(*pair) for portfolio_id, pair in totals.items()}
+
+    @staticmethod
+    def holding_values(holdings):
+        """
+        Per-holding (current_value, gain_loss, gain_loss_percent) matching
+        Holding.to_dict, computed column-wise.
+        """
+        quantity, current_price, purchase_price = ValuationEngine.columns(holdings)
+        current_value = _unit_floats(_products(quantity, current_price), VALUE_SCALE)
+        gain_loss = _unit_floats(_products(quantity, current_price - purchase_price), VALUE_SCALE)
+        gain_loss = np.where((quantity != 0) & (current_price != 0) & (purchase_price != 0), gain_loss, 0.0)
+        # (current - purchase) * 100 / purchase as one correctly rounded division
+        change = (current_price - purchase_price).astype(np.float64) * 100
+        gain_loss_percent = np.divide(
+            change, purchase_price.astype(np.float64),
+            out=np.zeros(len(holdings)), where=purchase_price > 0
+        )
+        return list(zip(current_value.tolist(), gain_loss.tolist(), gain_loss_percent.tolist()))
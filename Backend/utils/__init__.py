@@ -3,7 +3,7 @@ Utility functions
 """
 
 from .auth import token_required, get_current_user
-from .cache import cache_get, cache_set, cache_delete
+from .cache import cache_get, cache_set, cache_delete, cache_get_many, cache_set_many
 from .validators import validate_email, validate_phone, validate_risk_data
 from .errors import ValidationError, NotFoundError, UnauthorizedError
 
@@ -13,6 +13,8 @@ __all__ = [
     'cache_get',
     'cache_set',
     'cache_delete',
+    'cache_get_many',
+    'cache_set_many',
     'validate_email',
     'validate_phone',
     'validate_risk_data',
@@ -31,6 +31,34 @@ def cache_set(key, value, ttl=None):
         pass
     return False
 
+def cache_get_many(keys):
+    """Get several values from cache with a single MGET"""
+    results = {}
+    try:
+        if redis_client and keys:
+            for key, value in zip(keys, redis_client.mget(keys)):
+                if value:
+                    results[key] = json.loads(value)
+    except Exception:
+        pass
+    return results
+
+def cache_set_many(mapping, ttl=None):
+    """Set several values in cache with one pipelined round trip"""
+    try:
+        if redis_client and mapping:
+            pipe = redis_client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                if ttl:
+                    pipe.setex(key, ttl, json.dumps(value))
+                else:
+                    pipe.set(key, json.dumps(value))
+            pipe.execute()
+            return True
+    except Exception:
+        pass
+    return False
+
 def cache_delete(key):
     """Delete key from cache"""
     try:
@@ -41,6 +69,19 @@ def cache_delete(key):
         pass
     return False
 
+def cache_delete_many(keys):
+    """Delete several keys from cache with one pipelined round trip"""
+    try:
+        if redis_client and keys:
+            pipe = redis_client.pipeline(transaction=False)
+            for start in range(0, len(keys), 1000):
+                pipe.delete(*keys[start:start + 1000])
+            pipe.execute()
+            return True
+    except Exception:
+        pass
+    return False
+
 def cached(ttl=None):
     """Decorator to cache function results"""
     def decorator(f):
@@ -0,0 +1,213 @@
+"""
+Stale-while-revalidate caching
+Serves expired values immediately while one background refresh runs per key
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from flask import current_app, has_app_context
+
+from extensions import redis_client
+from utils.cache import cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """
+    Redis-backed cache whose entries carry a soft `fresh_until` deadline.
+
+    Fresh entries are returned as-is. Stale entries (past `fresh_ttl` but
+    within `stale_ttl`) are returned immediately and trigger a single
+    background refresh per key, de-duplicated in-process and across workers
+    with a short Redis lock. A refresher thread keeps the `top_n` most
+    requested keys warm by reloading them `refresh_ahead` seconds before
+    they go stale; request counts are only kept when it runs, halved and
+    cut to the `max_tracked` most requested keys on every sweep.
+    """
+
+    def __init__(self, namespace, loader, fresh_ttl, stale_ttl, top_n=0,
+                 refresh_interval=15, refresh_ahead=10, max_workers=2, lock_ttl=30, max_tracked=1000):
+        self.namespace = namespace
+        self.loader = loader
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.top_n = top_n
+        self.refresh_interval = refresh_interval
+        self.refresh_ahead = refresh_ahead
+        self.max_tracked = max(max_tracked, top_n)
+        self.lock_ttl = lock_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'swr-{namespace}')
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._popularity = Counter()
+        self._refresher = None
+        self._app = None
+        self._counters = Counter()
+        self._lag_total = 0.0
+        self._lag_max = None
+        self._lag_last = None
+        self._load_seconds = 0.0
+
+    def _key(self, arg):
+        return f'{self.namespace}:{arg}'
+
+    def get(self, arg):
+        """Return the cached value for `arg`, loading it synchronously only on a cold miss"""
+        self._start_refresher()
+        if self.top_n > 0:
+            with self._lock:
+                self._popularity[arg] += 1
+
+        envelope = cache_get(self._key(arg))
+        if envelope and 'value' in envelope:
+            if time.time() < envelope['fresh_until']:
+                self._count('hits')
+            else:
+                self._count('stale_hits')
+                self._schedule_refresh(arg, envelope['fresh_until'])
+            return envelope['value']
+
+        self._count('misses')
+        return self._load_and_store(arg)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _load_and_store(self, arg):
+        started = time.time()
+        value = self.loader(arg)
+        finished = time.time()
+        cache_set(self._key(arg), {
+            'value': value,
+            'fresh_until': finished + self.fresh_ttl,
+            'computed_at': finished
+        }, self.stale_ttl)
+        with self._lock:
+            self._counters['loads'] += 1
+            self._load_seconds += finished - started
+        return value
+
+    def _acquire_refresh_lock(self, arg):
+        """Cross-worker guard so only one process refreshes a key at a time"""
+        try:
+            if redis_client:
+                return bool(redis_client.set(f'{self._key(arg)}:refreshing', '1', nx=True, ex=self.lock_ttl))
+        except Exception:
+            pass
+        return True
+
+    def _release_refresh_lock(self, arg):
+        try:
+            if redis_client:
+                redis_client.delete(f'{self._key(arg)}:refreshing')
+        except Exception:
+            pass
+
+    def _schedule_refresh(self, arg, fresh_until, proactive=False):
+        with self._lock:
+            if arg in self._inflight:
+                return False
+            self._inflight.add(arg)
+        if not self._acquire_refresh_lock(arg):
+            with self._lock:
+                self._inflight.discard(arg)
+            return False
+
+        app = current_app._get_current_object() if has_app_context() else self._app
+        self._executor.submit(self._refresh, app, arg, fresh_until, proactive)
+        return True
+
+    def _refresh(self, app, arg, fresh_until, proactive):
+        try:
+            with app.app_context() if app is not None else nullcontext():
+                self._load_and_store(arg)
+            # Positive lag: how long the key was served stale; negative: refreshed ahead of expiry
+            lag = time.time() - fresh_until
+            with self._lock:
+                self._counters['proactive_refreshes' if proactive else 'refreshes'] += 1
+                self._lag_total += lag
+                self._lag_max = lag if self._lag_max is None else max(self._lag_max, lag)
+                self._lag_last = lag
+        except Exception as e:
+            self._count('refresh_errors')
+            logger.warning(f'Background refresh of {self._key(arg)} failed: {e}')
+        finally:
+            self._release_refresh_lock(arg)
+            with self._lock:
+                self._inflight.discard(arg)
+
+    def _start_refresher(self):
+        if self.top_n <= 0 or self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+            if has_app_context():
+                self._app = current_app._get_current_object()
+            self._refresher = threading.Thread(
+                target=self._run_refresher, name=f'swr-{self.namespace}-refresher', daemon=True
+            )
+            self._refresher.start()
+
+    def _run_refresher(self):
+        """Reload the most requested keys shortly before they go stale"""
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                with self._lock:
+                    popular = [arg for arg, _ in self._popularity.most_common(self.top_n)]
+                    # Decay demand so the ranking follows recent traffic, and bound the keys tracked
+                    self._popularity = Counter({
+                        arg: count * 0.5 for arg, count in self._popularity.most_common(self.max_tracked)
+                        if count >= 1
+                    })
+                now = time.time()
+                for arg in popular:
+                    envelope = cache_get(self._key(arg))
+                    fresh_until = envelope['fresh_until'] if envelope else now
+                    if fresh_until - now <= self.refresh_ahead:
+                        self._schedule_refresh(arg, fresh_until, proactive=True)
+            except Exception as e:
+                logger.warning(f'Proactive refresh for {self.namespace} failed: {e}')
+
+    def metrics(self):
+        """Hit ratio, refresh lag and load latency for this process"""
+        with self._lock:
+            counters = dict(self._counters)
+            lag_total, lag_max, lag_last = self._lag_total, self._lag_max, self._lag_last
+            load_seconds = self._load_seconds
+            inflight = len(self._inflight)
+            tracked = len(self._popularity)
+
+        hits = counters.get('hits', 0)
+        stale_hits = counters.get('stale_hits', 0)
+        misses = counters.get('misses', 0)
+        requests = hits + stale_hits + misses
+        refreshes = counters.get('refreshes', 0) + counters.get('proactive_refreshes', 0)
+        loads = counters.get('loads', 0)
+        return {
+            'requests': requests,
+            'hits': hits,
+            'stale_hits': stale_hits,
+            'misses': misses,
+            'hit_ratio': round((hits + stale_hits) / requests, 4) if requests else 0.0,
+            'fresh_hit_ratio': round(hits / requests, 4) if requests else 0.0,
+            'refreshes': counters.get('refreshes', 0),
+            'proactive_refreshes': counters.get('proactive_refreshes', 0),
+            'refresh_errors': counters.get('refresh_errors', 0),
+            'refreshes_in_flight': inflight,
+            'refresh_lag_seconds': {
+                'last': round(lag_last, 3) if lag_last is not None else None,
+                'average': round(lag_total / refreshes, 3) if refreshes else None,
+                'max': round(lag_max, 3) if lag_max is not None else None
+            },
+            'average_load_seconds': round(load_seconds / loads, 4) if loads else None,
+            'tracked_keys': tracked
+        }